@@ -1,51 +1,285 @@
-import mytextgrid
+import hashlib
 import os
+import sys
 import argparse
+from collections import Counter
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from daisy_common.archive import ArchiveWriter, archive_key
+from daisy_common.cache import BuildManifest, load_cached, module_sources, options_hash, plan_incremental, store_cached
+from daisy_common.index import add_index_argument, record, update_index
+from daisy_common.jobs import add_jobs_argument, print_results, run_jobs
+from daisy_common.metrics import add_metrics_arguments, get_metrics, instrument
+from daisy_common.segtable import SegmentTable, format_lab
+from daisy_common.scan import DEFAULT_IO_THREADS, add_io_argument, run_io_jobs, scan_files
+from daisy_common.ticks import find_gaps, seconds_to_ticks, separate_boundaries, value_to_ticks
+from daisy_common.textgrid import iter_bytes_intervals, iter_text_intervals, iter_tier_intervals
+from daisy_common.watch import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE, add_watch_arguments, watch
 
 def lowercase_and_remove_numbers(text):
     """Lowercase text and remove digits."""
     text = text.lower()
     return ''.join(c for c in text if not c.isdigit())
 
-def load_converter(converter_path, apply_low_number=False):
+# Bump when the compiled converter layout changes, to invalidate cached copies
+COMPILED_CONVERTER_VERSION = 1
+
+# Trie node key holding the replacement of the sequence ending at that node
+_RULE_END = None
+
+class SequenceConverter:
+    """
+    Phoneme sequence rules compiled into a trie.
+
+    Each trie level consumes one label, so the longest rule starting at an
+    interval is found in one forward scan without building candidate tuples.
+    """
+
+    def __init__(self, rules, root=None):
+        """
+        Compiles the rules.
+
+        Args:
+            rules (dict): Dictionary mapping phoneme sequence tuples to replacements.
+            root (dict, optional): An already compiled trie for these rules.
+        """
+        self.rules = rules
+        if root is None:
+            root = {}
+            for sequence, replacement in rules.items():
+                node = root
+                for label in sequence:
+                    node = node.setdefault(label, {})
+                node[_RULE_END] = replacement
+        self.root = root
+
+    def __len__(self):
+        return len(self.rules)
+
+    def outputs(self):
+        """
+        Returns the set of labels the rules produce.
+        """
+        return set(self.rules.values())
+
+    def longest_match(self, labels, start):
+        """
+        Find the longest rule matching labels from index start.
+
+        Args:
+            labels (list): Interval labels.
+            start (int): Index of the first label to match.
+
+        Returns:
+            tuple: (length, replacement) of the longest match, or None.
+        """
+        node = self.root
+        match = None
+        for k in range(start, len(labels)):
+            node = node.get(labels[k])
+            if node is None:
+                break
+            if _RULE_END in node:
+                match = (k - start + 1, node[_RULE_END])
+        return match
+
+def parse_converter(text, apply_low_number=False):
+    """
+    Parse converter file content into a dictionary with tuple keys.
+
+    Args:
+        text (str): Content of the converter file.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to phonemes.
+
+    Returns:
+        dict: Dictionary mapping phoneme sequence tuples to replacements.
+    """
+    converter = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            parts = line.split(',')
+            if len(parts) == 2:
+                sequence_str, replacement = parts
+                sequence = sequence_str.strip().split()
+                if apply_low_number:
+                    sequence = [lowercase_and_remove_numbers(ph) for ph in sequence]
+                converter[tuple(sequence)] = replacement.strip()
+    return converter
+
+def load_converter(converter_path, apply_low_number=False, use_cache=True):
     """
-    Load the converter file into a dictionary with tuple keys.
+    Load the converter file and compile it into a SequenceConverter.
+
+    The compiled form is cached on disk keyed by the hash of the converter
+    file, so repeated runs skip parsing and compiling it.
     
     Args:
         converter_path (str): Path to the converter file.
         apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to phonemes.
+        use_cache (bool): Whether to read and write the on-disk cache.
     
     Returns:
-        dict: Dictionary mapping phoneme sequence tuples to replacements.
+        SequenceConverter: The compiled phoneme sequence rules.
     """
-    converter = {}
     try:
-        with open(converter_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    parts = line.split(',')
-                    if len(parts) == 2:
-                        sequence_str, replacement = parts
-                        sequence = sequence_str.strip().split()
-                        if apply_low_number:
-                            sequence = [lowercase_and_remove_numbers(ph) for ph in sequence]
-                        converter[tuple(sequence)] = replacement.strip()
+        with open(converter_path, 'rb') as f:
+            content = f.read()
+
+        digest = hashlib.sha256(content).hexdigest()
+        cache_name = f"converter-{digest}-{int(apply_low_number)}-v{COMPILED_CONVERTER_VERSION}.pickle"
+        cached = load_cached(cache_name) if use_cache else None
+        if cached is not None:
+            return SequenceConverter(*cached)
+
+        converter = SequenceConverter(parse_converter(content.decode('utf-8'), apply_low_number))
     except FileNotFoundError:
         print(f"Error: Converter file '{converter_path}' not found.")
         raise
     except Exception as e:
         print(f"Error reading converter file: {e}")
         raise
+
+    if use_cache:
+        # Plain containers only, so the cache does not depend on how this module was imported
+        store_cached(cache_name, (converter.rules, converter.root))
     return converter
 
+def read_phone_intervals(textgrid_file, apply_low_number=False):
+    """
+    Read the intervals of the 'phones' tier of a TextGrid file.
+
+    The file is streamed and the other tiers are skipped without being built.
+
+    Args:
+        textgrid_file (str): Path to the TextGrid file (long or short text format).
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
+
+    Returns:
+        list: List of (start, end, label) tuples in 100ns ticks, empty labels replaced by 'pau'.
+    """
+    return label_intervals(iter_tier_intervals(textgrid_file, 'phones', seconds_to_ticks), apply_low_number)
+
+def parse_phone_intervals(text, apply_low_number=False):
+    """
+    Read the intervals of the 'phones' tier from TextGrid content.
+
+    Args:
+        text (str or bytes): TextGrid content (long or short text format). Bytes
+            are decoded like files, from their byte order mark.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
+
+    Returns:
+        list: List of (start, end, label) tuples in 100ns ticks, empty labels replaced by 'pau'.
+    """
+    if isinstance(text, bytes):
+        return label_intervals(iter_bytes_intervals(text, 'phones', seconds_to_ticks), apply_low_number)
+    return label_intervals(iter_text_intervals(text, 'phones', seconds_to_ticks), apply_low_number)
+
+def label_intervals(tier_intervals, apply_low_number=False):
+    """
+    Prepares raw tier intervals for conversion.
+
+    Args:
+        tier_intervals (iterable): (xmin, xmax, text) tuples of a tier.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
+
+    Returns:
+        list: List of (xmin, xmax, label) tuples with the times unchanged, empty labels replaced by 'pau'.
+    """
+    intervals = []
+    for xmin, xmax, text in tier_intervals:
+        label = text if text else 'pau'
+        if apply_low_number:
+            label = lowercase_and_remove_numbers(label)
+        intervals.append((xmin, xmax, label))
+    return intervals
+
+def intervals_to_table(intervals, converter, use_converter=True, vocab=None, unit="ticks"):
+    """
+    Convert intervals to a SegmentTable in 100ns ticks, merging consecutive phoneme sequences as specified.
+
+    Args:
+        intervals (list): List of (start, end, label) tuples, with times in `unit`.
+        converter (SequenceConverter or dict): Compiled rules, or a dictionary of
+            phoneme sequences to replacements.
+        use_converter (bool): Whether to apply the converter.
+        vocab (LabelVocabulary, optional): Vocabulary for the labels. Defaults to the shared one.
+        unit (str): "ticks" for int 100ns ticks, or "seconds" for Decimal, float
+            or str seconds, converted with rounding.
+
+    Returns:
+        SegmentTable: The merged segments. Intervals that rounded to zero length
+        keep one tick (see daisy_common.ticks.separate_boundaries).
+    """
+    if unit == "seconds":
+        intervals = [(value_to_ticks(start), value_to_ticks(end), label) for start, end, label in intervals]
+    elif unit != "ticks":
+        raise ValueError(f"Unknown time unit: '{unit}'")
+    intervals = separate_boundaries(intervals)
+    starts, ends, labels = _merge_intervals(intervals, converter, use_converter)
+    return SegmentTable.from_rows(starts, ends, labels, vocab)
+
+def intervals_to_lab(intervals, converter, use_converter=True, unit="ticks"):
+    """
+    Convert intervals to LAB lines, merging consecutive phoneme sequences as specified.
+
+    Args:
+        intervals (list): List of (start, end, label) tuples, with times in `unit`.
+        converter (SequenceConverter or dict): Compiled rules, or a dictionary of
+            phoneme sequences to replacements.
+        use_converter (bool): Whether to apply the converter.
+        unit (str): "ticks" or "seconds" (see intervals_to_table).
+
+    Returns:
+        list: List of LAB file lines.
+    """
+    table = intervals_to_table(intervals, converter, use_converter, unit=unit)
+    return [f"{start} {end} {label}" for start, end, label
+            in zip(table.starts.tolist(), table.ends.tolist(), table.label_strings())]
+
+def _merge_intervals(intervals, converter, use_converter):
+    if not isinstance(converter, SequenceConverter):
+        converter = SequenceConverter(converter or {})
+
+    use_converter = use_converter and len(converter) > 0
+    if not use_converter or not intervals:
+        # Nothing to merge: the intervals are the segments
+        starts, ends, labels = zip(*intervals) if intervals else ((), (), ())
+        return list(starts), list(ends), list(labels)
+
+    # Process intervals for sequence matching
+    starts, ends, merged_labels = [], [], []
+    labels = [label for _, _, label in intervals]
+    rule_hits = Counter()
+    i = 0
+    
+    while i < len(intervals):
+        # Look for the longest matching sequence
+        match = converter.longest_match(labels, i)
+        if match:
+            k, label = match
+            rule_hits[" ".join(labels[i:i + k])] += 1
+        else:
+            # No sequence matched or no converter applied; use the original label
+            k, label = 1, labels[i]
+        starts.append(intervals[i][0])
+        ends.append(intervals[i + k - 1][1])
+        merged_labels.append(label)
+        i += k
+    
+    get_metrics().count_rules("textgrid2lab", rule_hits)
+    return starts, ends, merged_labels
+
 def textgrid_to_lab(textgrid_file, converter, use_converter=True, apply_low_number=False):
     """
     Convert a TextGrid file to LAB format, merging consecutive phoneme sequences as specified.
     
     Args:
         textgrid_file (str): Path to the TextGrid file.
-        converter (dict): Dictionary of phoneme sequences to replacements.
+        converter (SequenceConverter or dict): Compiled rules, or a dictionary of
+            phoneme sequences to replacements.
         use_converter (bool): Whether to apply the converter.
         apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
     
@@ -53,55 +287,106 @@ def textgrid_to_lab(textgrid_file, converter, use_converter=True, apply_low_numb
         list: List of LAB file lines.
     """
     try:
-        tg = mytextgrid.read_from_file(textgrid_file)
+        intervals = read_phone_intervals(textgrid_file, apply_low_number)
     except Exception as e:
         print(f"Error reading TextGrid file '{textgrid_file}': {e}")
         return []
 
-    # Collect intervals from the 'phones' tier
-    intervals = []
-    for tier in tg:
-        if tier.name == 'phones' and tier.is_interval():
-            for interval in tier:
-                label = interval.text if interval.text else 'pau'
-                if apply_low_number:
-                    label = lowercase_and_remove_numbers(label)
-                intervals.append((interval.xmin, interval.xmax, label))
-    
-    if not intervals:
-        return []
+    return intervals_to_lab(intervals, converter, use_converter)
 
-    # Process intervals for sequence matching
-    lab_lines = []
-    i = 0
-    max_seq_len = max(len(seq) for seq in converter.keys()) if converter else 1
-    
-    while i < len(intervals):
-        if use_converter and converter:
-            # Look for the longest matching sequence
-            for k in range(min(max_seq_len, len(intervals) - i), 0, -1):
-                seq = tuple(intervals[i + j][2] for j in range(k))
-                if seq in converter:
-                    start_time = intervals[i][0]
-                    end_time = intervals[i + k - 1][1]
-                    replacement = converter[seq]
-                    lab_lines.append(f"{int(start_time * 10000000)} {int(end_time * 10000000)} {replacement}")
-                    i += k
-                    break
-            else:
-                # No sequence matched; use the original label
-                start_time, end_time, label = intervals[i]
-                lab_lines.append(f"{int(start_time * 10000000)} {int(end_time * 10000000)} {label}")
-                i += 1
-        else:
-            # No converter applied; use original labels
-            start_time, end_time, label = intervals[i]
-            lab_lines.append(f"{int(start_time * 10000000)} {int(end_time * 10000000)} {label}")
-            i += 1
-    
-    return lab_lines
+def textgrid_text_to_lab(text, converter=None, use_converter=True, apply_low_number=False):
+    """
+    Convert TextGrid content to LAB content in memory, without touching the file system.
+
+    Args:
+        text (str or bytes): TextGrid content (long or short text format).
+        converter (SequenceConverter or dict, optional): Compiled rules, or a
+            dictionary of phoneme sequences to replacements (see parse_converter).
+        use_converter (bool): Whether to apply the converter.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
 
-def process_files(converter_path, output_dir=None, use_converter=True, apply_low_number=True):
+    Returns:
+        str: The LAB content, empty when the TextGrid has no phones.
+    """
+    intervals = parse_phone_intervals(text, apply_low_number)
+    return format_lab(intervals_to_table(intervals, converter or {}, use_converter))
+
+_worker_converter = None
+# Labels a converted file may contain; anything else was missed by the rules
+_worker_known = None
+
+def _init_worker(converter):
+    global _worker_converter, _worker_known
+    _worker_converter = converter
+    _worker_known = converter.outputs() | {'pau'}
+
+def _output_path(output_dir, textgrid_file):
+    lab_file = textgrid_file.replace(".TextGrid", ".lab")
+    if not output_dir:
+        return lab_file
+
+    # Handle output directory
+    rel_subdir = os.path.relpath(os.path.dirname(textgrid_file), ".")
+    return os.path.join(output_dir, rel_subdir, os.path.basename(lab_file))
+
+def _convert_task(output_dir, use_converter, apply_low_number, index, textgrid_file, data):
+    metrics = get_metrics()
+    with metrics.time("parse"):
+        intervals = parse_phone_intervals(data, apply_low_number)
+    metrics.count("intervals", len(intervals))
+    with metrics.time("convert"):
+        table = intervals_to_table(intervals, _worker_converter, use_converter)
+        if not len(table):
+            return None, []
+        lab_text = format_lab(table)
+    metrics.count("segments", len(table))
+    # Boundaries are exact ticks, so a gap here is a gap in the TextGrid itself
+    gaps = len(find_gaps(table.starts, table.ends))
+    if gaps:
+        metrics.count("gaps", gaps)
+    if index:
+        record(archive_key(".", textgrid_file), table, _worker_known if use_converter else None)
+
+    output_lab_file = _output_path(output_dir, textgrid_file)
+    return f"Converted {textgrid_file} to {output_lab_file}", [(output_lab_file, lab_text, 'utf-8')]
+
+def find_textgrid_files(input_dir="./", fs=None, io_threads=DEFAULT_IO_THREADS):
+    """
+    Return the sorted paths of all TextGrid files under input_dir, listing directories concurrently.
+    """
+    return scan_files(input_dir, ".TextGrid", fs, io_threads)
+
+def convert_textgrid_files(converter, textgrid_files, output_dir=None, use_converter=True, apply_low_number=True,
+                           jobs=1, fs=None, io_threads=DEFAULT_IO_THREADS, index=False):
+    """
+    Converts the given TextGrid files, with paths relative to the current directory, to LAB files.
+
+    Args:
+        converter (SequenceConverter): Loaded converter (see load_converter).
+        textgrid_files (list): Paths of the TextGrid files to convert.
+        output_dir (str, optional): Directory for output LAB files.
+        use_converter (bool): Whether to use the converter.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of reads and writes in flight.
+        index (bool): Record the converted files for the corpus index (see update_index).
+
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    return run_io_jobs(
+        partial(_convert_task, output_dir, use_converter, apply_low_number, index),
+        textgrid_files,
+        jobs=jobs,
+        initializer=_init_worker,
+        initargs=(converter,),
+        fs=fs,
+        threads=io_threads
+    )
+
+def process_files(converter_path, output_dir=None, use_converter=True, apply_low_number=True, jobs=1,
+                  incremental=False, fs=None, io_threads=DEFAULT_IO_THREADS, index_path=None):
     """
     Process all TextGrid files in the current directory and subdirectories.
     
@@ -110,53 +395,193 @@ def process_files(converter_path, output_dir=None, use_converter=True, apply_low
         output_dir (str, optional): Directory for output LAB files.
         use_converter (bool): Whether to use the converter.
         apply_low_number (bool): Whether to apply lowercase_and_remove_numbers.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        incremental (bool): Only convert TextGrids that changed since the last
+            incremental run, and remove LAB files whose TextGrid is gone.
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of directory listings, reads and writes in flight.
+        index_path (str, optional): Corpus index file to update with the converted files.
+    
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    converter = load_converter(converter_path, apply_low_number)
+    textgrid_files = find_textgrid_files("./", fs, io_threads)
+    all_files = textgrid_files
+
+    if incremental:
+        outputs = {path: _output_path(output_dir, path) for path in textgrid_files}
+        options_key = options_hash(
+            [converter_path] + module_sources(__name__, "daisy_common.segtable", "daisy_common.ticks",
+                                              "daisy_common.textgrid"),
+            use_converter=use_converter,
+            apply_low_number=apply_low_number
+        )
+        manifest = BuildManifest(output_dir or ".", options_key)
+        textgrid_files, up_to_date = plan_incremental(manifest, outputs)
+        print(f"Up to date: {up_to_date} files, converting {len(textgrid_files)}")
+
+    results = convert_textgrid_files(converter, textgrid_files, output_dir, use_converter, apply_low_number,
+                                     jobs, fs, io_threads, index_path is not None)
+    print_results(results)
+
+    if index_path:
+        update_index(index_path, keys=[archive_key(".", path) for path in all_files])
+
+    if incremental:
+        for orphan in manifest.apply_results(results, outputs):
+            print(f"Removed orphaned output: {orphan}")
+        manifest.save()
+
+    return results
+
+def watch_files(converter_path, output_dir=None, use_converter=True, apply_low_number=True, jobs=1, fs=None,
+                io_threads=DEFAULT_IO_THREADS, settle=DEFAULT_SETTLE, interval=DEFAULT_POLL_INTERVAL,
+                polling=False, idle_exit=None, index_path=None):
+    """
+    Converts the TextGrid files in the current directory tree as the aligner writes them.
+
+    Existing TextGrids are converted first; after that every new or changed
+    TextGrid is converted once it has stopped changing for `settle` seconds.
+    Runs until interrupted, or until `idle_exit` seconds pass without new files.
+
+    Args:
+        converter_path (str): Path to the converter file.
+        output_dir (str, optional): Directory for output LAB files.
+        use_converter (bool): Whether to use the converter.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of reads and writes in flight.
+        settle (float): Seconds a TextGrid must stay unchanged before it is converted.
+        interval (float): Seconds between checks.
+        polling (bool): Poll the tree even when inotify is available.
+        idle_exit (float, optional): Stop after this many seconds without new files.
+        index_path (str, optional): Corpus index file to update after every batch.
+
+    Returns:
+        int: Number of TextGrids converted.
     """
     converter = load_converter(converter_path, apply_low_number)
+
+    def convert(textgrid_files):
+        results = convert_textgrid_files(converter, textgrid_files, output_dir, use_converter, apply_low_number,
+                                         jobs, fs, io_threads, index_path is not None)
+        print_results(results)
+        if index_path:
+            update_index(index_path)
+
+    return watch("./", ".TextGrid", convert, settle, interval, polling, idle_exit)
+
+def _pack_task(use_converter, apply_low_number, textgrid_file):
+    metrics = get_metrics()
+    with metrics.time("parse"):
+        intervals = read_phone_intervals(textgrid_file, apply_low_number)
+    metrics.count("intervals", len(intervals))
+    with metrics.time("convert"):
+        table = intervals_to_table(intervals, _worker_converter, use_converter)
+    metrics.count("segments", len(table))
+    if not len(table):
+        return None
+    return table.starts, table.ends, table.label_strings()
+
+def pack_files(converter_path, archive_path, use_converter=True, apply_low_number=True, jobs=1):
+    """
+    Convert all TextGrid files in the current directory and subdirectories into one packed LAB archive.
+
+    Utterances are keyed by their path relative to the current directory, without extension.
+    
+    Args:
+        converter_path (str): Path to the converter file.
+        archive_path (str): Path of the archive to write.
+        use_converter (bool): Whether to use the converter.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers.
+        jobs (int): Number of worker processes (0 uses every CPU).
     
-    for subdir, _, files in os.walk("./"):
-        for file in files:
-            if file.endswith(".TextGrid"):
-                textgrid_file = os.path.join(subdir, file)
-                lab_lines = textgrid_to_lab(
-                    textgrid_file,
-                    converter,
-                    use_converter=use_converter,
-                    apply_low_number=apply_low_number
-                )
-                if not lab_lines:
-                    continue
-                
-                lab_file = textgrid_file.replace(".TextGrid", ".lab")
-                output_lab_file = lab_file
-                
-                # Handle output directory
-                if output_dir:
-                    rel_subdir = os.path.relpath(subdir, ".")
-                    output_subdir = os.path.join(output_dir, rel_subdir)
-                    os.makedirs(output_subdir, exist_ok=True)
-                    output_lab_file = os.path.join(output_subdir, os.path.basename(lab_file))
-                
-                try:
-                    with open(output_lab_file, 'w', encoding='utf-8') as f:
-                        for line in lab_lines:
-                            f.write(f"{line}\n")
-                    print(f"Converted {textgrid_file} to {output_lab_file}")
-                except Exception as e:
-                    print(f"Error writing LAB file '{output_lab_file}': {e}")
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    converter = load_converter(converter_path, apply_low_number)
+
+    results = run_jobs(
+        partial(_pack_task, use_converter, apply_low_number),
+        find_textgrid_files("./"),
+        jobs=jobs,
+        initializer=_init_worker,
+        initargs=(converter,)
+    )
+
+    report = []
+    with get_metrics().time("write"), ArchiveWriter(archive_path, kind="lab") as writer:
+        for path, rows, error in results:
+            if error is None and rows is not None:
+                writer.add_rows(archive_key(".", path), *rows)
+                report.append((path, f"Packed {path}", None))
+            else:
+                report.append((path, None, error))
+    print_results(report)
+    print(f"Archive written: {archive_path}")
+    return report
 
 def main():
     """Main function to parse arguments and initiate processing."""
     parser = argparse.ArgumentParser(description="Convert TextGrid files to LAB files.")
     parser.add_argument('-c', '--converter', type=str, required=True, help="Path to the converter file (.txt)")
-    parser.add_argument('-o', '--output', type=str, help="Path to the output directory for LAB files")
+    destination = parser.add_mutually_exclusive_group()
+    destination.add_argument('-o', '--output', type=str, help="Path to the output directory for LAB files")
+    destination.add_argument('--archive', type=str, help="Write one packed archive to this path instead of loose LAB files")
+    parser.add_argument('--incremental', action='store_true', help="Only convert TextGrid files that changed since the last incremental run")
+    add_jobs_argument(parser)
+    add_io_argument(parser)
+    add_metrics_arguments(parser)
+    add_watch_arguments(parser)
+    add_index_argument(parser)
     args = parser.parse_args()
+
+    if args.watch and (args.archive or args.incremental):
+        print("Error: --watch cannot be combined with --archive or --incremental.")
+        return
+    if args.index and args.archive:
+        print("Error: --index cannot be combined with --archive.")
+        return
     
-    process_files(
-        converter_path=args.converter,
-        output_dir=args.output,
-        use_converter=True,
-        apply_low_number=True
-    )
+    with instrument(args, "textgrid2lab"):
+        if args.watch:
+            watch_files(
+                converter_path=args.converter,
+                output_dir=args.output,
+                use_converter=True,
+                apply_low_number=True,
+                jobs=args.jobs,
+                io_threads=args.io_threads,
+                settle=args.settle,
+                interval=args.poll_interval,
+                polling=args.polling,
+                idle_exit=args.idle_exit,
+                index_path=args.index
+            )
+            return
+
+        if args.archive:
+            pack_files(
+                converter_path=args.converter,
+                archive_path=args.archive,
+                use_converter=True,
+                apply_low_number=True,
+                jobs=args.jobs
+            )
+            return
+
+        process_files(
+            converter_path=args.converter,
+            output_dir=args.output,
+            use_converter=True,
+            apply_low_number=True,
+            jobs=args.jobs,
+            incremental=args.incremental,
+            io_threads=args.io_threads,
+            index_path=args.index
+        )
 
 if __name__ == "__main__":
     main()
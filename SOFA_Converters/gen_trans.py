@@ -1,45 +1,303 @@
 import os
+import sys
+import json
 import argparse
 
-def process_directory(input_folder):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from daisy_common.metrics import add_metrics_arguments, get_metrics, instrument, output_mode, progress_bar
+from daisy_common.output import BatchWriter
+from daisy_common.scan import DEFAULT_IO_THREADS, add_io_argument
+
+JOURNAL_NAME = ".gen_trans.journal"
+# The .wav files prepared by earlier runs, relative to the input folder
+PREPARED_NAME = ".gen_trans.prepared"
+
+def load_prepared(input_folder):
     """
-    Processes a directory to:
+    Returns the .wav paths recorded as prepared in input_folder, relative to it with '/' separators.
+    """
+    try:
+        with open(os.path.join(input_folder, PREPARED_NAME), 'r', encoding='utf-8') as f:
+            return set(json.load(f)["prepared"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+
+def _wav_base(file, suffix, prepared=()):
+    """
+    Returns the base name a .wav file gets, without the folder suffix, or None for other files.
+
+    Files in prepared (names recorded by an earlier run) keep their base name;
+    any other .wav file is raw, even if its name happens to end with the suffix.
+    """
+    base_name, ext = os.path.splitext(file)
+    if ext.lower() != ".wav":
+        return None
+    if file in prepared and base_name.endswith(suffix):
+        return base_name[:-len(suffix)]
+    return base_name.replace("_", "")
+
+def plan_files(root, files, transcribe=None, prepared=()):
+    """
+    Computes the operations that prepare the files of one folder.
+
+    Works on names only, so it can plan a listing that is not on disk:
     1. Delete non-.wav files.
     2. Remove underscores from .wav file names.
     3. Create corresponding .txt files (without suffix inside).
     4. Add a suffix to .wav and .txt files based on the folder name.
+
+    Planning a prepared folder again renames and deletes nothing: prepared
+    .wav names are kept and the .txt files the plan writes are not deleted.
+
+    Args:
+        root (str): Path of the folder; its name is the suffix.
+        files (list): File names in the folder.
+        transcribe (callable, optional): Converts a base name to the .txt content,
+            e.g. to Romaji. Defaults to the base name itself.
+        prepared (set, optional): Names of the .wav files of the folder that an
+            earlier run prepared (see load_prepared).
+
+    Returns:
+        list: Operations in execution order: ("remove", path),
+        ("rename", src, dst) or ("write", path, text).
+    """
+    plan = []
+    folder_name = os.path.basename(root)
+    suffix = f"_{folder_name}"
+    bases = [_wav_base(file, suffix, prepared) for file in files]
+    transcripts = {f"{base}{suffix}.txt" for base in bases if base is not None}
+
+    for file, new_base_name in zip(files, bases):
+        file_path = os.path.join(root, file)
+
+        # 1. Delete non-.wav files
+        if new_base_name is None:
+            if file not in transcripts:
+                plan.append(("remove", file_path))
+            continue
+
+        # 2. Remove underscores from .wav names and add suffix to .wav file
+        ext = os.path.splitext(file)[1]
+        new_wav_path = os.path.join(root, f"{new_base_name}{suffix}{ext}")
+
+        if file_path != new_wav_path:  # Avoid unnecessary renaming
+            plan.append(("rename", file_path, new_wav_path))
+
+        # 3. Create .txt file with suffix in the name (but not inside)
+        txt_file_path = os.path.join(root, f"{new_base_name}{suffix}.txt")
+        text = transcribe(new_base_name) if transcribe is not None else new_base_name
+        plan.append(("write", txt_file_path, text))  # Write only the base name
+    return plan
+
+def find_collisions(root, files, prepared=()):
+    """
+    Finds the .wav files of a folder that would get the same base name, or
+    that would be renamed onto another .wav file that is renamed too.
+
+    A rename onto a file that is renamed in turn (a.wav to a_x.wav while
+    a_x.wav becomes ax_x.wav in folder x) would overwrite it, depending on the
+    order the renames are committed in.
+
+    Args:
+        root (str): Path of the folder.
+        files (list): File names in the folder.
+        prepared (set, optional): Names of the prepared .wav files of the folder (see plan_files).
+
+    Returns:
+        list: Lists of two or more colliding .wav paths.
+    """
+    suffix = f"_{os.path.basename(root)}"
+    groups = {}
+    targets = {}
+    for file in files:
+        base = _wav_base(file, suffix, prepared)
+        if base is not None:
+            groups.setdefault(os.path.normcase(base), []).append(os.path.join(root, file))
+            target = f"{base}{suffix}{os.path.splitext(file)[1]}"
+            if target != file:
+                targets[file] = target
+    collisions = [paths for paths in groups.values() if len(paths) > 1]
+    renamed = {os.path.normcase(file): file for file in targets}
+    for file, target in targets.items():
+        occupant = renamed.get(os.path.normcase(target))
+        if occupant is not None and occupant != file:
+            collisions.append([os.path.join(root, file), os.path.join(root, occupant)])
+    return collisions
+
+def iter_folders(input_folder):
     """
+    Yields (folder path, sorted file names) for input_folder and its subfolders, top-down.
 
-    for root, _, files in os.walk(input_folder):  # No need for topdown=False now
-        folder_name = os.path.basename(root)
-        suffix = f"_{folder_name}"
+    Listed with one os.scandir per folder. Like os.walk, unreadable folders
+    are skipped and symlinked folders are not entered.
+    """
+    try:
+        with os.scandir(input_folder) as iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name)
+    except OSError:
+        return
+    files = []
+    folders = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            files.append(entry.name)
+        elif not entry.is_symlink():
+            folders.append(entry.path)
+    yield input_folder, files
+    for folder in folders:
+        yield from iter_folders(folder)
+
+def plan_directory(input_folder, transcribe=None):
+    """
+    Computes the operations that prepare a directory tree, without touching it.
+
+    The last operation writes the PREPARED_NAME record of the .wav files the
+    plan leaves, so that the next run keeps their names instead of adding the
+    folder suffix again. .wav files missing from the record are treated as raw.
+
+    Args:
+        input_folder (str): Path to the input folder.
+        transcribe (callable, optional): Converts a base name to the .txt content (see plan_files).
+
+    Returns:
+        list: Operations in execution order (see plan_files).
 
+    Raises:
+        ValueError: If .wav files of a folder would get the same name or
+            overwrite each other (see find_collisions).
+    """
+    recorded = load_prepared(input_folder)
+    plan = []
+    collisions = []
+    wavs = []
+    for root, files in iter_folders(input_folder):
+        if root == input_folder:
+            # The resume journal and the prepared record are not part of the data
+            files = [file for file in files if file not in (JOURNAL_NAME, PREPARED_NAME)]
+        folder = os.path.relpath(root, input_folder).replace(os.sep, "/")
+        prefix = "" if folder == "." else folder + "/"
+        prepared = {file for file in files if prefix + file in recorded}
+        collisions.extend(find_collisions(root, files, prepared))
+        suffix = f"_{os.path.basename(root)}"
         for file in files:
-            file_path = os.path.join(root, file)
-            base_name, ext = os.path.splitext(file)
+            base = _wav_base(file, suffix, prepared)
+            if base is not None:
+                wavs.append(f"{prefix}{base}{suffix}{os.path.splitext(file)[1]}")
+        plan.extend(plan_files(root, files, transcribe, prepared))
+    if collisions:
+        lines = "\n".join("  " + ", ".join(paths) for paths in collisions)
+        raise ValueError(f".wav files would get the same name or overwrite each other; "
+                         f"rename them and run again:\n{lines}")
+    record = json.dumps({"prepared": sorted(wavs)}, ensure_ascii=False, indent=1) + "\n"
+    plan.append(("write", os.path.join(input_folder, PREPARED_NAME), record))
+    return plan
 
-            # 1. Delete non-.wav files
-            if ext.lower() != ".wav":
-                print(f"Deleting: {file_path}")
-                os.remove(file_path)
-                continue
+def _unchanged(operation):
+    try:
+        with open(operation[1], 'r', encoding='utf-8', newline='') as f:
+            return f.read() == operation[2]
+    except (OSError, UnicodeDecodeError):
+        return False
 
-            # 2. Remove underscores from .wav names and add suffix to .wav file
-            new_base_name = base_name.replace("_", "")
-            new_wav_name = f"{new_base_name}{suffix}{ext}"
-            new_wav_path = os.path.join(root, new_wav_name)
+def drop_unchanged_writes(plan, threads=1):
+    """
+    Removes the writes whose file already has the planned content, reading them in parallel.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    writes = [operation for operation in plan if operation[0] == "write"]
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        unchanged = {operation[1] for operation, same in zip(writes, executor.map(_unchanged, writes)) if same}
+    return [operation for operation in plan if operation[0] != "write" or operation[1] not in unchanged]
 
-            if file_path != new_wav_path:  # Avoid unnecessary renaming
-                print(f"Renaming: {file_path} to {new_wav_path}")
-                os.rename(file_path, new_wav_path)
+def describe_operation(operation):
+    """
+    Returns the progress message of a plan operation.
+    """
+    if operation[0] == "remove":
+        return f"Deleting: {operation[1]}"
+    if operation[0] == "rename":
+        return f"Renaming: {operation[1]} to {operation[2]}"
+    return f"Creating: {operation[1]}"
+
+def romaji_transcriber(converter=None):
+    """
+    Returns a transcribe function for plan_files that writes the Romaji of the
+    base name, exactly as txt2romaji would convert the .txt file afterwards.
+    """
+    from txt2romaji import romanize_transcript
+    return lambda base_name: romanize_transcript(base_name, converter)
+
+def process_directory(input_folder, dry_run=False, batch_size=256, threads=DEFAULT_IO_THREADS, romaji=False,
+                      converter=None):
+    """
+    Processes a directory to:
+    1. Delete non-.wav files.
+    2. Remove underscores from .wav file names.
+    3. Create corresponding .txt files (without suffix inside).
+    4. Add a suffix to .wav and .txt files based on the folder name.
+
+    The tree is scanned once and the whole plan is computed first; name
+    collisions stop the run before anything is changed. .txt files that
+    already have the planned content are not rewritten and prepared .wav files
+    are recognized from the record the run leaves in the folder (see
+    plan_directory), so running again on a prepared tree changes nothing. The plan is saved in a journal, then
+    applied in fsynced batches with atomic writes, each batch committed by a
+    pool of threads. An interrupted run is resumed from the saved plan,
+    skipping the operations that were already committed.
+
+    Args:
+        input_folder (str): Path to the input folder.
+        dry_run (bool): Only print the planned operations.
+        batch_size (int): Operations per fsynced batch.
+        threads (int): Threads that read, fsync and commit files.
+        romaji (bool): Write the Romaji of the names (txt2romaji) instead of
+            the names, without a second pass over the tree.
+        converter (RomajiConverter, optional): Converter for romaji. Defaults to the shared one.
+
+    Returns:
+        list: The planned operations.
+
+    Raises:
+        ValueError: If .wav files of a folder would get the same name or
+            overwrite each other (see find_collisions).
+    """
+    metrics = get_metrics()
+    writer = BatchWriter(batch_size, dry_run, journal=os.path.join(input_folder, JOURNAL_NAME), threads=threads)
+    plan = writer.saved_plan
+    if plan is None:
+        with metrics.time("scan"):
+            plan = plan_directory(input_folder, romaji_transcriber(converter) if romaji else None)
+            plan = drop_unchanged_writes(plan, threads)
+        writer.record_plan(plan)
+    else:
+        print(f"Resuming interrupted run: {len(writer.done)} of {len(plan)} operations already done")
 
-            # 3. Create .txt file with suffix in the name (but not inside)
-            txt_file_name = f"{new_base_name}{suffix}.txt"
-            txt_file_path = os.path.join(root, txt_file_name)
-            print(f"Creating: {txt_file_path}")
+    verbose = output_mode() == "verbose"
+    progress = progress_bar(len(plan), "operations")
+    try:
+        with metrics.time("write"):
+            for operation in plan:
+                if writer.apply(operation, encoding="utf-8"):
+                    metrics.count(operation[0])
+                    if operation[0] != "rename":
+                        metrics.count("files")
+                    if verbose:
+                        print(describe_operation(operation))
+                if progress is not None:
+                    progress.update()
+    except BaseException:
+        writer.discard()
+        raise
+    with metrics.time("write"):
+        writer.close()
 
-            with open(txt_file_path, "w", encoding="utf-8") as txt_file:
-                txt_file.write(new_base_name)  # Write only the base name
+    if dry_run:
+        print(f"Dry run: {len(writer.plan)} operations planned, nothing changed.")
+    return plan
 
 def main():
     """
@@ -47,6 +305,12 @@ def main():
     """
     parser = argparse.ArgumentParser(description="Process a directory to modify .wav files and create .txt files.")
     parser.add_argument("-i", "--input", required=True, help="Path to the input folder")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the planned deletions, renames and writes without applying them")
+    parser.add_argument("--romaji", action="store_true",
+                        help="Write the names converted to Romaji (like txt2romaji) in the same pass")
+    add_io_argument(parser)
+    add_metrics_arguments(parser)
 
     args = parser.parse_args()
 
@@ -54,8 +318,14 @@ def main():
         print(f"Error: Invalid input directory: {args.input}")
         return
 
-    process_directory(args.input)
-    print("Directory processing complete!")
+    with instrument(args, "gen_trans"):
+        try:
+            process_directory(args.input, dry_run=args.dry_run, threads=args.io_threads, romaji=args.romaji)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+    if not args.dry_run:
+        print("Directory processing complete!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
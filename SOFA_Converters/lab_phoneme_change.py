@@ -1,6 +1,24 @@
 import argparse
 import os
+import sys
 import glob
+import re
+from collections import Counter
+
+JOURNAL_NAME = ".lab_phoneme_change.journal"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from daisy_common.archive import archive_key
+from daisy_common.cache import options_hash
+from daisy_common.index import EntryBuilder, add_index_argument, record, record_entry, update_index
+from daisy_common.jobs import add_jobs_argument, print_results, run_jobs
+from daisy_common.metrics import add_metrics_arguments, get_metrics, instrument
+from daisy_common.output import BatchWriter, atomic_write_text
+from daisy_common.segtable import LabelRemap, parse_lab, shared_vocabulary
+from daisy_common.stream import STREAM_THRESHOLD, iter_blocks
+
+# The label column of a .lab line, after the start and end fields and their spacing
+_LABEL_COLUMN_PATTERN = re.compile(r'^([^\S\n]*\S+[^\S\n]+\S+[^\S\n]+)(\S+)', re.MULTILINE)
 
 class SymbolConverter:
     """
@@ -15,11 +33,17 @@ class SymbolConverter:
             converter_file (str): Path to the .txt file containing symbol mappings.
         """
         self.converter_map = self._load_converter_map(converter_file)
+        # Symbols whose replacement differs from them
+        self._symbols = frozenset(original for original, replacement in self.converter_map.items()
+                                  if original != replacement)
+        self._remap = None
 
     def _load_converter_map(self, converter_file):
         """
         Loads the symbol mapping from the converter file.
 
+        Blank lines are skipped.
+
         Args:
             converter_file (str): Path to the .txt file.
 
@@ -30,7 +54,10 @@ class SymbolConverter:
         try:
             with open(converter_file, 'r') as f:
                 for line in f:
-                    original, replacement = line.strip().split(',')
+                    line = line.strip()
+                    if not line:
+                        continue
+                    original, replacement = line.split(',')
                     converter_map[original] = replacement
         except FileNotFoundError:
             raise FileNotFoundError(f"Converter file not found: {converter_file}")
@@ -38,47 +65,234 @@ class SymbolConverter:
             raise Exception(f"Error loading converter file: {e}")
         return converter_map
 
-    def convert_lab_file(self, lab_file):
+    def _get_remap(self, vocab):
+        if self._remap is None or self._remap.vocab is not vocab:
+            self._remap = LabelRemap(self.converter_map, vocab)
+        return self._remap
+
+    def convert_table(self, table):
+        """
+        Converts the labels of a SegmentTable with one array lookup.
+
+        Args:
+            table (SegmentTable): Segments to convert.
+
+        Returns:
+            SegmentTable: A copy with the labels remapped.
+        """
+        converted = self._get_remap(table.vocab).apply(table)
+        changed = table.labels[converted.labels != table.labels]
+        if len(changed):
+            get_metrics().count_rules("lab_phoneme_change", Counter(table.vocab.decode(changed)))
+        return converted
+
+    def convert_text(self, text):
+        """
+        Converts the symbols of .lab content in memory.
+
+        Only the label column is rewritten; times, spacing and line breaks are
+        kept byte for byte.
+
+        Args:
+            text (str): The .lab content.
+
+        Returns:
+            str: The converted .lab content.
+        """
+        rule_hits = Counter()
+        converted, _ = self._relabel(text, rule_hits)
+        get_metrics().count_rules("lab_phoneme_change", rule_hits)
+        return converted
+
+    def _relabel(self, text, rule_hits):
+        """
+        Rewrites the label column (the third field of a line) of .lab content.
+
+        The labels are interned once per process and remapped with one lookup
+        array operation. Content whose labels include no mapped symbol is
+        returned as it is, before any interning.
+
+        Args:
+            text (str): The .lab content, or a block of whole lines of it.
+            rule_hits (Counter): Receives the original symbols that were replaced.
+
+        Returns:
+            tuple: (converted content, number of labels replaced).
+        """
+        # [text before line 1, fields before label 1, label 1, rest of line 1 up to the next line, ...]
+        parts = _LABEL_COLUMN_PATTERN.split(text)
+        if self._symbols.isdisjoint(parts[2::3]):
+            return text, 0
+        remap = self._get_remap(shared_vocabulary())
+        labels = remap.vocab.intern_many(parts[2::3])
+        remapped = remap.lookup()[labels]
+        changed = remapped != labels
+        rule_hits.update(remap.vocab.decode(labels[changed]))
+        parts[2::3] = remap.vocab.decode(remapped)
+        return "".join(parts), int(changed.sum())
+
+    def convert_lab_file(self, lab_file, writer=None, index_key=None):
         """
         Converts the symbols in a single .lab file.
 
+        The file is replaced atomically, or staged in writer when one is given.
+        Files without any replaced symbol are not rewritten. Files of at least
+        STREAM_THRESHOLD bytes are converted with _convert_lab_stream.
+
         Args:
             lab_file (str): Path to the .lab file.
+            writer (BatchWriter, optional): Batched output to stage the rewrite in.
+            index_key (str, optional): Records the converted segments in the corpus index under this key.
+
+        Returns:
+            bool: True if the content changed.
         """
-        try:
-            with open(lab_file, 'r') as f_in:
-                lines = f_in.readlines()
-
-            converted_lines = []
-            for line in lines:
-                parts = line.strip().split()
-                if len(parts) >= 3:
-                  
-                    symbol = parts[2]
-                    if symbol in self.converter_map:
-                        parts[2] = self.converter_map[symbol]
-                    converted_lines.append(" ".join(parts))
-                else:
-                  converted_lines.append(line)
-
-            with open(lab_file, 'w') as f_out:
-                f_out.write("\n".join(converted_lines))
+        if os.path.getsize(lab_file) >= STREAM_THRESHOLD:
+            return self._convert_lab_stream(lab_file, writer, index_key)
 
-        except Exception as e:
-            print(f"Error processing {lab_file}: {e}")
+        metrics = get_metrics()
+        with metrics.time("read"):
+            # newline='' on read and write keeps CRLF line endings as they are
+            with open(lab_file, 'r', newline='') as f_in:
+                text = f_in.read()
+
+        rule_hits = Counter()
+        with metrics.time("convert"):
+            converted, changes = self._relabel(text, rule_hits)
+        metrics.count_rules("lab_phoneme_change", rule_hits)
+        if index_key is not None:
+            record(index_key, parse_lab(converted))
+        if not changes:
+            return False
+
+        with metrics.time("write"):
+            if writer is None:
+                atomic_write_text(lab_file, converted, newline='')
+            else:
+                writer.write_text(lab_file, converted, newline='')
+        metrics.count("rewritten")
+        return True
+
+    def _iter_relabeled(self, lab_file, rule_hits):
+        """
+        Yields (converted block, labels replaced) for the blocks of a .lab file.
+        """
+        with open(lab_file, 'r', newline='') as f_in:
+            for block in iter_blocks(f_in):
+                yield self._relabel(block, rule_hits)
+
+    def _convert_lab_stream(self, lab_file, writer=None, index_key=None):
+        """
+        Converts a large .lab file like convert_lab_file, in bounded memory.
 
-    def convert_directory(self, input_dir):
+        A first pass converts the file without keeping it to find out whether
+        it changes; a second pass converts it again while writing it.
+        """
+        metrics = get_metrics()
+        rule_hits = Counter()
+        entry = EntryBuilder() if index_key is not None else None
+        changes = 0
+        with metrics.time("convert"):
+            for piece, count in self._iter_relabeled(lab_file, rule_hits):
+                changes += count
+                if entry is not None:
+                    entry.add(parse_lab(piece))
+        metrics.count_rules("lab_phoneme_change", rule_hits)
+        if index_key is not None:
+            record_entry(index_key, entry.entry())
+        if not changes:
+            return False
+
+        def rewrite():
+            rewritten = 0
+            for piece, count in self._iter_relabeled(lab_file, Counter()):
+                rewritten += count
+                yield piece
+            if rewritten != changes:
+                raise ValueError(f"{lab_file} changed while it was converted")
+
+        with metrics.time("write"):
+            if writer is None:
+                atomic_write_text(lab_file, rewrite(), newline='')
+            else:
+                writer.write_text(lab_file, rewrite(), newline='')
+        metrics.count("rewritten")
+        return True
+
+    def convert_directory(self, input_dir, jobs=1, dry_run=False, batch_size=256, index_path=None):
         """
         Converts symbols in all .lab files within a directory and its subdirectories.
 
+        Rewrites are committed in fsynced batches and recorded in a journal in
+        input_dir. If a run is interrupted, the next run skips the files that
+        were already converted instead of converting them twice. The journal
+        records the converter map, and a run with a different map refuses to
+        resume it.
+
         Args:
             input_dir (str): Path to the input directory.
+            jobs (int): Number of worker processes (0 uses every CPU).
+            dry_run (bool): Only report which files would change.
+            batch_size (int): Rewrites per fsynced batch.
+            index_path (str, optional): Corpus index file to update with the converted files.
+
+        Returns:
+            list: (path, message, error) tuples sorted by path.
         """
-        lab_files = glob.glob(os.path.join(input_dir, '**/*.lab'), recursive=True)
-        for lab_file in lab_files:
-            print(f"Converting: {lab_file}")
-            self.convert_lab_file(lab_file)
+        journal = None if dry_run else os.path.join(input_dir, JOURNAL_NAME)
+        if journal:
+            writer = BatchWriter(journal=journal)
+            options_key = options_hash(converter_map=self.converter_map)
+            if writer.saved_options not in (None, options_key):
+                print(f"Error: {journal} belongs to a conversion with another converter map. "
+                      "Rerun it with that converter file, or delete the journal to start over.")
+                return []
+            if os.path.exists(journal):
+                print(f"Resuming interrupted conversion from {journal}")
+            if writer.saved_options is None:
+                writer.record_options(options_key)
+
+        with get_metrics().time("scan"):
+            lab_files = glob.glob(os.path.join(input_dir, '**/*.lab'), recursive=True)
+        index_root = input_dir if index_path else None
+        results = run_jobs(_convert_task, lab_files, jobs=jobs, initializer=_init_worker,
+                           initargs=(self, batch_size, dry_run, journal, index_root), finalizer=_flush_worker)
+        failures = print_results(results)
+        if index_path:
+            update_index(index_path, keys=[archive_key(input_dir, path) for path in lab_files])
+
+        if dry_run:
+            print(f"Dry run complete for directory: {input_dir}")
+            return results
+        if failures:
+            print(f"{failures} files failed; rerun to resume from {journal}")
+        else:
+            BatchWriter(journal=journal).close()
         print(f"Conversion complete for directory: {input_dir}")
+        return results
+
+_worker_converter = None
+_worker_writer = None
+_worker_index_root = None
+
+def _init_worker(converter, batch_size=256, dry_run=False, journal=None, index_root=None):
+    global _worker_converter, _worker_writer, _worker_index_root
+    _worker_converter = converter
+    _worker_writer = BatchWriter(batch_size, dry_run, journal)
+    _worker_index_root = index_root
+
+def _flush_worker():
+    with get_metrics().time("write"):
+        _worker_writer.flush()
+
+def _convert_task(lab_file):
+    if _worker_writer.is_done(("write", lab_file)):
+        return f"Already converted: {lab_file}"
+    index_key = archive_key(_worker_index_root, lab_file) if _worker_index_root is not None else None
+    changed = _worker_converter.convert_lab_file(lab_file, _worker_writer, index_key)
+    if _worker_writer.dry_run:
+        return f"Would convert: {lab_file}" if changed else f"Unchanged: {lab_file}"
+    return f"Converted: {lab_file}" if changed else f"Unchanged: {lab_file}"
 
 def main():
     """
@@ -87,11 +301,17 @@ def main():
     parser = argparse.ArgumentParser(description="Change symbols in .lab files.")
     parser.add_argument("-c", "--converter", required=True, help="Path to the converter .txt file")
     parser.add_argument("-i", "--input", required=True, help="Path to the input directory containing .lab files")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report which files would change without writing anything")
+    add_jobs_argument(parser)
+    add_metrics_arguments(parser)
+    add_index_argument(parser)
     args = parser.parse_args()
 
     try:
         converter = SymbolConverter(args.converter)
-        converter.convert_directory(args.input)
+        with instrument(args, "lab_phoneme_change"):
+            converter.convert_directory(args.input, jobs=args.jobs, dry_run=args.dry_run, index_path=args.index)
     except FileNotFoundError as e:
         print(f"Error: {e}")
     except Exception as e:
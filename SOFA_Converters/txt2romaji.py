@@ -1,251 +1,640 @@
 import os
+import re
+import sys
+import json
+import hashlib
 import argparse
-import pykakasi
+from collections import Counter
+from functools import partial
+from types import MappingProxyType
 
-def convert_japanese_to_romaji(text):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from daisy_common.cache import LRUCache, PersistentCache, default_cache_dir
+from daisy_common.jobs import add_jobs_argument, print_results, resolve_jobs
+from daisy_common.metrics import add_metrics_arguments, get_metrics, instrument
+from daisy_common.output import atomic_write_text
+from daisy_common.scan import DEFAULT_IO_THREADS, add_io_argument, decode_text, run_io_jobs, scan_files
+from daisy_common.stream import STREAM_THRESHOLD, iter_lines
+
+# Kana to Romaji table: one "kana,phonemes" line per entry
+ROMAJI_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "JP-ROMAJI.txt")
+
+# Consonant clusters to keep together (no internal spaces)
+CONSONANT_CLUSTERS = ["ky", "py", "by", "ny", "my", "fy", "hy", "gy", "dy", "ty", "vy", "zy", "ry"]
+
+# Character combinations to be treated like clusters (no spaces within)
+SPECIAL_COMBINATIONS = ["ch", "sh", "ts", "dh", "th", "vf", "hh", "jh", "ng", "cl"]
+
+class RomajiTable:
+    """
+    Kana to Romaji mapping compiled with the spacing rules.
+
+    The spaced phonemes of every entry are computed once, so text made of
+    mapped kana is converted by looking each kana up and emitting its
+    phonemes; only pykakasi output is spaced with the cluster rules. A table
+    is built once and not modified afterwards.
+    """
+
+    def __init__(self, mapping, consonant_clusters=None, special_combinations=None):
+        """
+        Compiles the table.
+
+        Args:
+            mapping (dict): Kana to Romaji (without spaces).
+            consonant_clusters (list, optional): Clusters kept together. Defaults to CONSONANT_CLUSTERS.
+            special_combinations (list, optional): Combinations kept together. Defaults to SPECIAL_COMBINATIONS.
+        """
+        self.mapping = MappingProxyType(dict(mapping))
+        self.consonant_clusters = tuple(CONSONANT_CLUSTERS if consonant_clusters is None else consonant_clusters)
+        self.special_combinations = tuple(SPECIAL_COMBINATIONS if special_combinations is None
+                                          else special_combinations)
+        groups = self.consonant_clusters + self.special_combinations
+        alternatives = [re.escape(group) for group in groups]
+        # Longest match first: the first alternative matching at a position is the longest key
+        keys = sorted(self.mapping, key=len, reverse=True)
+        self.kana_pattern = re.compile('|'.join(re.escape(key) for key in keys))
+        # Consonant clusters are tried first, then special combinations, then any single character
+        self.cluster_pattern = re.compile('|'.join(alternatives + ['.']), re.DOTALL)
+        # Reads the tokens back from spaced text: each token is followed by one space
+        self._token_pattern = re.compile('(' + '|'.join(alternatives + ['.']) + ') ?', re.DOTALL)
+        # A token crosses a boundary only if the character before it can start a group
+        # and the character after it can continue one
+        self._group_starts = frozenset(char for group in groups for char in group[:-1])
+        self._group_ends = frozenset(char for group in groups for char in group[1:])
+        self.window = max(map(len, groups), default=1)
+        # kana: (Romaji, spaced phonemes, whether nothing that follows can join its last phoneme)
+        self.entries = MappingProxyType({
+            kana: (romaji, self.space(romaji), romaji[-1:] not in self._group_starts)
+            for kana, romaji in self.mapping.items()
+        })
+
+    def __reduce__(self):
+        # Rebuilt from the plain tables, e.g. in worker processes
+        return RomajiTable, (dict(self.mapping), list(self.consonant_clusters), list(self.special_combinations))
+
+    def space(self, romaji):
+        """
+        Returns Romaji with spaces between its phonemes, keeping clusters and combinations together.
+        """
+        return ' '.join(self.cluster_pattern.findall(romaji))
+
+    def unspace(self, spaced):
+        """
+        Returns the Romaji of spaced text, undoing space().
+        """
+        return ''.join(self._token_pattern.findall(spaced))
+
+    def joins(self, left, right):
+        """
+        Returns True if the spaced texts left and right may not be spaced on
+        their own, because a cluster could span the two.
+        """
+        return left[-1:] in self._group_starts and right[:1] in self._group_ends
+
+    def settle(self, spaced):
+        """
+        Splits spaced text into the phonemes that no following text can change and the rest.
+
+        Returns:
+            tuple: (settled spaced text, spaced text still open to what follows).
+        """
+        tokens = self._token_pattern.findall(spaced)
+        end = len(tokens)
+        open_length = 0
+        # A phoneme is settled once it starts at least window characters before the end
+        while end and open_length < self.window:
+            end -= 1
+            open_length += len(tokens[end])
+        return ' '.join(tokens[:end]), ' '.join(tokens[end:])
+
+def parse_romaji_table(text, consonant_clusters=None, special_combinations=None):
+    """
+    Parses and validates the content of a Romaji table file.
+
+    Each non-empty line that does not start with '#' is "kana,phonemes", the
+    phonemes separated by single spaces. Every kana must be listed once, and
+    the phonemes must be split the way the cluster rules split their Romaji.
+
+    Args:
+        text (str): Content of the table file.
+        consonant_clusters (list, optional): Clusters kept together. Defaults to CONSONANT_CLUSTERS.
+        special_combinations (list, optional): Combinations kept together. Defaults to SPECIAL_COMBINATIONS.
+
+    Returns:
+        RomajiTable: The compiled table.
+
+    Raises:
+        ValueError: Listing every malformed line, duplicated or conflicting kana
+            and phoneme split that disagrees with the rules.
+    """
+    mapping = {}
+    phonemes = {}
+    errors = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(',')
+        if len(parts) != 2 or not parts[0].strip() or not parts[1].strip():
+            errors.append((number, f"expected 'kana,phonemes': {line}"))
+            continue
+        kana, spaced = parts[0].strip(), parts[1].strip()
+        romaji = spaced.replace(' ', '')
+        if kana in mapping:
+            kind = "duplicate" if mapping[kana] == romaji else "conflicting"
+            errors.append((number, f"{kind} entry for {kana} (first on line {phonemes[kana][0]})"))
+            continue
+        mapping[kana] = romaji
+        phonemes[kana] = (number, spaced)
+
+    table = RomajiTable(mapping, consonant_clusters, special_combinations)
+    for kana, (number, spaced) in phonemes.items():
+        expected = table.entries[kana][1]
+        if spaced != expected:
+            errors.append((number, f"phonemes of {kana} are split as '{spaced}', the rules give '{expected}'"))
+    if errors:
+        lines = "\n".join(f"  line {number}: {message}" for number, message in sorted(errors))
+        raise ValueError(f"{len(errors)} errors in the Romaji table:\n{lines}")
+    return table
+
+def load_romaji_table(path=ROMAJI_TABLE, consonant_clusters=None, special_combinations=None):
+    """
+    Loads and validates a Romaji table file (see parse_romaji_table).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_romaji_table(f.read(), consonant_clusters, special_combinations)
+
+_default_table = None
+
+def get_romaji_table():
+    """
+    Returns the table loaded from ROMAJI_TABLE, loading it on first use.
+    """
+    global _default_table
+    if _default_table is None:
+        _default_table = load_romaji_table()
+    return _default_table
+
+# Bump when the cached line format or the conversion algorithm changes
+ROMAJI_CACHE_VERSION = 3
+
+DEFAULT_CACHE_SIZE = 4096
+
+class RomajiConverter:
     """
     Converts Japanese text to Romaji using a custom mapping,
     forcing 'ん' to be 'N', and adding spaces between most characters,
     while keeping specific consonant clusters and character combinations together.
+
+    The compiled table (see RomajiTable) and the pykakasi converter are loaded
+    once, so a single converter can be reused for every file of a corpus. Lines are
+    memoized in a bounded LRU cache and, optionally, in a persistent cache
+    shared across runs.
+
+    By default each unmapped character is read on its own, like the original
+    script (東京 is 'h i g a sh i ky o u'). With word_readings, runs of
+    unmapped characters go to pykakasi in one call and kanji compounds get
+    their word readings (東京 is 't o u ky o u').
     """
 
-    custom_mapping = {
-        'あ': 'a',
-        'い': 'i',
-        'う': 'u',
-        'うぇ': 'we',
-        'うぃ': 'wi',
-        'え': 'e',
-        'お': 'o',
-        'か': 'ka',
-        'が': 'ga',
-        'き': 'ki',
-        'ぎ': 'gi',
-        'く': 'ku',
-        'ぐ': 'gu',
-        'け': 'ke',
-        'げ': 'ge',
-        'こ': 'ko',
-        'ご': 'go',
-        'さ': 'sa',
-        'ざ': 'za',
-        'し': 'shi',
-        'じ': 'ji',
-        'す': 'su',
-        'ず': 'zu',
-        'せ': 'se',
-        'ぜ': 'ze',
-        'そ': 'so',
-        'ぞ': 'zo',
-        'た': 'ta',
-        'だ': 'da',
-        'ち': 'chi',
-        'つ': 'tsu',
-        'て': 'te',
-        'で': 'de',
-        'と': 'to',
-        'ど': 'do',
-        'な': 'na',
-        'に': 'ni',
-        'ぬ': 'nu',
-        'ね': 'ne',
-        'の': 'no',
-        'は': 'ha',
-        'ば': 'ba',
-        'ぱ': 'pa',
-        'ひ': 'hi',
-        'び': 'bi',
-        'ぴ': 'pi',
-        'ふ': 'hu',
-        'ぶ': 'bu',
-        'ぷ': 'pu',
-        'へ': 'he',
-        'べ': 'be',
-        'ぺ': 'pe',
-        'ほ': 'ho',
-        'ぼ': 'bo',
-        'ぽ': 'po',
-        'ま': 'ma',
-        'み': 'mi',
-        'む': 'mu',
-        'め': 'me',
-        'も': 'mo',
-        'や': 'ya',
-        'ゆ': 'yu',
-        'よ': 'yo',
-        'ら': 'ra',
-        'り': 'ri',
-        'る': 'ru',
-        'れ': 're',
-        'ろ': 'ro',
-        'わ': 'wa',
-        'を': 'wo',
-        'ん': 'N',
-        'ヴぁ': 'va',
-        'ヴぃ': 'vi',
-        'ヴ': 'vu',
-        'ヴぇ': 've',
-        'ヴぉ': 'vo',
-        '・': 'cl',
-        "'": 'vf',
-        'っ': 'xtu',
-
-        # Combinations with small ya, yu, yo:
-        'きゃ': 'kya', 'きゅ': 'kyu', 'きょ': 'kyo',
-        'しゃ': 'sha', 'しゅ': 'shu', 'しょ': 'sho',
-        'ちゃ': 'cha', 'ちゅ': 'chu', 'ちょ': 'cho',
-        'にゃ': 'nya', 'にゅ': 'nyu', 'にょ': 'nyo',
-        'ひゃ': 'hya', 'ひゅ': 'hyu', 'ひょ': 'hyo',
-        'びゃ': 'bya', 'びゅ': 'byu', 'びょ': 'byo',
-        'ぴゃ': 'pya', 'ぴゅ': 'pyu', 'ぴょ': 'pyo',
-        'みゃ': 'mya', 'みゅ': 'myu', 'みょ': 'myo',
-        'りゃ': 'rya', 'りゅ': 'ryu', 'りょ': 'ryo',
-        'ぎゃ': 'gya', 'ぎゅ': 'gyu', 'ぎょ': 'gyo',
-        'じゃ': 'ja',  'じゅ': 'ju',  'じょ': 'jo',
-        'ぢゃ': 'ja',  'ぢゅ': 'ju',  'ぢょ': 'jo',
-        'びゃ': 'bya', 'びゅ': 'byu', 'びょ': 'byo',
-        'てゃ': 'tya', 'てゅ': 'tyu', 'てょ': 'tyo',
-        'ふゃ': 'fya', 'ふゅ': 'fyu', 'ふょ': 'fyo',
-
-        # Additional entries for small vowel combinations:
-        'つぁ': 'tsa', 'つぃ': 'tsi', 'つぇ': 'tse', 'つぉ': 'tso',
-        'ふぁ': 'fa', 'ふぃ': 'fi', 'ふぇ': 'fe', 'ふぉ': 'fo',
-        'じゃ': 'ja', 'じゅ': 'ju', 'じぇ': 'je', 'じょ': 'jo',
-        'ぢゃ': 'ja', 'ぢゅ': 'ju', 'じぇ': 'je', 'ぢょ': 'jo',
-
-        # Small vowel combinations for "by"
-        'びぇ': 'bye',
-
-        # Hiragana for "du", "di", "ti", "tu"
-        'どぅ': 'du', 'でぃ': 'di', 'てぃ': 'ti', 'とぅ': 'tu',
-
-        # Hiragana for "xye" sounds
-        'きぇ': 'kye',
-        'みぇ': 'mye',
-        'にぇ': 'nye',
-        'ぴぇ': 'pye',
-        'りぇ': 'rye',
-        'ぎぇ': 'gye',
-        'ひぇ': 'hye',
-        'びぇ': 'bye',
-        'てぇ': 'tye',
-        'ふぇ': 'fye',
-        
-        # Hiragana for "ye"
-        'いぇ': 'ye',
-
-        # Added replacements
-        'ずぃ': 'zi',  # Hiragana for "zi"
-        'しぇ': 'she', # Hiragana for "she"
-        'ちぇ': 'che', # Hiragana for "che"
-        'すぃ': 'si', # Hiragana for "si"
-        'ほぅ': 'hu', # Hiragana for "hu"
-        'わぅ': 'wu', # Hiragana for "wu"
-        'うぉ': 'wo', # Hiragana for "wo"
-    }
-   
-    # Consonant clusters to keep together (no internal spaces)
-    consonant_clusters = ["ky", "py", "by", "ny", "my", "fy", "hy", "gy", "dy", "ty", "vy", "zy", "ry"]
-
-    # Character combinations to be treated like clusters (no spaces within)
-    special_combinations = ["ch", "sh", "ts", "dh", "th", "vf", "hh", "jh", "ng", "cl"]
-
-    romaji_text = ""
-    i = 0
-    while i < len(text):
-        matched = False
-        # Prioritize longer combinations in custom_mapping
-        for j in range(3, 0, -1):  # Check for 3, 2, and 1 character combinations
-            if i + j <= len(text):
-                kana = text[i:i+j]
-                if kana in custom_mapping:
-                    romaji_text += custom_mapping[kana]
-                    i += j
-                    matched = True
-                    break
-        if matched:
-            continue
+    def __init__(self, custom_mapping=None, consonant_clusters=None, special_combinations=None,
+                 cache_size=DEFAULT_CACHE_SIZE, disk_cache=None, table=None, word_readings=False):
+        """
+        Initializes the converter with its mapping tables.
 
-        # If not in custom_mapping, use pykakasi (for Kanji, etc.)
-        kks = pykakasi.kakasi()
-        result = kks.convert(text[i:i + 1])
-        if result:
-            item = result[0]  # Assuming single character conversion
-            if item['orig'] == 'ん':
-                romaji_text += 'N'
+        Args:
+            custom_mapping (dict, optional): Kana to Romaji mapping. Defaults to the ROMAJI_TABLE entries.
+            consonant_clusters (list, optional): Clusters kept together. Defaults to CONSONANT_CLUSTERS.
+            special_combinations (list, optional): Combinations kept together. Defaults to SPECIAL_COMBINATIONS.
+            cache_size (int): Number of lines kept in the in-memory cache; 0 disables it.
+            disk_cache (str, optional): Path of a persistent line cache (SQLite). Entries
+                written with other mapping tables or pykakasi versions are dropped.
+            table (RomajiTable, optional): Compiled table to use instead of the three tables above.
+            word_readings (bool): Convert runs of unmapped characters in one pykakasi
+                call, for word readings of kanji compounds.
+        """
+        if table is None:
+            if custom_mapping is None and consonant_clusters is None and special_combinations is None:
+                table = get_romaji_table()
             else:
-                romaji_text += item['hepburn']
+                mapping = get_romaji_table().mapping if custom_mapping is None else custom_mapping
+                table = RomajiTable(mapping, consonant_clusters, special_combinations)
+        self.table = table
+        self.custom_mapping = table.mapping
+        self.consonant_clusters = list(table.consonant_clusters)
+        self.special_combinations = list(table.special_combinations)
+        self.word_readings = word_readings
+        self._kakasi = None
+        self._unmapped = {}
+        self._line_break = None
+        self._line_cache = LRUCache(cache_size) if cache_size > 0 else None
+        self._disk_cache = PersistentCache(disk_cache, self.table_version()) if disk_cache else None
+        self.cache_stats = Counter()
+
+    def table_version(self):
+        """
+        Returns a hash of everything that affects the Romaji of a line.
+        """
+        try:
+            from importlib.metadata import version
+            kakasi_version = version("pykakasi")
+        except Exception:
+            kakasi_version = None
+        tables = [ROMAJI_CACHE_VERSION, sorted(self.custom_mapping.items()),
+                  self.consonant_clusters, self.special_combinations, kakasi_version, self.word_readings]
+        return hashlib.sha256(json.dumps(tables, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def take_cache_stats(self):
+        """
+        Returns the cache hit/miss counts since the last call and resets them.
+        """
+        stats, self.cache_stats = self.cache_stats, Counter()
+        return stats
+
+    @property
+    def kakasi(self):
+        """The pykakasi converter, created on first use."""
+        if self._kakasi is None:
+            # Imported here so that importing this module stays cheap
+            import pykakasi
+            self._kakasi = pykakasi.kakasi()
+        return self._kakasi
+
+    def _convert_unmapped(self, run):
+        """
+        Converts a run of characters missing from custom_mapping with pykakasi.
+
+        Each character is converted on its own, as the original per-character
+        loop did, so kanji keep their single-character readings; the result
+        of each character is memoized. With word_readings, the whole run is
+        converted in one call instead.
+
+        Args:
+            run (str): Consecutive characters without a custom mapping.
+
+        Returns:
+            str: The Romaji for the run.
+        """
+        if self.word_readings and len(run) > 1:
+            result = self.kakasi.convert(run)
+            if not result:
+                return run
+            return ''.join('N' if item['orig'] == 'ん' else item['hepburn'] for item in result)
+
+        memo = self._unmapped
+        romaji = []
+        for char in run:
+            converted = memo.get(char)
+            if converted is None:
+                result = self.kakasi.convert(char)
+                if result:
+                    item = result[0]
+                    converted = 'N' if item['orig'] == 'ん' else item['hepburn']
+                else:
+                    # Handle cases where pykakasi can't convert (punctuation, etc.)
+                    converted = char
+                memo[char] = converted
+            romaji.append(converted)
+        return ''.join(romaji)
+
+    def convert(self, text):
+        """
+        Converts Japanese text to spaced Romaji.
+
+        Args:
+            text (str): The Japanese text.
+
+        Returns:
+            str: The Romaji text with spaces between phonemes.
+        """
+        # Lines are converted on their own (pykakasi mangles line breaks inside
+        # a run), so the spaced Romaji of each line can be memoized
+        if '\n' not in text:
+            return self._romanize_line(text).strip()
+        return ''.join(self.iter_convert(text.split('\n')))
+
+    def iter_convert(self, lines):
+        """
+        Converts text given line by line to spaced Romaji, piece by piece.
+
+        Joining the pieces gives convert('\n'.join(lines)), but only one line
+        and its Romaji are held at a time.
+
+        Args:
+            lines (iterable): The lines of the Japanese text, without line breaks.
+
+        Yields:
+            str: Consecutive pieces of the Romaji text.
+        """
+        return _strip_pieces(self._iter_spaced(lines))
+
+    def _iter_spaced(self, lines):
+        table = self.table
+        held = ''
+        separator = ''
+        line_break = None
+        for line in lines:
+            pieces = (self._romanize_line(line),) if line_break is None else (line_break, self._romanize_line(line))
+            line_break = self._romanize_line_break()
+            for piece in pieces:
+                if not piece:
+                    continue
+                if not held:
+                    held = piece
+                elif table.joins(held, piece):
+                    # A cluster may span the two lines: space them again as one text
+                    settled, held = table.settle(table.space(table.unspace(held) + table.unspace(piece)))
+                    if settled:
+                        yield separator + settled
+                        separator = ' '
+                else:
+                    yield separator + held
+                    separator = ' '
+                    held = piece
+        if held:
+            yield separator + held
+
+    def _romanize_line_break(self):
+        if self._line_break is None:
+            self._line_break = self.table.space(self._convert_unmapped('\n'))
+        return self._line_break
+
+    def _romanize_line(self, line):
+        """
+        Returns the spaced Romaji of a line, from the caches when possible.
+        """
+        if self._line_cache is not None:
+            romaji = self._line_cache.get(line)
+            if romaji is not None:
+                self.cache_stats["memory_hits"] += 1
+                return romaji
+
+        romaji = self._disk_cache.get(line) if self._disk_cache is not None else None
+        if romaji is not None:
+            self.cache_stats["disk_hits"] += 1
         else:
-            # Handle cases where pykakasi can't convert (punctuation, etc.)
-            romaji_text += text[i]
-        i += 1
-
-    # Add spaces between characters, but not within clusters or special combinations
-    spaced_romaji_text = ""
-    i = 0
-    while i < len(romaji_text):
-        cluster_found = False
-
-        # Check for consonant clusters first
-        for cluster in consonant_clusters:
-            if romaji_text.startswith(cluster, i):
-                spaced_romaji_text += cluster + " "
-                i += len(cluster)
-                cluster_found = True
-                break
-
-        # Then check for special character combinations
-        if not cluster_found:
-            for combination in special_combinations:
-                if romaji_text.startswith(combination, i):
-                    spaced_romaji_text += combination + " "
-                    i += len(combination)
-                    cluster_found = True
-                    break
-
-        if not cluster_found:
-            spaced_romaji_text += romaji_text[i] + " "
-            i += 1
-
-    return spaced_romaji_text.strip()
-    
-def process_file(filepath):
+            self.cache_stats["misses"] += 1
+            romaji = self._romanize_uncached(line)
+            if self._disk_cache is not None:
+                self._disk_cache.put(line, romaji)
+
+        if self._line_cache is not None:
+            self._line_cache.put(line, romaji)
+        return romaji
+
+    def _romanize_uncached(self, line):
+        """
+        Converts a line without line breaks to spaced Romaji.
+
+        Mapped kana emit their precomputed phonemes. pykakasi output, and
+        entries whose last phoneme could join what follows, are collected and
+        spaced with the cluster rules once the next entry closes them.
+        """
+        table = self.table
+        entries = table.entries
+        pieces = []
+        pending = ''
+        position = 0
+        # Longest match first: the alternation is ordered by descending key length
+        for match in table.kana_pattern.finditer(line):
+            start = match.start()
+            if start > position:
+                pending += self._convert_unmapped(line[position:start])
+            romaji, spaced, closed = entries[match.group()]
+            if pending:
+                pending += romaji
+                if closed:
+                    pieces.append(table.space(pending))
+                    pending = ''
+            elif closed:
+                pieces.append(spaced)
+            else:
+                pending = romaji
+            position = match.end()
+        if position < len(line):
+            pending += self._convert_unmapped(line[position:])
+        if pending:
+            pieces.append(table.space(pending))
+        return ' '.join(pieces)
+
+def _strip_pieces(pieces):
+    """
+    Yields pieces of text so that they join to the stripped joined text.
+    """
+    started = False
+    held = ''
+    for piece in pieces:
+        if not started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            started = True
+        text = held + piece
+        stripped = text.rstrip()
+        if stripped:
+            yield stripped
+        held = text[len(stripped):]
+
+_default_converter = None
+
+def get_converter():
+    """
+    Returns the process-wide RomajiConverter, creating it on first use.
+    """
+    global _default_converter
+    if _default_converter is None:
+        _default_converter = RomajiConverter()
+    return _default_converter
+
+def convert_japanese_to_romaji(text):
+    """
+    Converts Japanese text to Romaji using a custom mapping,
+    forcing 'ん' to be 'N', and adding spaces between most characters,
+    while keeping specific consonant clusters and character combinations together.
+    """
+    return get_converter().convert(text)
+
+def romanize_transcript(text, converter=None):
+    """
+    Converts transcript text to the Romaji written by process_file, with "SP" at both ends.
+
+    Args:
+        text (str): The Japanese transcript.
+        converter (RomajiConverter, optional): Converter to use. Defaults to the shared one.
+
+    Returns:
+        str: The converted transcript.
+    """
+    if converter is None:
+        converter = get_converter()
+    return "SP " + converter.convert(text) + " SP"
+
+def iter_romanize_transcript(lines, converter=None):
+    """
+    Like romanize_transcript, for a transcript given line by line; yields the result piece by piece.
+    """
+    if converter is None:
+        converter = get_converter()
+    yield "SP "
+    yield from converter.iter_convert(lines)
+    yield " SP"
+
+def stream_file(filepath, converter=None):
+    """
+    Converts a .txt file like process_file, reading and writing it line by line.
+
+    Memory use is bounded by the longest line, not the file size. The file is
+    replaced atomically, so a decoding error leaves it untouched.
+
+    Args:
+        filepath (str): Path to the .txt file.
+        converter (RomajiConverter, optional): Converter to use. Defaults to the shared one.
+
+    Returns:
+        str: A message describing what was done.
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            atomic_write_text(filepath, iter_romanize_transcript(iter_lines(f), converter), 'utf-8')
+    except UnicodeDecodeError:
+        return f"Skipped (likely not a text file or has incompatible encoding): {filepath}"
+    return f"Processed: {filepath}"
+
+def process_file(filepath, converter=None):
     """
     Reads a text file, converts Japanese text to Romaji with modifications,
-    and overwrites the file.
+    and overwrites the file. Files of at least STREAM_THRESHOLD bytes are
+    converted with stream_file.
+
+    Args:
+        filepath (str): Path to the .txt file.
+        converter (RomajiConverter, optional): Converter to use. Defaults to the shared one.
+
+    Returns:
+        str: A message describing what was done.
     """
+    if converter is None:
+        converter = get_converter()
+    if os.path.getsize(filepath) >= STREAM_THRESHOLD:
+        return stream_file(filepath, converter)
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
+    except UnicodeDecodeError:
+        return f"Skipped (likely not a text file or has incompatible encoding): {filepath}"
 
-        converted_content = convert_japanese_to_romaji(content)
+    final_content = romanize_transcript(content, converter)
 
-        # Add "SP" at the beginning and end
-        final_content = "SP " + converted_content + " SP"
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(final_content)
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(final_content)
+    return f"Processed: {filepath}"
 
-        print(f"Processed: {filepath}")
+def _init_worker(converter):
+    # Runs in each pool worker process, where the converter becomes the default
+    global _default_converter
+    _default_converter = converter
 
+def _convert_task(filepath, data, converter=None):
+    if converter is None:
+        converter = get_converter()
+    metrics = get_metrics()
+    try:
+        with metrics.time("parse"):
+            content = decode_text(data, 'utf-8')
     except UnicodeDecodeError:
-        print(f"Skipped (likely not a text file or has incompatible encoding): {filepath}")
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
+        return f"Skipped (likely not a text file or has incompatible encoding): {filepath}", []
+    with metrics.time("convert"):
+        final_content = romanize_transcript(content, converter)
+    _count_cache_stats(metrics, converter)
+    return f"Processed: {filepath}", [(filepath, final_content, 'utf-8')]
+
+def _stream_task(filepath, converter=None):
+    if converter is None:
+        converter = get_converter()
+    metrics = get_metrics()
+    with metrics.time("convert"):
+        message = stream_file(filepath, converter)
+    _count_cache_stats(metrics, converter)
+    return message
+
+def _count_cache_stats(metrics, converter):
+    for name, count in converter.take_cache_stats().items():
+        metrics.count(f"romaji_cache_{name}", count)
+
+def format_cache_stats(counters):
+    """
+    Formats the line cache hit/miss counters of a run for the end-of-run report.
+    """
+    memory_hits = counters["romaji_cache_memory_hits"]
+    disk_hits = counters["romaji_cache_disk_hits"]
+    misses = counters["romaji_cache_misses"]
+    lookups = memory_hits + disk_hits + misses
+    rate = (memory_hits + disk_hits) / lookups if lookups else 0.0
+    return (f"Romaji cache: {memory_hits} memory hits, {disk_hits} disk hits, "
+            f"{misses} misses ({rate:.1%} hit rate)")
+
+def convert_txt_files(txt_files, jobs=1, fs=None, io_threads=DEFAULT_IO_THREADS, converter=None):
+    """
+    Converts the given .txt files to Romaji in place.
+
+    Args:
+        txt_files (list): Paths of the .txt files.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of reads and writes in flight.
+        converter (RomajiConverter, optional): Converter to use. Defaults to the shared one.
+
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    if converter is None:
+        converter = get_converter()
+    if resolve_jobs(jobs) == 1:
+        # Converted in this process: pass the converter rather than replacing the default one
+        return run_io_jobs(partial(_convert_task, converter=converter), txt_files, jobs=1, fs=fs,
+                           threads=io_threads, stream=partial(_stream_task, converter=converter))
+    return run_io_jobs(_convert_task, txt_files, jobs=jobs, initializer=_init_worker,
+                       initargs=(converter,), fs=fs, threads=io_threads, stream=_stream_task)
 
-def process_folder(folder_path):
+def process_folder(folder_path, jobs=1, fs=None, io_threads=DEFAULT_IO_THREADS, converter=None):
     """
     Recursively processes all .txt files in a folder and its subfolders.
+
+    Args:
+        folder_path (str): Folder containing .txt files.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of directory listings, reads and writes in flight.
+        converter (RomajiConverter, optional): Converter to use. Defaults to the shared one.
+
+    Returns:
+        list: (path, message, error) tuples sorted by path.
     """
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.endswith('.txt'):
-                filepath = os.path.join(root, file)
-                process_file(filepath)
+    txt_files = scan_files(folder_path, '.txt', fs, io_threads)
+
+    metrics = get_metrics()
+    before = metrics.counters.copy()
+    results = convert_txt_files(txt_files, jobs, fs, io_threads, converter)
+    print_results(results)
+    print(format_cache_stats(metrics.counters - before))
+    return results
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert Japanese text in .txt files to Romaji.")
     parser.add_argument("-i", "--input", required=True, help="Path to the folder containing .txt files")
+    parser.add_argument("--table", default=ROMAJI_TABLE,
+                        help="Kana to Romaji table file (kana,phonemes lines). Default: JP-ROMAJI.txt.")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"Lines kept in the in-memory Romaji cache (0 disables it). Default: {DEFAULT_CACHE_SIZE}.")
+    parser.add_argument("--disk-cache", action="store_true",
+                        help="Also keep converted lines in a persistent cache shared across runs.")
+    parser.add_argument("--word-readings", action="store_true",
+                        help="Read kanji compounds as words (東京 as 'toukyou') instead of character "
+                             "by character like the original script ('higashikyou').")
+    add_jobs_argument(parser)
+    add_io_argument(parser)
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
     input_folder = args.input
@@ -253,5 +642,14 @@ if __name__ == "__main__":
     if not os.path.isdir(input_folder):
         print(f"Error: Input folder '{input_folder}' not found.")
     else:
-        process_folder(input_folder)
-        print("Romaji conversion complete!")
\ No newline at end of file
+        try:
+            table = load_romaji_table(args.table)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        disk_cache = os.path.join(default_cache_dir(), "romaji.sqlite3") if args.disk_cache else None
+        converter = RomajiConverter(cache_size=args.cache_size, disk_cache=disk_cache, table=table,
+                                    word_readings=args.word_readings)
+        with instrument(args, "txt2romaji"):
+            process_folder(input_folder, jobs=args.jobs, io_threads=args.io_threads, converter=converter)
+        print("Romaji conversion complete!")
@@ -0,0 +1,101 @@
+"""
+Benchmark the concurrent scanning and I/O layer against a slow file system.
+
+LatencyFileSystem stands in for an NFS mount: every directory listing, read,
+write and mkdir sleeps for a fixed latency before hitting the local disk.
+The same corpus is converted with textgrid2seg and lab2seg at several
+--io-threads values; one thread is the old serial behaviour.
+
+Usage:
+    python benchmarks/bench_io.py --files 400 --latency 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "MFA_Converters"), os.path.join(ROOT, "SOFA_Converters"),
+                os.path.dirname(os.path.abspath(__file__))]
+
+import lab2seg
+import textgrid2seg
+from corpus import write_textgrids
+from daisy_common.scan import LocalFileSystem
+
+class LatencyFileSystem(LocalFileSystem):
+    """
+    A local file system that waits `latency` seconds before every operation.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.operations = 0
+
+    def _wait(self):
+        self.operations += 1
+        time.sleep(self.latency)
+
+    def scandir(self, path):
+        self._wait()
+        return super().scandir(path)
+
+    def read_bytes(self, path):
+        self._wait()
+        return super().read_bytes(path)
+
+    def size(self, path):
+        self._wait()
+        return super().size(path)
+
+    def write_text(self, path, text, encoding=None):
+        self._wait()
+        super().write_text(path, text, encoding)
+
+    def makedirs(self, path):
+        self._wait()
+        super().makedirs(path)
+
+def time_run(run, fs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run(fs)
+    elapsed = time.perf_counter() - start
+    failures = sum(1 for _, _, error in results if error is not None)
+    if failures:
+        raise RuntimeError(f"{failures} files failed")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scanning and I/O on a latency-injecting file system.")
+    parser.add_argument("--files", type=int, default=400, help="Number of TextGrids.")
+    parser.add_argument("--subdirs", type=int, default=20, help="Number of speaker folders.")
+    parser.add_argument("--latency", type=float, default=5.0, help="Latency per file system operation in ms.")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 64], help="--io-threads values to compare.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for the conversion.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        textgrid_dir = os.path.join(directory, "textgrid")
+        write_textgrids(textgrid_dir, args.files, subdirs=args.subdirs)
+        print(f"corpus: {args.files} TextGrids in {args.subdirs} folders, {args.latency:.1f} ms per operation")
+
+        for threads in args.threads:
+            lab_dir = os.path.join(directory, f"lab{threads}")
+            seg_dir = os.path.join(directory, f"seg{threads}")
+            fs = LatencyFileSystem(args.latency / 1000)
+            pipeline = time_run(lambda fs: textgrid2seg.run_pipeline(
+                textgrid_dir, lab_dir=lab_dir, jobs=args.jobs, fs=fs, io_threads=threads), fs)
+            lab = time_run(lambda fs: lab2seg.convert_lab_to_seg(
+                lab_dir, seg_dir, jobs=args.jobs, fs=fs, io_threads=threads), fs)
+            print(f"io-threads {threads:3d}: textgrid2seg {args.files / pipeline:8.1f} files/s, "
+                  f"lab2seg {args.files / lab:8.1f} files/s ({fs.operations} operations)")
+            shutil.rmtree(lab_dir)
+            shutil.rmtree(seg_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark the txt2romaji line caches on a corpus with repeated lyric lines.
+
+Compares an uncached converter, the in-memory LRU cache, and a fresh
+process reading a warm persistent cache, and prints the hit statistics.
+
+Usage:
+    python benchmarks/bench_romaji_cache.py --files 2000 --unique-lines 300
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "SOFA_Converters"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import txt2romaji
+from corpus import write_transcripts
+
+def time_folder(converter, source_dir, work_dir):
+    """
+    Converts a copy of the corpus with process_folder.
+
+    Returns:
+        tuple: (files per second, cache report line)
+    """
+    file_names = os.listdir(source_dir)
+    os.makedirs(work_dir)
+    for file_name in file_names:
+        with open(os.path.join(source_dir, file_name), 'rb') as src:
+            with open(os.path.join(work_dir, file_name), 'wb') as dst:
+                dst.write(src.read())
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        txt2romaji.process_folder(work_dir, converter=converter)
+    elapsed = time.perf_counter() - start
+    return len(file_names) / elapsed, output.getvalue().splitlines()[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the txt2romaji line caches.")
+    parser.add_argument("--files", type=int, default=2000, help="Number of transcripts.")
+    parser.add_argument("--unique-lines", type=int, default=300, help="Distinct lyric lines in the corpus.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "corpus")
+        write_transcripts(source_dir, args.files, unique_lines=args.unique_lines)
+        disk_cache = os.path.join(tmp, "romaji.sqlite3")
+
+        runs = [
+            ("uncached", txt2romaji.RomajiConverter(cache_size=0)),
+            ("memory LRU", txt2romaji.RomajiConverter()),
+            ("disk, cold", txt2romaji.RomajiConverter(cache_size=0, disk_cache=disk_cache)),
+            ("disk, warm", txt2romaji.RomajiConverter(cache_size=0, disk_cache=disk_cache)),
+        ]
+        outputs = []
+        print(f"corpus: {args.files} files, {args.unique_lines} distinct lines")
+        for index, (name, converter) in enumerate(runs):
+            work_dir = os.path.join(tmp, f"run{index}")
+            rate, report = time_folder(converter, source_dir, work_dir)
+            outputs.append(sorted((file_name, open(os.path.join(work_dir, file_name), encoding='utf-8').read())
+                                  for file_name in os.listdir(work_dir)))
+            print(f"{name:<11} {rate:10.1f} files/sec  {report}")
+
+    if any(output != outputs[0] for output in outputs):
+        print("FAIL: cached runs produced different output")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Micro-benchmark and regression check for the txt2romaji tokenizer.
+
+`legacy_convert` is the previous slicing implementation: longest match by
+hashing text[i:i+j] for each j, a startswith() scan over every cluster, and
+output built by string concatenation. The compiled-pattern converter must
+produce byte-identical output on the regression corpus.
+
+Usage:
+    python benchmarks/bench_romaji_tokenizer.py --lines 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "SOFA_Converters"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import txt2romaji
+from corpus import random_transcript
+
+def legacy_convert(converter, text):
+    """
+    Reference implementation of RomajiConverter.convert before the compiled patterns.
+    """
+    romaji_text = ""
+    run_start = None
+    i = 0
+    while i < len(text):
+        kana = None
+        for j in range(3, 0, -1):
+            if i + j <= len(text) and text[i:i + j] in converter.custom_mapping:
+                kana = text[i:i + j]
+                break
+        if kana is None and text[i] != '\n':
+            if run_start is None:
+                run_start = i
+            i += 1
+            continue
+        if run_start is not None:
+            romaji_text += converter._convert_unmapped(text[run_start:i])
+            run_start = None
+        if kana is None:
+            romaji_text += converter._convert_unmapped(text[i])
+            i += 1
+        else:
+            romaji_text += converter.custom_mapping[kana]
+            i += len(kana)
+    if run_start is not None:
+        romaji_text += converter._convert_unmapped(text[run_start:])
+
+    spaced_romaji_text = ""
+    i = 0
+    while i < len(romaji_text):
+        for cluster in converter.consonant_clusters + converter.special_combinations:
+            if romaji_text.startswith(cluster, i):
+                spaced_romaji_text += cluster + " "
+                i += len(cluster)
+                break
+        else:
+            spaced_romaji_text += romaji_text[i] + " "
+            i += 1
+    return spaced_romaji_text.strip()
+
+def regression_corpus(lines, seed=0):
+    """
+    Builds lyric lines plus random sequences over every mapping key and edge characters.
+    """
+    rng = random.Random(seed)
+    alphabet = list(txt2romaji.get_romaji_table().mapping) + ["、", "。", " ", "\n", "　", "ー", "x", "n", "y"]
+    corpus = ["", "\n", "ん", "っ", "'", "・", "んや", "漢字\nかな"]
+    for index in range(lines):
+        if index % 2:
+            corpus.append(random_transcript(rng))
+        else:
+            corpus.append("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 20))))
+    return corpus
+
+def time_converter(convert, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            convert(text)
+    return (time.perf_counter() - start) / (repeat * len(corpus))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the txt2romaji tokenizer.")
+    parser.add_argument("--lines", type=int, default=2000, help="Number of regression lines.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions.")
+    args = parser.parse_args()
+
+    converter = txt2romaji.RomajiConverter(cache_size=0)
+    corpus = regression_corpus(args.lines)
+
+    mismatches = [text for text in corpus if converter.convert(text) != legacy_convert(converter, text)]
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} lines differ from the legacy tokenizer, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+    print(f"regression: {len(corpus)} lines byte-identical")
+
+    legacy = time_converter(lambda text: legacy_convert(converter, text), corpus, args.repeat)
+    compiled = time_converter(converter.convert, corpus, args.repeat)
+    print(f"legacy tokenizer:   {legacy * 1e6:8.1f} us/line")
+    print(f"compiled tokenizer: {compiled * 1e6:8.1f} us/line")
+    print(f"speedup: {legacy / compiled:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Startup-time benchmark for every converter entry point.
+
+For each module this measures, in fresh interpreters:
+- `import`: importing the module, the cost an embedding caller pays once;
+- `--help`: launching the script, the floor of every subprocess call;
+and lists which heavy dependencies the import pulled in. It then compares
+one subprocess launch per utterance with calling the in-memory API.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MFA_DIR = os.path.join(ROOT, "MFA_Converters")
+SOFA_DIR = os.path.join(ROOT, "SOFA_Converters")
+sys.path[:0] = [ROOT, MFA_DIR, SOFA_DIR, os.path.dirname(os.path.abspath(__file__))]
+
+# (module, script path)
+ENTRY_POINTS = [
+    ("lab2seg", os.path.join(ROOT, "lab2seg.py")),
+    ("textgrid2seg", os.path.join(ROOT, "textgrid2seg.py")),
+    ("textgrid2lab", os.path.join(MFA_DIR, "textgrid2lab.py")),
+    ("lab_phoneme_change", os.path.join(SOFA_DIR, "lab_phoneme_change.py")),
+    ("gen_trans", os.path.join(SOFA_DIR, "gen_trans.py")),
+    ("txt2romaji", os.path.join(SOFA_DIR, "txt2romaji.py")),
+]
+
+HEAVY_MODULES = ["pykakasi", "mytextgrid", "numpy", "multiprocessing"]
+
+def time_command(command, repeat, cwd=ROOT):
+    """
+    Returns the median wall time of running command in a fresh process.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def import_command(module, code=""):
+    path_setup = f"import sys; sys.path[:0] = {[ROOT, MFA_DIR, SOFA_DIR]!r}; "
+    return [sys.executable, "-c", path_setup + f"import {module}; " + code]
+
+def loaded_heavy_modules(module):
+    """
+    Returns the heavy dependencies imported by module.
+    """
+    code = f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    output = subprocess.run(import_command(module, code), cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return output.split()
+
+def bench_pipeline_call(repeat):
+    """
+    Times textgrid2lab on one utterance: one subprocess launch versus the in-memory API.
+    """
+    import textgrid2lab
+    from corpus import random_textgrid
+    import random
+
+    text = random_textgrid(random.Random(0))
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "utt.TextGrid"), "w", encoding="utf-8") as f:
+            f.write(text)
+        converter_path = os.path.join(directory, "converter.txt")
+        with open(converter_path, "w", encoding="utf-8") as f:
+            f.write("a i,ai\n")
+        command = [sys.executable, os.path.join(MFA_DIR, "textgrid2lab.py"), "-c", converter_path]
+        subprocess_time = time_command(command, repeat, cwd=directory)
+
+    converter = textgrid2lab.parse_converter("a i,ai\n")
+    start = time.perf_counter()
+    for _ in range(repeat * 100):
+        textgrid2lab.textgrid_text_to_lab(text, converter)
+    in_memory_time = (time.perf_counter() - start) / (repeat * 100)
+    return subprocess_time, in_memory_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark converter startup times.")
+    parser.add_argument("--repeat", type=int, default=5, help="Launches per measurement.")
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, "-c", "pass"], args.repeat)
+    print(f"bare interpreter: {baseline * 1000:7.1f} ms")
+    print(f"{'entry point':<20} {'import':>9} {'--help':>9}  heavy imports")
+    for module, script in ENTRY_POINTS:
+        import_time = time_command(import_command(module), args.repeat)
+        help_time = time_command([sys.executable, script, "--help"], args.repeat)
+        heavy = ", ".join(loaded_heavy_modules(module)) or "-"
+        print(f"{module:<20} {import_time * 1000:6.1f} ms {help_time * 1000:6.1f} ms  {heavy}")
+
+    subprocess_time, in_memory_time = bench_pipeline_call(args.repeat)
+    print(f"textgrid2lab, one utterance: subprocess {subprocess_time * 1000:.1f} ms, "
+          f"in-memory {in_memory_time * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Benchmark every converter entry point on synthetic corpora of several sizes.
+
+For each scale a corpus is generated once (TextGrids with words/phones tiers,
+.lab files in 100ns ticks, kana/kanji transcripts and a wav folder tree), then
+each entry point is timed on it. Converters that rewrite files in place get a
+fresh copy of the corpus per run; copying is not timed. The results, with the
+stage timers and counters from daisy_common.metrics, are written as JSON so
+runs of different commits can be compared with --compare.
+
+Usage:
+    python benchmarks/bench_suite.py --scales 1000 10000 100000
+    python benchmarks/bench_suite.py --scales 1000 --compare bench-abc1234.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "MFA_Converters"), os.path.join(ROOT, "SOFA_Converters"),
+                os.path.dirname(os.path.abspath(__file__))]
+
+import gen_trans
+import lab2seg
+import textgrid2lab
+import txt2romaji
+from corpus import write_labs, write_textgrids, write_transcripts, write_wav_tree
+from daisy_common.metrics import get_metrics
+from lab_phoneme_change import SymbolConverter
+
+TEXTGRID_CONVERTER = os.path.join(ROOT, "MFA_Converters", "JP-VOCALOID.txt")
+SYMBOL_CONVERTER = os.path.join(ROOT, "SOFA_Converters", "JP-VOCALOID.txt")
+
+def _textgrid_to_lab(corpus_dir, work_dir, jobs):
+    # process_files scans the working directory, like the CLI
+    cwd = os.getcwd()
+    os.chdir(corpus_dir)
+    try:
+        return textgrid2lab.process_files(TEXTGRID_CONVERTER, output_dir=work_dir, jobs=jobs)
+    finally:
+        os.chdir(cwd)
+
+def _symbol_convert(corpus_dir, work_dir, jobs):
+    SymbolConverter(SYMBOL_CONVERTER).convert_directory(work_dir, jobs=jobs)
+
+def _process_directory(corpus_dir, work_dir, jobs):
+    gen_trans.process_directory(work_dir)
+
+# name: (corpus, in place, run(corpus_dir, work_dir, jobs))
+ENTRY_POINTS = {
+    "convert_lab_to_seg": ("lab", False, lambda corpus_dir, work_dir, jobs:
+                           lab2seg.convert_lab_to_seg(corpus_dir, work_dir, jobs=jobs)),
+    "textgrid_to_lab": ("textgrid", False, _textgrid_to_lab),
+    "convert_japanese_to_romaji": ("txt", True, lambda corpus_dir, work_dir, jobs:
+                                   txt2romaji.process_folder(work_dir, jobs=jobs,
+                                                             converter=txt2romaji.RomajiConverter(cache_size=0))),
+    "SymbolConverter.convert_directory": ("lab", True, _symbol_convert),
+    "process_directory": ("wav", True, _process_directory),
+}
+
+CORPORA = {
+    "textgrid": lambda directory, count, subdirs: write_textgrids(directory, count, subdirs=subdirs),
+    "lab": lambda directory, count, subdirs: write_labs(directory, count, subdirs=subdirs),
+    "txt": lambda directory, count, subdirs: write_transcripts(directory, count),
+    "wav": lambda directory, count, subdirs: write_wav_tree(directory, count, subdirs=subdirs),
+}
+
+def git_revision():
+    """
+    Returns (commit, dirty) of the working tree, or ("unknown", None) outside git.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", None
+    return commit, bool(status.strip())
+
+def time_entry_point(run, corpus_dir, work_dir, in_place, jobs):
+    """
+    Times one run of an entry point.
+
+    Returns:
+        tuple: (seconds, Metrics recorded during the run)
+    """
+    if in_place:
+        shutil.copytree(corpus_dir, work_dir)
+    get_metrics().take()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(corpus_dir, work_dir, jobs)
+    elapsed = time.perf_counter() - start
+    metrics = get_metrics().take()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    if metrics.counters["failed"]:
+        raise RuntimeError(f"{metrics.counters['failed']} files failed")
+    return elapsed, metrics
+
+def run_suite(scales, entry_points, jobs=1, repeat=1, subdirs=20, log=print):
+    """
+    Generates a corpus per scale and times every entry point on it.
+
+    Args:
+        scales (list): Corpus sizes in files.
+        entry_points (list): Names from ENTRY_POINTS.
+        jobs (int): Worker processes passed to the entry points.
+        repeat (int): Runs per entry point; the fastest one is kept.
+        subdirs (int): Speaker folders per corpus.
+        log (callable): Receives one progress line per result.
+
+    Returns:
+        list: One result dict per (scale, entry point).
+    """
+    results = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpora = {}
+            for name in entry_points:
+                kind = ENTRY_POINTS[name][0]
+                if kind not in corpora:
+                    corpora[kind] = os.path.join(tmp, kind)
+                    start = time.perf_counter()
+                    CORPORA[kind](corpora[kind], scale, subdirs)
+                    log(f"generated {scale} {kind} files in {time.perf_counter() - start:.1f}s")
+
+            for name in entry_points:
+                kind, in_place, run = ENTRY_POINTS[name]
+                best = None
+                for _ in range(repeat):
+                    elapsed, metrics = time_entry_point(run, corpora[kind], os.path.join(tmp, "work"), in_place, jobs)
+                    if best is None or elapsed < best[0]:
+                        best = (elapsed, metrics)
+                elapsed, metrics = best
+                result = {"entry_point": name, "scale": scale, "seconds": round(elapsed, 6),
+                          "files_per_second": round(scale / elapsed, 3)}
+                result.update(metrics.to_dict())
+                results.append(result)
+                log(f"{scale:>7} {name:<34} {elapsed:9.3f}s {scale / elapsed:10.1f} files/s")
+    return results
+
+def compare(results, baseline):
+    """
+    Prints the throughput of results relative to a baseline results file.
+    """
+    previous = {(result["entry_point"], result["scale"]): result for result in baseline["results"]}
+    print(f"compared with {baseline['commit']}:")
+    for result in results:
+        old = previous.get((result["entry_point"], result["scale"]))
+        if old is None:
+            continue
+        ratio = result["files_per_second"] / old["files_per_second"]
+        print(f"{result['scale']:>7} {result['entry_point']:<34} {old['files_per_second']:10.1f} -> "
+              f"{result['files_per_second']:10.1f} files/s ({ratio:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the converter entry points on synthetic corpora.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000], help="Corpus sizes in files.")
+    parser.add_argument("--entry-points", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS),
+                        help="Entry points to time. Default: all.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes passed to the entry points.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per entry point; the fastest is kept.")
+    parser.add_argument("--subdirs", type=int, default=20, help="Speaker folders per corpus.")
+    parser.add_argument("-o", "--output", help="JSON results file. Default: bench-<commit>.json.")
+    parser.add_argument("--compare", help="Results file of an earlier run to compare against.")
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    results = run_suite(args.scales, args.entry_points, jobs=args.jobs, repeat=args.repeat, subdirs=args.subdirs)
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "jobs": args.jobs,
+        "results": results,
+    }
+    output = args.output or f"bench-{commit}{'-dirty' if dirty else ''}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark txt2romaji on a synthetic transcript corpus.
+
+Compares the shared RomajiConverter against the previous behaviour, which
+created a new pykakasi converter for every character missing from the custom
+mapping.
+
+Usage:
+    python benchmarks/bench_txt2romaji.py --files 500
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "SOFA_Converters"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pykakasi
+import txt2romaji
+from corpus import write_transcripts
+
+class PerCharacterConverter(txt2romaji.RomajiConverter):
+    """
+    Reproduces the old cost model: one pykakasi instance per unmapped character.
+    """
+
+    def _convert_unmapped(self, run):
+        romaji = ""
+        for char in run:
+            result = pykakasi.kakasi().convert(char)
+            romaji += result[0]['hepburn'] if result else char
+        return romaji
+
+def time_corpus(converter, source_dir, work_dir):
+    """
+    Copies the corpus into work_dir and converts every file in place.
+
+    Returns:
+        float: Files per second.
+    """
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    shutil.copytree(source_dir, work_dir)
+    paths = sorted(os.path.join(work_dir, name) for name in os.listdir(work_dir))
+    start = time.perf_counter()
+    for path in paths:
+        txt2romaji.process_file(path, converter)
+    elapsed = time.perf_counter() - start
+    return len(paths) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark txt2romaji on a synthetic corpus.")
+    parser.add_argument("--files", type=int, default=500, help="Number of synthetic transcripts.")
+    parser.add_argument("--kanji-ratio", type=float, default=0.3, help="Probability of a kanji word per token.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "corpus")
+        write_transcripts(source_dir, args.files, kanji_ratio=args.kanji_ratio)
+
+        # Uncached, so the comparison measures the conversion itself (see bench_romaji_cache.py)
+        before = time_corpus(PerCharacterConverter(cache_size=0), source_dir, os.path.join(tmp, "before"))
+        after = time_corpus(txt2romaji.RomajiConverter(cache_size=0), source_dir, os.path.join(tmp, "after"))
+        words = time_corpus(txt2romaji.RomajiConverter(cache_size=0, word_readings=True), source_dir,
+                            os.path.join(tmp, "words"))
+
+    print(f"files: {args.files}")
+    print(f"before (pykakasi per character): {before:10.1f} files/sec")
+    print(f"after  (shared converter):       {after:10.1f} files/sec")
+    print(f"word readings (one call per run):{words:10.1f} files/sec")
+    print(f"speedup: {after / before:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Check every converter against golden outputs and minimum throughputs.
+
+The fixture corpus in benchmarks/regression/inputs holds the cases the
+converters must keep byte for byte: TextGrids with empty intervals (written
+as 'pau'), IPA and multi-phone rules, uppercase labels with stress digits,
+float-accumulated boundaries, times just below a tick and an interval
+shorter than a tick, the short format and UTF-16 with CRLF; .lab files with
+R/pau silences (renamed to Sil by lab2seg), irregular spacing, CRLF,
+malformed and zero-length lines, ticks halfway between microseconds and
+every lab_phoneme_change symbol;
+kana, kanji, small-tsu and multi-line transcripts.
+
+The files in benchmarks/regression/golden are the outputs of the original
+scripts (the baseline commit of this repository), not of the current code.
+Each converter is checked in memory (textgrid_to_lab, lab_text_to_seg,
+convert_japanese_to_romaji, SymbolConverter.convert_text) and through its
+directory function (convert_textgrid_files, convert_lab_to_seg,
+process_folder, SymbolConverter.convert_directory) against them, except for
+the outputs listed in DEVIATIONS: those differ from the baseline on purpose,
+each because of the request named there, and are checked against the files
+in benchmarks/regression/deviations instead. Each converter is then timed in
+memory on the fixtures and must reach MIN_FILES_PER_SECOND, so a performance
+regression fails the check like a changed output does.
+
+An output change is accepted by listing it in DEVIATIONS, with its request
+and reason, and rewriting the deviation files with --update; review their
+diff before committing them. --baseline regenerates the golden files by
+running the scripts of a baseline checkout on the fixtures.
+
+Usage:
+    python benchmarks/check_regression.py
+    python benchmarks/check_regression.py --jobs 2 --speed-factor 0.5
+    python benchmarks/check_regression.py --update
+    git worktree add /tmp/baseline <baseline commit>
+    python benchmarks/check_regression.py --baseline /tmp/baseline
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "MFA_Converters"), os.path.join(ROOT, "SOFA_Converters")]
+
+import lab2seg
+import lab_phoneme_change
+import textgrid2lab
+import txt2romaji
+
+REGRESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regression")
+INPUT_DIR = os.path.join(REGRESSION_DIR, "inputs")
+GOLDEN_DIR = os.path.join(REGRESSION_DIR, "golden")
+DEVIATION_DIR = os.path.join(REGRESSION_DIR, "deviations")
+
+# textgrid2lab rule files: the shipped IPA table and multi-phone sequences
+TEXTGRID_RULES = {
+    "JP-VOCALOID": os.path.join(ROOT, "MFA_Converters", "JP-VOCALOID.txt"),
+    "multi_rules": os.path.join(INPUT_DIR, "multi_rules.txt"),
+}
+SYMBOL_CONVERTER = os.path.join(ROOT, "SOFA_Converters", "JP-VOCALOID.txt")
+
+_SHORT_FORMAT = ("user-005: short-format TextGrids are read; the baseline (mytextgrid) failed on them "
+                 "and wrote nothing")
+_LABEL_COLUMN = ("user-021: only the label column is rewritten, so spacing, CRLF line endings and the final "
+                 "line break are kept; the baseline rejoined the fields with single spaces, wrote LF, doubled "
+                 "the line break after lines of fewer than three fields and dropped the final line break")
+_FINAL_LINE_BREAK = ("user-021: only the label column is rewritten, so the final line break is kept; the "
+                     "baseline dropped it")
+_TICK_ROUNDING = ("user-018: TextGrid times are rounded half away from zero to ticks, so 0.7999999999999999 is "
+                  "8000000 where the baseline truncated it to 7999999; an interval that rounds to zero length "
+                  "(0.8999999999999999 to 0.9) keeps one tick and the next interval starts after it")
+_SEG_ROUNDING = ("user-018: .seg times are rounded from the integer ticks, half away from zero, so 563565 is "
+                 "0.056357 where the baseline printed the float 0.0563565 as 0.056356")
+
+# (check name, output file) to the request that changed the output from the
+# baseline, and how. The expected output is in DEVIATION_DIR.
+DEVIATIONS = {
+    ("textgrid2lab JP-VOCALOID", "short_format.lab"): _SHORT_FORMAT,
+    ("textgrid2lab multi_rules", "short_format.lab"): _SHORT_FORMAT,
+    ("textgrid2lab JP-VOCALOID", "rounding.lab"): _TICK_ROUNDING,
+    ("textgrid2lab multi_rules", "rounding.lab"): _TICK_ROUNDING,
+    ("lab2seg", "rounding.seg"): _SEG_ROUNDING,
+    ("lab_phoneme_change", "rounding.lab"): _FINAL_LINE_BREAK,
+    ("lab_phoneme_change", "irregular.lab"): _LABEL_COLUMN,
+    ("lab_phoneme_change", "silences.lab"): _FINAL_LINE_BREAK,
+    ("lab_phoneme_change", "symbols.lab"): _FINAL_LINE_BREAK,
+}
+
+# Fixture files converted per second in memory, in one process: about a
+# quarter of what a single shared CPU core reaches, so timing noise does not
+# fail the check but a several-fold slowdown does.
+MIN_FILES_PER_SECOND = {
+    "textgrid2lab JP-VOCALOID": 1500,
+    "textgrid2lab multi_rules": 1500,
+    "lab2seg": 3000,
+    "txt2romaji": 3000,
+    "lab_phoneme_change": 9000,
+}
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+def _fixtures(kind, suffix):
+    directory = os.path.join(INPUT_DIR, kind)
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(suffix))
+
+def _output_name(path, suffix):
+    return os.path.splitext(os.path.basename(path))[0] + suffix
+
+@contextlib.contextmanager
+def _quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def _converted_files(directory, suffix):
+    """
+    Returns {file name: bytes} of the files with suffix directly in directory.
+    """
+    if not os.path.isdir(directory):
+        return {}
+    return {name: open(os.path.join(directory, name), "rb").read()
+            for name in sorted(os.listdir(directory)) if name.endswith(suffix)}
+
+def _run_baseline(baseline, script, *args, cwd=None):
+    """
+    Runs a script of the baseline checkout.
+    """
+    subprocess.run([sys.executable, os.path.join(baseline, *script.split("/")), *args], cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL)
+
+class Check:
+    """
+    One converter: its fixtures, in-memory function and directory function.
+    """
+
+    def __init__(self, name, inputs, suffix, convert, run_directory, run_baseline, time_convert=None):
+        """
+        Args:
+            name (str): Name in the report; also the golden directory, with '/' for spaces.
+            inputs (list): Fixture paths.
+            suffix (str): Suffix of the output files.
+            convert (callable): convert(path) returns the output text, or None when no file is written.
+            run_directory (callable): run_directory(output_dir, jobs) converts the fixtures into output_dir.
+            run_baseline (callable): run_baseline(baseline, output_dir) converts the fixtures into
+                output_dir with the scripts of the baseline checkout.
+            time_convert (callable, optional): Timed instead of convert, e.g. without caches.
+        """
+        self.name = name
+        self.inputs = inputs
+        self.suffix = suffix
+        self.convert = convert
+        self.run_directory = run_directory
+        self.run_baseline = run_baseline
+        self.time_convert = time_convert or convert
+
+    @property
+    def golden_dir(self):
+        return os.path.join(GOLDEN_DIR, *self.name.split())
+
+    @property
+    def deviation_dir(self):
+        return os.path.join(DEVIATION_DIR, *self.name.split())
+
+    @property
+    def deviations(self):
+        """
+        The output files of this check listed in DEVIATIONS.
+        """
+        return {name for check, name in DEVIATIONS if check == self.name}
+
+    def expected(self):
+        """
+        Returns {file name: bytes} of the expected outputs: the golden files, with the listed deviations.
+        """
+        expected = _converted_files(self.golden_dir, self.suffix)
+        deviations = _converted_files(self.deviation_dir, self.suffix)
+        for name in self.deviations:
+            if name in deviations:
+                expected[name] = deviations[name]
+            else:
+                expected.pop(name, None)
+        return expected
+
+    def run(self, tmp, jobs):
+        """
+        Runs the directory function into a fresh directory and returns its outputs as {name: bytes}.
+        """
+        output_dir = os.path.join(tmp, self.name.replace(" ", "-"))
+        with _quiet():
+            self.run_directory(output_dir, jobs)
+        return _converted_files(output_dir, self.suffix)
+
+    def compare(self, tmp, jobs):
+        """
+        Returns the differences with the expected files, as messages.
+        """
+        golden = _converted_files(self.golden_dir, self.suffix)
+        deviations = _converted_files(self.deviation_dir, self.suffix)
+        problems = []
+        for name in sorted(self.deviations):
+            if deviations.get(name) == golden.get(name):
+                problems.append(f"deviation: {name} is listed but matches the baseline")
+        for name in sorted(set(deviations) - self.deviations):
+            problems.append(f"deviation: {name} has an expected file but is not listed in DEVIATIONS")
+
+        expected = self.expected()
+        for path in self.inputs:
+            name = _output_name(path, self.suffix)
+            with _quiet():
+                output = self.convert(path)
+            if output is None:
+                if name in expected:
+                    problems.append(f"in memory: no output for {name}")
+            elif output.encode("utf-8") != expected.get(name):
+                problems.append(f"in memory: {name} differs")
+        outputs = self.run(tmp, jobs)
+        for name in sorted(set(outputs) | set(expected)):
+            if outputs.get(name) != expected.get(name):
+                state = "missing" if name not in outputs else "unexpected" if name not in expected else "differs"
+                problems.append(f"directory: {name} {state}")
+        return problems
+
+    def update(self, tmp, jobs):
+        """
+        Rewrites the expected files of the listed deviations from the outputs of the directory function.
+
+        Returns:
+            tuple: (number of deviation files written, names of unlisted outputs that differ from the baseline)
+        """
+        outputs = self.run(tmp, jobs)
+        golden = _converted_files(self.golden_dir, self.suffix)
+        shutil.rmtree(self.deviation_dir, ignore_errors=True)
+        written = 0
+        for name in sorted(self.deviations):
+            if name in outputs:
+                os.makedirs(self.deviation_dir, exist_ok=True)
+                with open(os.path.join(self.deviation_dir, name), "wb") as f:
+                    f.write(outputs[name])
+                written += 1
+        unlisted = [name for name in sorted(set(outputs) | set(golden))
+                    if name not in self.deviations and outputs.get(name) != golden.get(name)]
+        return written, unlisted
+
+    def regenerate(self, tmp, baseline):
+        """
+        Replaces the golden files with the outputs of the baseline scripts.
+        """
+        output_dir = os.path.join(tmp, "baseline-" + self.name.replace(" ", "-"))
+        self.run_baseline(baseline, output_dir)
+        outputs = _converted_files(output_dir, self.suffix)
+        shutil.rmtree(self.golden_dir, ignore_errors=True)
+        os.makedirs(self.golden_dir)
+        for name, content in outputs.items():
+            with open(os.path.join(self.golden_dir, name), "wb") as f:
+                f.write(content)
+        return len(outputs)
+
+    def throughput(self, seconds):
+        """
+        Converts the fixtures in memory over and over for about `seconds` and returns the files per second.
+        """
+        files = 0
+        start = time.perf_counter()
+        with _quiet():
+            while True:
+                for path in self.inputs:
+                    self.time_convert(path)
+                files += len(self.inputs)
+                elapsed = time.perf_counter() - start
+                if elapsed >= seconds:
+                    return files / elapsed
+
+def textgrid_check(rules_name, rules_path):
+    converter = textgrid2lab.load_converter(rules_path, True, use_cache=False)
+    textgrid_files = _fixtures("textgrid", ".TextGrid")
+
+    def convert(path):
+        lines = textgrid2lab.textgrid_to_lab(path, converter, apply_low_number=True)
+        return "".join(line + "\n" for line in lines) if lines else None
+
+    def run_directory(output_dir, jobs):
+        # textgrid2lab maps paths relative to the current directory into the output tree
+        cwd = os.getcwd()
+        os.chdir(os.path.join(INPUT_DIR, "textgrid"))
+        try:
+            names = [os.path.join(".", os.path.basename(path)) for path in textgrid_files]
+            textgrid2lab.convert_textgrid_files(converter, names, output_dir, jobs=jobs)
+        finally:
+            os.chdir(cwd)
+
+    def run_baseline(baseline, output_dir):
+        # The baseline converts every TextGrid under the current directory
+        work_dir = output_dir + "-input"
+        shutil.copytree(os.path.join(INPUT_DIR, "textgrid"), work_dir)
+        _run_baseline(baseline, "MFA_Converters/textgrid2lab.py", "-c", rules_path, "-o", output_dir, cwd=work_dir)
+
+    return Check(f"textgrid2lab {rules_name}", textgrid_files, ".lab", convert, run_directory, run_baseline)
+
+def lab2seg_check():
+    texts = {path: _read(path) for path in _fixtures("lab", ".lab")}
+
+    def run_directory(output_dir, jobs):
+        lab2seg.convert_lab_to_seg(os.path.join(INPUT_DIR, "lab"), output_dir, jobs=jobs)
+
+    def run_baseline(baseline, output_dir):
+        _run_baseline(baseline, "lab2seg.py", "-i", os.path.join(INPUT_DIR, "lab"), "-o", output_dir)
+
+    return Check("lab2seg", list(texts), ".seg", lambda path: lab2seg.lab_text_to_seg(texts[path]), run_directory,
+                 run_baseline)
+
+def romaji_check():
+    texts = {path: _read(path) for path in _fixtures("txt", ".txt")}
+    # The shared converter memoizes lines; timing repeated fixtures needs one that does not
+    uncached = txt2romaji.RomajiConverter(cache_size=0)
+
+    def convert(path):
+        # What process_folder writes around the converted text
+        return "SP " + txt2romaji.convert_japanese_to_romaji(texts[path]) + " SP"
+
+    def run_directory(output_dir, jobs):
+        shutil.copytree(os.path.join(INPUT_DIR, "txt"), output_dir)
+        txt2romaji.process_folder(output_dir, jobs=jobs)
+
+    def run_baseline(baseline, output_dir):
+        shutil.copytree(os.path.join(INPUT_DIR, "txt"), output_dir)
+        _run_baseline(baseline, "SOFA_Converters/txt2romaji.py", "-i", output_dir)
+
+    return Check("txt2romaji", list(texts), ".txt", convert, run_directory, run_baseline,
+                 time_convert=lambda path: uncached.convert(texts[path]))
+
+def symbol_check():
+    converter = lab_phoneme_change.SymbolConverter(SYMBOL_CONVERTER)
+    # Read like convert_lab_file reads them
+    texts = {}
+    for path in _fixtures("lab", ".lab"):
+        with open(path, "r", newline="") as f:
+            texts[path] = f.read()
+
+    def run_directory(output_dir, jobs):
+        shutil.copytree(os.path.join(INPUT_DIR, "lab"), output_dir)
+        converter.convert_directory(output_dir, jobs=jobs)
+
+    def convert(path):
+        converted = converter.convert_text(texts[path])
+        # Unchanged files are not rewritten, so they keep their bytes
+        return _read(path) if converted == texts[path] else converted
+
+    def run_baseline(baseline, output_dir):
+        shutil.copytree(os.path.join(INPUT_DIR, "lab"), output_dir)
+        _run_baseline(baseline, "SOFA_Converters/lab_phoneme_change.py", "-c", SYMBOL_CONVERTER, "-i", output_dir)
+
+    return Check("lab_phoneme_change", list(texts), ".lab", convert, run_directory, run_baseline,
+                 time_convert=lambda path: converter.convert_text(texts[path]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the converters against golden outputs and throughputs.")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for the directory functions.")
+    parser.add_argument("--seconds", type=float, default=0.5, help="Timing duration per converter.")
+    parser.add_argument("--speed-factor", type=float, default=1.0,
+                        help="Scales MIN_FILES_PER_SECOND, e.g. 0.5 on slow machines; 0 skips the timing.")
+    parser.add_argument("--update", action="store_true",
+                        help="Rewrite the expected files of the DEVIATIONS from the current outputs "
+                             "instead of checking them.")
+    parser.add_argument("--baseline",
+                        help="Rewrite the golden files from the scripts of this baseline checkout "
+                             "instead of checking them.")
+    args = parser.parse_args()
+
+    checks = [textgrid_check(name, path) for name, path in TEXTGRID_RULES.items()]
+    checks += [lab2seg_check(), romaji_check(), symbol_check()]
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for check in checks:
+            if args.baseline:
+                print(f"{check.name:26s} {check.regenerate(tmp, args.baseline)} golden files written")
+                continue
+            if args.update:
+                written, unlisted = check.update(tmp, args.jobs)
+                print(f"{check.name:26s} {written} deviation files written")
+                for name in unlisted:
+                    print(f"{'':26s} {name} differs from the baseline but is not listed in DEVIATIONS")
+                failures += bool(unlisted)
+                continue
+            problems = check.compare(tmp, args.jobs)
+            timing = ""
+            if args.speed_factor > 0:
+                rate = check.throughput(args.seconds)
+                minimum = MIN_FILES_PER_SECOND[check.name] * args.speed_factor
+                timing = f"{rate:9.0f} files/s (min {minimum:.0f})"
+                if rate < minimum:
+                    problems.append(f"throughput {rate:.0f} files/s is below {minimum:.0f}")
+            print(f"{check.name:26s} {'OK' if not problems else 'FAIL':4s} {timing}")
+            for problem in problems:
+                print(f"{'':26s} {problem}")
+            failures += bool(problems)
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Check sharded runs of shard_jobs.py against single-process runs and time them.
+
+For each tool, a synthetic corpus is converted once with the tool's own
+directory function and once through shard_jobs.py: plan, one worker process
+per shard started together, one of them killed after its first checkpoint
+(leaving a torn checkpoint line, as a crash during an append would) and
+restarted, then merge. The output trees and corpus indexes must be
+identical, and the restarted worker must skip the files it had checkpointed.
+
+Usage:
+    python benchmarks/check_shards.py --files 3000 --shards 4
+"""
+import argparse
+import contextlib
+import filecmp
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "MFA_Converters"), os.path.join(ROOT, "SOFA_Converters"),
+                os.path.dirname(os.path.abspath(__file__))]
+
+import lab2seg
+import textgrid2lab
+import txt2romaji
+from corpus import write_labs, write_textgrids, write_transcripts
+
+SHARD_JOBS = os.path.join(ROOT, "shard_jobs.py")
+TEXTGRID_CONVERTER = os.path.join(ROOT, "MFA_Converters", "JP-VOCALOID.txt")
+
+def shard_command(manifest, *args):
+    return [sys.executable, SHARD_JOBS, manifest, *args]
+
+def reference_run(tool, corpus, output, index):
+    with contextlib.redirect_stdout(io.StringIO()):
+        if tool == "lab2seg":
+            lab2seg.convert_lab_to_seg(corpus, output, index_path=index)
+        elif tool == "textgrid2lab":
+            cwd = os.getcwd()
+            os.chdir(corpus)
+            try:
+                textgrid2lab.process_files(TEXTGRID_CONVERTER, output_dir=output, index_path=index)
+            finally:
+                os.chdir(cwd)
+        else:
+            shutil.copytree(corpus, output)
+            txt2romaji.process_folder(output)
+
+def _checkpoint_lines(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return sum(1 for _ in f)
+    except FileNotFoundError:
+        return 0
+
+def sharded_run(tool, corpus, output, index, manifest, shards, batch_size):
+    """
+    Runs the shards in parallel worker processes, crashing and resuming shard 0.
+
+    Returns:
+        tuple: (elapsed seconds, whether shard 0 was killed mid-way, its resume log line)
+    """
+    plan = ["plan", tool, "-i", corpus, "--shards", str(shards), "--strategy", "size"]
+    if tool == "txt2romaji":
+        shutil.copytree(corpus, output)
+        plan[3] = output
+    else:
+        plan += ["-o", output]
+    if tool == "textgrid2lab":
+        plan += ["-c", TEXTGRID_CONVERTER]
+    if index:
+        plan += ["--index", index]
+
+    start = time.perf_counter()
+    subprocess.run(shard_command(manifest, *plan), check=True, stdout=subprocess.DEVNULL)
+    work = ["work", "--batch-size", str(batch_size), "-q"]
+    workers = [subprocess.Popen(shard_command(manifest, *work, "--shard", str(shard)), stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True)
+               for shard in range(shards)]
+
+    # Kill shard 0 as soon as it has checkpointed its first batch
+    checkpoint = f"{manifest}.shard-0.jsonl"
+    while workers[0].poll() is None and not _checkpoint_lines(checkpoint):
+        time.sleep(0.002)
+    killed = workers[0].poll() is None
+    workers[0].kill()
+    workers[0].communicate()
+    if killed:
+        # As if the kill had interrupted the next append
+        with open(checkpoint, "a", encoding="utf-8") as f:
+            f.write('{"done": [')
+    for worker in workers[1:]:
+        worker.communicate()
+        if worker.returncode:
+            raise RuntimeError(f"worker failed with status {worker.returncode}")
+
+    resumed = subprocess.run(shard_command(manifest, *work, "--shard", "0"), check=True, capture_output=True,
+                             text=True)
+    merged = subprocess.run(shard_command(manifest, "merge"), capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if merged.returncode:
+        raise RuntimeError(f"merge failed:\n{merged.stdout}")
+    resume_line = next((line for line in resumed.stdout.splitlines() if "resuming" in line), "")
+    return elapsed, killed, resume_line
+
+def compare_trees(left, right):
+    """
+    Returns the relative paths that differ between two trees, ignoring shard manifests and build manifests.
+    """
+    differences = []
+    for directory, _, names in os.walk(left):
+        for name in names:
+            path = os.path.join(directory, name)
+            other = os.path.join(right, os.path.relpath(path, left))
+            if not os.path.exists(other) or not filecmp.cmp(path, other, shallow=False):
+                differences.append(os.path.relpath(path, left))
+    for directory, _, names in os.walk(right):
+        for name in names:
+            if not os.path.exists(os.path.join(left, os.path.relpath(os.path.join(directory, name), right))):
+                differences.append(os.path.relpath(os.path.join(directory, name), right))
+    return differences
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time sharded runs against single-process runs.")
+    parser.add_argument("--files", type=int, default=3000, help="Files per synthetic corpus.")
+    parser.add_argument("--shards", type=int, default=4, help="Shards, each run by its own worker process.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Files per checkpointed batch.")
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        corpora = {
+            "textgrid2lab": os.path.join(tmp, "textgrid"),
+            "lab2seg": os.path.join(tmp, "lab"),
+            "txt2romaji": os.path.join(tmp, "txt"),
+        }
+        write_textgrids(corpora["textgrid2lab"], args.files, subdirs=8)
+        write_labs(corpora["lab2seg"], args.files, subdirs=8)
+        write_transcripts(corpora["txt2romaji"], args.files)
+
+        for tool, corpus in corpora.items():
+            indexed = tool != "txt2romaji"
+            reference = os.path.join(tmp, f"{tool}-reference")
+            sharded = os.path.join(tmp, f"{tool}-sharded")
+            reference_index = os.path.join(tmp, f"{tool}-reference.json") if indexed else None
+            sharded_index = os.path.join(tmp, f"{tool}-sharded.json") if indexed else None
+
+            start = time.perf_counter()
+            reference_run(tool, corpus, reference, reference_index)
+            single = time.perf_counter() - start
+            elapsed, killed, resume_line = sharded_run(tool, corpus, sharded, sharded_index,
+                                                       os.path.join(tmp, f"{tool}.shards.json"),
+                                                       args.shards, args.batch_size)
+
+            problems = compare_trees(reference, sharded)
+            if indexed:
+                with open(reference_index, encoding="utf-8") as f, open(sharded_index, encoding="utf-8") as g:
+                    if json.load(f) != json.load(g):
+                        problems.append("corpus index")
+            if killed and not resume_line:
+                problems.append("shard 0 did not resume from its checkpoint")
+            status = "OK" if not problems else "FAIL " + ", ".join(problems[:5])
+            crash = resume_line.strip() if killed else "shard 0 finished before it could be killed"
+            print(f"{tool:13s} single {single:6.2f}s  {args.shards} shards {elapsed:6.2f}s  {status}")
+            print(f"{'':13s} {crash}")
+            failures += bool(problems)
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Check the streaming TextGrid reader against mytextgrid and time both.
+
+Long-format fixtures are compared with mytextgrid.read_from_file. Short-format
+fixtures (which mytextgrid cannot read) are compared with the long-format
+parse of the same grid.
+
+Usage:
+    python benchmarks/check_textgrid_parser.py --files 200
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import format_textgrid, random_textgrid
+from daisy_common.textgrid import iter_tier_intervals
+
+EDGE_CASE_TIERS = [
+    ("IntervalTier", "words", [(0, 0.5, "kokoro"), (0.5, 1, "")]),
+    ("TextTier", "events", [(0.25, "click"), (0.75, 'say "hi"')]),
+    ("IntervalTier", "phones", [
+        (0, "0.10000000000000001", ""),
+        ("0.10000000000000001", "0.29999999999999999", 'a"b'),
+        ("0.29999999999999999", 0.4, "line one\nline two"),
+        (0.4, 0.5, "ɕ = tɕ"),
+        (0.5, 0.6, "note:\nitem [1]:"),
+        (0.6, 1, "pʲː"),
+    ]),
+]
+
+# mytextgrid reads a tier without intervals as one empty interval spanning the tier
+EMPTY_TIERS = [
+    ("IntervalTier", "words", [(0, 1, "")]),
+    ("IntervalTier", "phones", []),
+]
+
+# Japanese labels, written without a byte order mark in Shift-JIS
+KANA_TIERS = [
+    ("IntervalTier", "phones", [(0, 0.3, "あ"), (0.3, 0.6, "きゃ"), (0.6, 1, "ん")]),
+]
+
+def write_fixtures(directory, count):
+    """
+    Writes edge-case and random fixtures in both formats.
+
+    Returns:
+        list: (long_path, short_path) pairs.
+    """
+    rng = random.Random(0)
+    pairs = []
+    for index in range(count):
+        long_path = os.path.join(directory, f"fixture{index:04d}.TextGrid")
+        short_path = os.path.join(directory, f"fixture{index:04d}.short.TextGrid")
+        if index in (0, 2):
+            tiers = EDGE_CASE_TIERS if index == 0 else EMPTY_TIERS
+            long_text = format_textgrid(tiers, 0, 1)
+            short_text = format_textgrid(tiers, 0, 1, short=True)
+        else:
+            state = rng.getstate()
+            long_text = random_textgrid(rng)
+            rng.setstate(state)
+            short_text = random_textgrid(rng, short=True)
+        encoding = 'utf-16' if index == 1 else 'utf-8'
+        with open(long_path, 'w', encoding=encoding) as f:
+            f.write(long_text)
+        with open(short_path, 'w', encoding=encoding) as f:
+            f.write(short_text)
+        pairs.append((long_path, short_path))
+    return pairs
+
+def mytextgrid_intervals(path):
+    import mytextgrid
+    tg = mytextgrid.read_from_file(path)
+    return [(interval.xmin, interval.xmax, interval.text)
+            for tier in tg if tier.name == 'phones' and tier.is_interval()
+            for interval in tier]
+
+def import_time(statement):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", statement], check=True, cwd=ROOT)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the streaming TextGrid reader against mytextgrid.")
+    parser.add_argument("--files", type=int, default=200, help="Number of fixtures per format.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pairs = write_fixtures(tmp, args.files)
+
+        failures = 0
+        for long_path, short_path in pairs:
+            streamed = list(iter_tier_intervals(long_path))
+            if streamed != mytextgrid_intervals(long_path):
+                failures += 1
+                print(f"FAIL (long vs mytextgrid): {os.path.basename(long_path)}")
+            if list(iter_tier_intervals(short_path)) != streamed:
+                failures += 1
+                print(f"FAIL (short vs long): {os.path.basename(short_path)}")
+
+        # A truncated file is reported as a ValueError naming the file
+        truncated_path = os.path.join(tmp, "truncated.TextGrid")
+        with open(pairs[0][0], encoding='utf-8') as f:
+            text = f.read()
+        with open(truncated_path, 'w', encoding='utf-8') as f:
+            f.write(text[:len(text) // 2])
+        try:
+            list(iter_tier_intervals(truncated_path))
+            failures += 1
+            print("FAIL (truncated): no error")
+        except ValueError as e:
+            if truncated_path not in str(e):
+                failures += 1
+                print(f"FAIL (truncated): {e}")
+
+        # A Shift-JIS file without a byte order mark reads like its UTF-8 copy
+        kana_text = format_textgrid(KANA_TIERS, 0, 1)
+        decoded = []
+        for encoding in ('utf-8', 'cp932'):
+            kana_path = os.path.join(tmp, f"kana.{encoding}.TextGrid")
+            with open(kana_path, 'w', encoding=encoding) as f:
+                f.write(kana_text)
+            decoded.append(list(iter_tier_intervals(kana_path)))
+        if decoded[0] != decoded[1]:
+            failures += 1
+            print(f"FAIL (Shift-JIS): {decoded[1]}")
+
+        if failures:
+            sys.exit(1)
+        print(f"intervals identical on {len(pairs)} long/short fixture pairs")
+
+        long_paths = [long_path for long_path, _ in pairs]
+        start = time.perf_counter()
+        for path in long_paths:
+            mytextgrid_intervals(path)
+        legacy = (time.perf_counter() - start) / len(long_paths)
+        start = time.perf_counter()
+        for path in long_paths:
+            list(iter_tier_intervals(path))
+        streamed = (time.perf_counter() - start) / len(long_paths)
+
+    print(f"parse mytextgrid: {legacy * 1e3:8.3f} ms/file")
+    print(f"parse streaming:  {streamed * 1e3:8.3f} ms/file ({legacy / streamed:.1f}x)")
+    print(f"import mytextgrid:             {import_time('import mytextgrid'):6.3f} s")
+    print(f"import daisy_common.textgrid:  {import_time('import daisy_common.textgrid'):6.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Check the integer time core against exact Decimal arithmetic and time it.
+
+1. seconds_to_ticks and the .seg second formatting are compared with Decimal
+   rounding (half away from zero) on random decimal strings, float reprs of
+   accumulated durations, exponents and negative values.
+2. TextGrids whose boundaries are float-accumulated sums (0.1 + 0.2 + ...)
+   are converted with textgrid2lab and lab2seg: every .lab boundary must be
+   the exact rounded tick, adjacent segments must stay contiguous, and the
+   .seg written from the .lab must match the one written straight from the
+   TextGrid. An interval shorter than a tick must keep a length of one tick.
+3. Parsing is timed against Decimal, and .seg formatting against the float
+   path. Per value, the integer parse costs about as much as Decimal (its
+   gain is exact rounding); on TextGrid boundaries, which repeat (each one
+   is read as one interval's xmax and the next one's xmin, and aligners
+   emit frame-quantized times), its cache makes it faster.
+
+Usage:
+    python benchmarks/check_ticks.py --values 200000 --files 300
+"""
+import argparse
+import decimal
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "MFA_Converters"), os.path.join(ROOT, "SOFA_Converters"),
+                os.path.dirname(os.path.abspath(__file__))]
+
+import lab2seg
+import textgrid2lab
+import textgrid2seg
+from corpus import PHONES, format_textgrid, random_textgrid
+from daisy_common.segtable import SEG_HEADER, SegmentTable, format_seg, format_seg_rows, parse_lab
+from daisy_common.textgrid import iter_text_intervals
+from daisy_common.ticks import find_gaps, format_seconds, seconds_to_ticks
+
+def reference_ticks(text):
+    return int((decimal.Decimal(text) * 10000000).to_integral_value(rounding=decimal.ROUND_HALF_UP))
+
+def reference_seconds(ticks):
+    seconds = (decimal.Decimal(ticks) / 10000000).quantize(decimal.Decimal("0.000001"), rounding=decimal.ROUND_HALF_UP)
+    # Times that round to zero print without a sign
+    return str(seconds.copy_abs() if seconds.is_zero() else seconds)
+
+def random_values(rng, count):
+    values = ["0", "1", "0.5", "-0.5", "0.00000005", "0.00000004999", "-0.00000005", "1e-05", "2.5E-7",
+              "1.2345678e3", "0.7999999999999999", "0.07345678900000001", "12.", ".25", "-.5",
+              "+3.14159265358979"]
+    elapsed = 0.0
+    while len(values) < count:
+        roll = rng.random()
+        if roll < 0.4:
+            elapsed += rng.choice([0.01, 0.03, 0.1, 0.2, 0.07])
+            values.append(repr(elapsed))
+        elif roll < 0.8:
+            digits = rng.randint(0, 18)
+            fraction = "".join(rng.choice("0123456789") for _ in range(digits))
+            values.append(f"{rng.randint(0, 600)}.{fraction}" if digits else str(rng.randint(0, 600)))
+        else:
+            values.append(f"{rng.uniform(-1, 1) * 10 ** rng.randint(-9, 3):.{rng.randint(1, 17)}e}")
+    return values
+
+def check_values(values, report=10):
+    failures = []
+    for text in values:
+        ticks = seconds_to_ticks(text)
+        if ticks != reference_ticks(text):
+            failures.append(f"FAIL seconds_to_ticks({text!r}) = {ticks}, expected {reference_ticks(text)}")
+        elif format_seconds(ticks) != reference_seconds(ticks):
+            failures.append(f"FAIL format_seconds({ticks}) = {format_seconds(ticks)}, "
+                            f"expected {reference_seconds(ticks)}")
+    # .seg rows are formatted in one pass over the whole table
+    ticks = [reference_ticks(text) for text in values]
+    rows = format_seg_rows(SegmentTable.from_rows(ticks, ticks, ["a"] * len(ticks))).splitlines()
+    for row, tick in zip(rows, ticks):
+        seconds = reference_seconds(tick)
+        if row != f"a\t\t{seconds}\t\t{seconds}":
+            failures.append(f"FAIL format_seg_rows({tick}) = {row!r}, expected {seconds}")
+    for failure in failures[:report]:
+        print(failure)
+    return len(failures)
+
+def accumulated_textgrid(rng, phones=40):
+    """
+    Builds a TextGrid whose boundaries are float sums, written with repr like Praat scripts do.
+    """
+    bounds = [0.0]
+    for _ in range(phones):
+        bounds.append(bounds[-1] + rng.choice([0.01, 0.03, 0.05, 0.1, 0.07, 0.0734567891]))
+    intervals = [(repr(bounds[i]), repr(bounds[i + 1]), rng.choice(PHONES)) for i in range(phones)]
+    return format_textgrid([("IntervalTier", "phones", intervals)], 0, repr(bounds[-1])), intervals
+
+def check_files(rng, count):
+    failures = 0
+    for index in range(count):
+        text, intervals = accumulated_textgrid(rng)
+        lab_text = textgrid2lab.textgrid_text_to_lab(text)
+        table = parse_lab(lab_text)
+        expected = [reference_ticks(end) for _, end, _ in intervals]
+        if table.ends.tolist() != expected or table.starts.tolist() != [0] + expected[:-1]:
+            failures += 1
+            print(f"FAIL grid {index}: .lab boundaries differ from exact rounding")
+        if len(find_gaps(table.starts, table.ends)):
+            failures += 1
+            print(f"FAIL grid {index}: gaps at {find_gaps(table.starts, table.ends).tolist()}")
+        if lab2seg.lab_text_to_seg(lab_text) != textgrid2seg.convert_textgrid_text(text, apply_low_number=False)[1]:
+            failures += 1
+            print(f"FAIL grid {index}: .seg from .lab differs from .seg from the TextGrid")
+    return failures
+
+def check_collapsed():
+    """
+    Checks that an interval shorter than a tick keeps one tick and its neighbours stay contiguous.
+    """
+    intervals = [(0, "0.8", "a"), ("0.8", "0.8999999999999999", "i"), ("0.8999999999999999", "0.9", ""),
+                 ("0.9", "1", "u")]
+    text = format_textgrid([("IntervalTier", "phones", intervals)], 0, 1)
+    table = parse_lab(textgrid2lab.textgrid_text_to_lab(text))
+    if (table.ends <= table.starts).any() or len(find_gaps(table.starts, table.ends)):
+        print(f"FAIL collapsed interval: {list(zip(table.starts.tolist(), table.ends.tolist()))}")
+        return 1
+    return 0
+
+def float_format_seg(table):
+    # The float path this module replaced, for timing
+    starts, ends = table.starts / 10000000, table.ends / 10000000
+    rows = "".join("%s\t\t%.6f\t\t%.6f\n" % row for row in zip(table.label_strings(), starts.tolist(), ends.tolist()))
+    return "nPhonemes {}\n".format(len(table)) + SEG_HEADER + rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the integer tick time core.")
+    parser.add_argument("--values", type=int, default=200000, help="Random time values to check.")
+    parser.add_argument("--files", type=int, default=300, help="TextGrids with accumulated float boundaries.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    values = random_values(rng, args.values)
+    failures = check_values(values)
+    print(f"{len(values)} values: seconds_to_ticks, format_seconds and .seg rows match Decimal rounding"
+          if not failures else f"{failures} value mismatches")
+    file_failures = check_files(rng, args.files)
+    if not file_failures:
+        print(f"{args.files} TextGrids: boundaries exact, contiguous, .seg identical through .lab")
+    failures += file_failures + check_collapsed()
+
+    plain = [value for value in values if "e" not in value.lower()]
+    # Time strings in the order the TextGrid reader parses them
+    boundaries = [time_text for _ in range(args.files)
+                  for interval in iter_text_intervals(random_textgrid(rng), 'phones', str)
+                  for time_text in interval[:2]]
+    uncached = seconds_to_ticks.__wrapped__
+    timings = []
+    for times in (plain, boundaries):
+        seconds_to_ticks.cache_clear()
+        start = time.perf_counter()
+        with decimal.localcontext() as context:
+            context.prec = 16
+            for value in times:
+                int(decimal.Decimal(value) * 10000000)
+        legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        for value in times:
+            uncached(value)
+        integer = time.perf_counter() - start
+        start = time.perf_counter()
+        for value in times:
+            seconds_to_ticks(value)
+        cached = time.perf_counter() - start
+        timings.append([elapsed / len(times) * 1e9 for elapsed in (legacy, integer, cached)])
+    for name, (legacy, integer, cached) in zip(("random values", "TextGrid boundaries"), timings):
+        print(f"parse {name + ':':21s} Decimal {legacy:5.0f} ns/value, ticks {integer:5.0f} ns/value, "
+              f"cached {cached:5.0f} ns/value")
+
+    table = SegmentTable.from_rows(sorted(rng.randrange(10 ** 9) for _ in range(100000)),
+                                   sorted(rng.randrange(10 ** 9) for _ in range(100000)),
+                                   [rng.choice(PHONES) or "pau" for _ in range(100000)])
+    start = time.perf_counter()
+    float_format_seg(table)
+    legacy = time.perf_counter() - start
+    start = time.perf_counter()
+    format_seg(table)
+    integer = time.perf_counter() - start
+    print(f"format: float {legacy * 1e3:6.1f} ms, ticks {integer * 1e3:6.1f} ms per 100k segments")
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Synthetic voicebank corpus generator used by the benchmarks.
+"""
+import os
+import random
+
+KANA = list("あいうえおかがきぎくぐけげこごさざしじすずせぜそぞただちつてでとどなにぬねのはばぱひびぴふぶぷへべぺほぼぽまみむめもやゆよらりるれろわをんっ")
+KANA_COMBINATIONS = ["きゃ", "しゅ", "ちょ", "にゃ", "りゅ", "ぎょ", "じゃ", "ふぁ", "てぃ", "でぃ", "うぃ", "ヴぁ"]
+KANJI_WORDS = ["東京", "日本語", "漢字", "言葉", "世界", "時間", "未来", "約束", "季節", "空", "夢", "心", "花火", "夜明け", "歌声", "記憶"]
+
+def random_transcript(rng, kanji_ratio=0.3, length=12):
+    """
+    Builds one synthetic lyric line mixing kana, kana combinations and kanji words.
+
+    Args:
+        rng (random.Random): Random generator.
+        kanji_ratio (float): Probability of inserting a kanji word at each step.
+        length (int): Number of tokens in the line.
+
+    Returns:
+        str: The transcript text.
+    """
+    tokens = []
+    for _ in range(length):
+        roll = rng.random()
+        if roll < kanji_ratio:
+            tokens.append(rng.choice(KANJI_WORDS))
+        elif roll < kanji_ratio + 0.15:
+            tokens.append(rng.choice(KANA_COMBINATIONS))
+        else:
+            tokens.append(rng.choice(KANA))
+    return "".join(tokens)
+
+def write_transcripts(directory, count, seed=0, kanji_ratio=0.3, unique_lines=None):
+    """
+    Writes `count` synthetic .txt transcripts into `directory`.
+
+    Args:
+        directory (str): Output directory, created if missing.
+        count (int): Number of files to write.
+        seed (int): Random seed, so runs are reproducible.
+        kanji_ratio (float): Probability of a kanji word at each token.
+        unique_lines (int, optional): Draw the transcripts from a pool of this many
+            lines with a Zipf-like skew, like lyric lines repeated across a voicebank.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    rng = random.Random(seed)
+    pool = weights = None
+    if unique_lines:
+        pool = [random_transcript(rng, kanji_ratio) for _ in range(unique_lines)]
+        weights = [1.0 / (rank + 1) for rank in range(unique_lines)]
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"utt{index:06d}.txt")
+        if pool is None:
+            text = random_transcript(rng, kanji_ratio)
+        else:
+            text = rng.choices(pool, weights)[0]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+PHONES = ["a", "i", "u", "e", "o", "k", "g", "s", "sh", "z", "t", "ch", "ts", "d", "n", "h", "f", "b", "p",
+          "m", "y", "r", "w", "N", "cl", "ky", "ry", "ɕ", "tɕ", "pː", "pʲ", "AA1", "sil", "spn", ""]
+WORDS = ["sora", "yume", "kokoro", "hanabi", "kioku", "utagoe", ""]
+
+def _format_value(value):
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def format_textgrid(tiers, xmin=0, xmax=1, short=False):
+    """
+    Formats a TextGrid as Praat text.
+
+    Args:
+        tiers (list): (tier_class, name, items) tuples. IntervalTier items are
+            (xmin, xmax, text), TextTier items are (time, mark). Times may be
+            numbers or preformatted strings.
+        xmin: Start time of the TextGrid.
+        xmax: End time of the TextGrid.
+        short (bool): Write the short text format instead of the long one.
+
+    Returns:
+        str: The TextGrid file content.
+    """
+    def number(value):
+        return value if isinstance(value, str) else _format_value(value)
+
+    lines = ['File type = "ooTextFile"', 'Object class = "TextGrid"', '']
+    if short:
+        lines += [number(xmin), number(xmax), '<exists>', str(len(tiers))]
+        for tier_class, name, items in tiers:
+            lines += [_format_value(tier_class), _format_value(name), number(xmin), number(xmax), str(len(items))]
+            for item in items:
+                lines += [number(value) for value in item[:-1]] + [_format_value(item[-1])]
+        return '\n'.join(lines) + '\n'
+
+    lines += [f'xmin = {number(xmin)} ', f'xmax = {number(xmax)} ', 'tiers? <exists> ',
+              f'size = {len(tiers)} ', 'item []: ']
+    for tier_index, (tier_class, name, items) in enumerate(tiers, 1):
+        lines += [f'    item [{tier_index}]:', f'        class = {_format_value(tier_class)} ',
+                  f'        name = {_format_value(name)} ', f'        xmin = {number(xmin)} ',
+                  f'        xmax = {number(xmax)} ']
+        if tier_class == 'IntervalTier':
+            lines.append(f'        intervals: size = {len(items)} ')
+            for item_index, (start, end, text) in enumerate(items, 1):
+                lines += [f'        intervals [{item_index}]:', f'            xmin = {number(start)} ',
+                          f'            xmax = {number(end)} ', f'            text = {_format_value(text)} ']
+        else:
+            lines.append(f'        points: size = {len(items)} ')
+            for item_index, (time, mark) in enumerate(items, 1):
+                lines += [f'        points [{item_index}]:', f'            number = {number(time)} ',
+                          f'            mark = {_format_value(mark)} ']
+    return '\n'.join(lines) + '\n'
+
+def random_intervals(rng, labels, count, duration):
+    """
+    Builds `count` contiguous intervals covering [0, duration] with random labels.
+    """
+    bounds = sorted(rng.sample(range(1, int(duration * 1000)), count - 1))
+    times = [0] + [b / 1000 for b in bounds] + [duration]
+    return [(times[i], times[i + 1], rng.choice(labels)) for i in range(count)]
+
+def random_textgrid(rng, phones=30, words=8, duration=4.0, short=False):
+    """
+    Builds a synthetic MFA-style TextGrid with a words tier and a phones tier.
+    """
+    tiers = [
+        ("IntervalTier", "words", random_intervals(rng, WORDS, words, duration)),
+        ("IntervalTier", "phones", random_intervals(rng, PHONES, phones, duration)),
+    ]
+    return format_textgrid(tiers, 0, duration, short=short)
+
+def write_textgrids(directory, count, seed=0, short=False, phones=30, subdirs=1):
+    """
+    Writes `count` synthetic TextGrids into `directory`, spread across `subdirs` folders.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        folder = os.path.join(directory, f"speaker{index % subdirs:02d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"utt{index:06d}.TextGrid")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(random_textgrid(rng, phones=phones, short=short))
+        paths.append(path)
+    return paths
+
+# Phonemes of SOFA-style .lab files, including the symbols lab_phoneme_change remaps
+LAB_PHONES = ["pau", "a", "i", "u", "e", "o", "k", "ky", "g", "gy", "s", "sh", "z", "j", "t", "ty", "ch",
+              "ts", "d", "dy", "n", "ny", "h", "hy", "f", "b", "by", "p", "py", "m", "my", "y", "r", "ry",
+              "w", "N", "cl", "R"]
+
+def random_lab(rng, phones=30, duration=4.0):
+    """
+    Builds synthetic .lab content: contiguous "start end label" lines in 100ns ticks.
+    """
+    intervals = random_intervals(rng, LAB_PHONES, phones, duration)
+    return "".join(f"{round(start * 10000000)} {round(end * 10000000)} {label}\n"
+                   for start, end, label in intervals)
+
+def write_labs(directory, count, seed=0, phones=30, subdirs=1):
+    """
+    Writes `count` synthetic .lab files into `directory`, spread across `subdirs` folders.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        folder = os.path.join(directory, f"speaker{index % subdirs:02d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"utt{index:06d}.lab")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(random_lab(rng, phones=phones))
+        paths.append(path)
+    return paths
+
+def write_wav_tree(directory, count, seed=0, subdirs=1, extra_ratio=0.2):
+    """
+    Writes an unprepared gen_trans input: empty .wav files with underscores in
+    their names in `subdirs` folders, plus stray non-.wav files to delete.
+
+    Args:
+        directory (str): Output directory, created if missing.
+        count (int): Number of .wav files.
+        seed (int): Random seed, so runs are reproducible.
+        subdirs (int): Number of folders (the suffix gen_trans appends).
+        extra_ratio (float): Probability of a stray file next to each .wav.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        folder = os.path.join(directory, f"voice{index % subdirs:02d}")
+        os.makedirs(folder, exist_ok=True)
+        names = [f"take_{index:06d}_{rng.choice(WORDS) or 'x'}.wav"]
+        if rng.random() < extra_ratio:
+            names.append(f"take_{index:06d}.{rng.choice(['lab', 'txt', 'pkf', 'frq'])}")
+        for name in names:
+            path = os.path.join(folder, name)
+            open(path, "wb").close()
+            paths.append(path)
+    return paths
@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+
+from daisy_common.index import ANOMALY_KINDS, CorpusIndex
+
+# Index durations are in 100ns ticks
+TICKS_PER_SECOND = 10000000
+
+def print_summary(index):
+    """
+    Prints the size of the corpus, its phoneme inventory and anomaly counts.
+    """
+    segments = sum(entry["segments"] for entry in index.files.values())
+    duration = sum(entry["duration"] for entry in index.files.values())
+    print(f"{len(index.files)} files, {segments} segments, {duration / TICKS_PER_SECOND:.1f}s")
+    print(f"{len(index.phonemes())} phonemes")
+    for kind, files in index.anomalies().items():
+        print(f"{kind}: {len(files)} files")
+
+def print_phonemes(index, sort="count"):
+    """
+    Prints one line per phoneme: label, segments, total and mean duration, files.
+    """
+    phonemes = index.phonemes()
+    if sort == "duration":
+        phonemes = dict(sorted(phonemes.items(), key=lambda item: -item[1]["duration"]))
+    elif sort == "name":
+        phonemes = dict(sorted(phonemes.items()))
+    print("phoneme\tcount\tseconds\tmean_ms\tfiles")
+    for label, total in phonemes.items():
+        seconds = total["duration"] / TICKS_PER_SECOND
+        print(f"{label}\t{total['count']}\t{seconds:.3f}\t{seconds / total['count'] * 1000:.1f}\t{total['files']}")
+
+def print_files(index, labels):
+    """
+    Prints the keys of the files containing every label, one per line.
+    """
+    for key in index.files_with(labels):
+        print(key)
+
+def print_anomalies(index, kind=None):
+    """
+    Prints one line per file and anomaly: kind, file key and segment count or labels.
+    """
+    for anomaly, files in index.anomalies(kind).items():
+        for key, value in files.items():
+            detail = " ".join(value) if isinstance(value, list) else value
+            print(f"{anomaly}\t{key}\t{detail}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a corpus index written by the converters' --index option.")
+    parser.add_argument("index", help="Path to the corpus index JSON file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("summary", help="Files, segments, phonemes and anomaly counts.")
+    phonemes = commands.add_parser("phonemes", help="Phoneme inventory with counts and durations.")
+    phonemes.add_argument("--sort", choices=["count", "duration", "name"], default="count",
+                          help="Sort order. Default: count.")
+    files = commands.add_parser("files", help="Files containing every given phoneme.")
+    files.add_argument("phonemes", nargs="+", help="Phoneme labels, e.g. vf.")
+    anomalies = commands.add_parser("anomalies", help="Files with zero-length, overlapping or unmapped segments.")
+    anomalies.add_argument("kind", nargs="?", choices=ANOMALY_KINDS, help="Only this kind. Default: all.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        print(f"Error: Index file does not exist: {args.index}")
+        sys.exit(1)
+    try:
+        index = CorpusIndex.load(args.index)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.command == "summary":
+        print_summary(index)
+    elif args.command == "phonemes":
+        print_phonemes(index, args.sort)
+    elif args.command == "files":
+        print_files(index, args.phonemes)
+    else:
+        print_anomalies(index, args.kind)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Packed corpus archives: many utterances of segments in one file.
+
+Layout (little-endian):
+    8 bytes   magic b"DSEGARC1"
+    8 bytes   uint64 length of the JSON header
+    header    {"kind", "vocabulary", "index": {key: [offset, count]}, "segments"},
+              padded with spaces to a multiple of 8 bytes
+    times     int64[segments, 2] of (start, end) ticks, one contiguous buffer
+    labels    int32[segments] ids into the vocabulary
+
+Archives are read through mmap, and each utterance is a zero-copy slice of
+the shared buffers. Export back to loose files with:
+    python -m daisy_common.archive -i corpus.dsa -o out_dir --format lab seg
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from daisy_common.segtable import LabelVocabulary, SegmentTable, format_lab, format_seg, rename_silences
+
+MAGIC = b"DSEGARC1"
+
+def archive_key(root, path):
+    """
+    Returns the archive key of a file: its path relative to root, without extension, with '/' separators.
+    """
+    relative_path = os.path.splitext(os.path.relpath(path, root))[0]
+    return relative_path.replace(os.sep, "/")
+
+class ArchiveWriter:
+    """
+    Collects segment tables and writes them as one packed archive on close().
+    """
+
+    def __init__(self, path, kind="lab"):
+        """
+        Args:
+            path (str): Archive path.
+            kind (str): Format of the segments ("lab", or "seg" with the silences renamed);
+                also the default export format.
+        """
+        self.path = path
+        self.kind = kind
+        self.vocab = LabelVocabulary()
+        self.index = {}
+        self._times = []
+        self._labels = []
+        self._segments = 0
+
+    def add(self, key, table):
+        """
+        Adds a SegmentTable under key.
+        """
+        # Translate the table's label ids to archive ids once per distinct label
+        unique_ids, inverse = np.unique(table.labels, return_inverse=True)
+        archive_ids = self.vocab.intern_many(table.vocab.decode(unique_ids))
+        self._add_arrays(key, table.starts, table.ends, archive_ids[inverse.reshape(-1)])
+
+    def add_rows(self, key, starts, ends, labels):
+        """
+        Adds one utterance from tick sequences and label strings.
+        """
+        self._add_arrays(key, starts, ends, self.vocab.intern_many(labels))
+
+    def _add_arrays(self, key, starts, ends, label_ids):
+        if key in self.index:
+            raise ValueError(f"Duplicate archive key: {key}")
+        count = len(label_ids)
+        self.index[key] = [self._segments, count]
+        self._times.append(np.column_stack([np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)]))
+        self._labels.append(np.asarray(label_ids, dtype=np.int32))
+        self._segments += count
+
+    def close(self):
+        """
+        Writes the archive atomically.
+        """
+        header = json.dumps({
+            "kind": self.kind,
+            "vocabulary": self.vocab.labels,
+            "index": self.index,
+            "segments": self._segments,
+        }, ensure_ascii=False).encode("utf-8")
+        header += b" " * (-len(header) % 8)
+
+        times = np.concatenate(self._times) if self._times else np.empty((0, 2), dtype=np.int64)
+        labels = np.concatenate(self._labels) if self._labels else np.empty(0, dtype=np.int32)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(times.astype("<i8").tobytes())
+            f.write(labels.astype("<i4").tobytes())
+        os.replace(tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+class Archive:
+    """
+    Read-only, memory-mapped view of a packed archive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a segment archive: {path}")
+        header_length, = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        data_offset = len(MAGIC) + 8 + header_length
+        header = json.loads(bytes(self._mmap[len(MAGIC) + 8:data_offset]).decode("utf-8"))
+
+        self.kind = header["kind"]
+        self.index = header["index"]
+        self.vocab = LabelVocabulary(header["vocabulary"])
+        segments = header["segments"]
+        self.times = np.frombuffer(self._mmap, dtype="<i8", count=segments * 2, offset=data_offset).reshape(segments, 2)
+        self.labels = np.frombuffer(self._mmap, dtype="<i4", count=segments, offset=data_offset + segments * 16)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def __getitem__(self, key):
+        """
+        Returns the SegmentTable of an utterance as views into the mapped buffers.
+        """
+        offset, count = self.index[key]
+        times = self.times[offset:offset + count]
+        return SegmentTable(times[:, 0], times[:, 1], self.labels[offset:offset + count], self.vocab)
+
+    def close(self):
+        self.times = self.labels = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Tables handed out by __getitem__ still view the mapping; it is released with them
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def _format_seg_from_lab(table):
+    return format_seg(rename_silences(table))
+
+# (archive kind, export format) to formatter. A .seg archive has its
+# silences renamed to 'Sil' already, so it cannot be exported as .lab.
+EXPORTERS = {
+    ("lab", "lab"): format_lab,
+    ("lab", "seg"): _format_seg_from_lab,
+    ("seg", "seg"): format_seg,
+}
+
+def export_archive(archive_path, output_dir, formats=None):
+    """
+    Writes every utterance of an archive back to loose files.
+
+    A .lab archive exported as .seg gets its silences renamed like lab2seg does.
+
+    Args:
+        archive_path (str): Path to the archive.
+        output_dir (str): Directory for the loose files.
+        formats (list, optional): Any of "lab" and "seg". Defaults to the archive kind.
+
+    Returns:
+        int: Number of files written.
+
+    Raises:
+        ValueError: If a format cannot be exported from this kind of archive.
+    """
+    written = 0
+    with Archive(archive_path) as archive:
+        formats = formats or [archive.kind]
+        for extension in formats:
+            if (archive.kind, extension) not in EXPORTERS:
+                raise ValueError(f"A {archive.kind} archive cannot be exported as .{extension} files.")
+        for key in sorted(archive.keys()):
+            table = archive[key]
+            for extension in formats:
+                path = os.path.join(output_dir, *key.split("/")) + "." + extension
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(EXPORTERS[archive.kind, extension](table))
+                written += 1
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a packed segment archive to loose .lab/.seg files.")
+    parser.add_argument("-i", "--input", required=True, help="Path to the archive.")
+    parser.add_argument("-o", "--output", required=True, help="Directory where the files will be saved.")
+    parser.add_argument("--format", nargs="+", choices=["lab", "seg"], help="Formats to write. Defaults to the archive kind.")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.input):
+        print(f"Error: Archive does not exist: {args.input}")
+        return
+
+    try:
+        written = export_archive(args.input, args.output, args.format)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print(f"Exported {written} files to {args.output}")
+
+if __name__ == "__main__":
+    main()
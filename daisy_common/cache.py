@@ -0,0 +1,299 @@
+"""
+Incremental rebuild support: a manifest of the outputs written by a converter,
+an on-disk cache for compiled converter tables, and memoization caches for
+converted text.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+MANIFEST_NAME = ".daisy_manifest.json"
+
+def file_fingerprint(path):
+    """
+    Returns the (mtime_ns, size) fingerprint of a file.
+    """
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def options_hash(files=(), **options):
+    """
+    Hashes the content of the given files together with the converter options.
+
+    Args:
+        files (iterable): Paths whose content affects the output (converter tables, scripts).
+        **options: JSON-serializable options that affect the output.
+
+    Returns:
+        str: Hex digest identifying this converter configuration.
+    """
+    digest = hashlib.sha256()
+    for path in files:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def module_sources(*names):
+    """
+    Returns the source paths of imported modules, for options_hash.
+
+    A converter's output depends on the shared modules it calls as much as on
+    its own script, so incremental builds hash all of them.
+
+    Args:
+        *names (str): Module names, e.g. __name__ and 'daisy_common.segtable'.
+
+    Returns:
+        list: Absolute paths of the module files.
+    """
+    return [os.path.abspath(sys.modules[name].__file__) for name in names]
+
+def default_cache_dir():
+    """
+    Returns the directory for cached compiled tables.
+
+    Uses $DAISY_CACHE_DIR when set, otherwise ~/.cache/daisyautoseg.
+    """
+    return os.environ.get("DAISY_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "daisyautoseg")
+
+def load_cached(name):
+    """
+    Loads a pickled object from the cache directory.
+
+    Returns:
+        The cached object, or None if it is missing or unreadable.
+    """
+    try:
+        with open(os.path.join(default_cache_dir(), name), 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def store_cached(name, obj):
+    """
+    Pickles obj into the cache directory. Failures are ignored: the cache is an optimization.
+    """
+    path = os.path.join(default_cache_dir(), name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(default_cache_dir(), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+class LRUCache:
+    """
+    A bounded mapping that evicts the least recently used entry.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the value of key, or None if it is not cached.
+        """
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+class PersistentCache:
+    """
+    A string-to-string cache in an SQLite file, shared across runs and processes.
+
+    Entries are stored with a version key (e.g. a hash of the tables that
+    produced them). Opening the cache with another version drops the stale
+    entries. The connection is opened on first use and is not pickled, so the
+    cache can be handed to worker processes.
+    """
+
+    def __init__(self, path, version):
+        """
+        Args:
+            path (str): Path of the SQLite file.
+            version (str): Version key of the entries.
+        """
+        self.path = path
+        self.version = version
+        self._connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    def _connect(self):
+        if self._connection is None:
+            import sqlite3
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Autocommit: workers have no shutdown hook to commit a batch
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # A lost entry is recomputed, so durability is not worth an fsync per insert
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute("CREATE TABLE IF NOT EXISTS entries "
+                               "(version TEXT, key TEXT, value TEXT, PRIMARY KEY (version, key))")
+            connection.execute("DELETE FROM entries WHERE version != ?", (self.version,))
+            self._connection = connection
+        return self._connection
+
+    def get(self, key):
+        """
+        Returns the value of key, or None if it is not cached.
+        """
+        row = self._connect().execute("SELECT value FROM entries WHERE version = ? AND key = ?",
+                                      (self.version, key)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, key, value):
+        self._connect().execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (self.version, key, value))
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class BuildManifest:
+    """
+    Persistent record of which input and options produced each output file.
+
+    The manifest lives in the output directory. Outputs are keyed by their path
+    relative to that directory so the tree can be moved without invalidating it.
+    """
+
+    def __init__(self, output_dir, options_key):
+        """
+        Loads the manifest of output_dir, if there is one.
+
+        Args:
+            output_dir (str): Directory that holds the outputs and the manifest.
+            options_key (str): Hash of the converter files and options for this run.
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.options_key = options_key
+        self.entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("outputs", {})
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def _key(self, output_path):
+        return os.path.relpath(output_path, self.output_dir)
+
+    def is_fresh(self, input_path, output_path):
+        """
+        Returns True if output_path was built from the current input and options.
+        """
+        entry = self.entries.get(self._key(output_path))
+        if entry is None or entry["options"] != self.options_key:
+            return False
+        if entry["input"] != os.path.abspath(input_path):
+            return False
+        try:
+            if entry["fingerprint"] != file_fingerprint(input_path):
+                return False
+        except OSError:
+            return False
+        # Inputs that produced no output (e.g. empty files) stay fresh without one
+        return not entry["written"] or os.path.exists(output_path)
+
+    def record(self, input_path, output_path):
+        """
+        Records that output_path was (re)built from input_path.
+        """
+        self.entries[self._key(output_path)] = {
+            "input": os.path.abspath(input_path),
+            "fingerprint": file_fingerprint(input_path),
+            "options": self.options_key,
+            "written": os.path.exists(output_path),
+        }
+
+    def forget(self, output_path):
+        """
+        Drops output_path from the manifest so the next run rebuilds it.
+        """
+        self.entries.pop(self._key(output_path), None)
+
+    def prune(self, output_paths):
+        """
+        Deletes outputs recorded in the manifest that are no longer expected.
+
+        Args:
+            output_paths (iterable): Every output the current inputs map to.
+
+        Returns:
+            list: Paths of the removed orphaned outputs.
+        """
+        expected = {self._key(path) for path in output_paths}
+        removed = []
+        for key in sorted(set(self.entries) - expected):
+            entry = self.entries.pop(key)
+            orphan = os.path.join(self.output_dir, key)
+            if entry["written"] and os.path.exists(orphan):
+                os.remove(orphan)
+                removed.append(orphan)
+        return removed
+
+    def apply_results(self, results, outputs):
+        """
+        Updates the manifest from run_jobs results and drops orphaned outputs.
+
+        Args:
+            results (list): (path, message, error) tuples of the converted inputs.
+            outputs (dict): Mapping of every current input path to its output path.
+
+        Returns:
+            list: Paths of the removed orphaned outputs.
+        """
+        for path, _, error in results:
+            if error is None:
+                self.record(path, outputs[path])
+            else:
+                self.forget(outputs[path])
+        return self.prune(outputs.values())
+
+    def save(self):
+        """
+        Writes the manifest atomically.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"outputs": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def plan_incremental(manifest, jobs_by_input):
+    """
+    Splits (input, output) pairs into stale ones and up-to-date ones.
+
+    Args:
+        manifest (BuildManifest): The loaded manifest.
+        jobs_by_input (dict): Mapping of input path to expected output path.
+
+    Returns:
+        tuple: (stale input paths, number of up-to-date inputs)
+    """
+    stale = [path for path, output in jobs_by_input.items() if not manifest.is_fresh(path, output)]
+    return stale, len(jobs_by_input) - len(stale)
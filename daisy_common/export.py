@@ -0,0 +1,120 @@
+"""
+Output formats for segment tables, so one TextGrid parse can feed several writers.
+
+An Export names the tiers it reads, a format and an output directory. The
+tiers of a file are parsed and converted to SegmentTables once, then every
+Export formats the tables it needs. Formats:
+
+    lab   "start end label" lines in 100ns ticks (one tier)
+    seg   the lab2seg .seg layout, silences renamed to 'Sil' (one tier)
+    htk   HTK label file: lab lines with labels quoted where HTK requires it (one tier)
+    json  {"unit": "100ns", "tiers": {name: [[start, end, label], ...]}} (any tiers)
+"""
+import json
+import os
+
+from daisy_common.segtable import format_lab, format_seg, rename_silences
+
+def _format_lab(tables):
+    return format_lab(tables[0][1])
+
+def _format_seg(tables):
+    return format_seg(rename_silences(tables[0][1]))
+
+def _htk_label(label):
+    # HTK reads labels that start with a digit or a quote, or contain whitespace, only when quoted
+    if label and not label[0].isdigit() and label[0] not in "\"'" and not any(c.isspace() for c in label):
+        return label
+    return '"' + label.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def _format_htk(tables):
+    table = tables[0][1]
+    return "".join(f"{start} {end} {_htk_label(label)}\n" for start, end, label
+                   in zip(table.starts.tolist(), table.ends.tolist(), table.label_strings()))
+
+def _format_json(tables):
+    data = {"unit": "100ns", "tiers": {
+        name: [list(row) for row in zip(table.starts.tolist(), table.ends.tolist(), table.label_strings())]
+        for name, table in tables
+    }}
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+# Format name: (extension, formatter, whether it takes several tiers)
+FORMATS = {
+    "lab": (".lab", _format_lab, False),
+    "seg": (".seg", _format_seg, False),
+    "htk": (".lab", _format_htk, False),
+    "json": (".json", _format_json, True),
+}
+
+class Export:
+    """
+    One output of a multi-format conversion: tiers, a format and a directory.
+    """
+
+    def __init__(self, tiers, format_name, directory):
+        """
+        Args:
+            tiers (list): Names of the tiers to write.
+            format_name (str): One of FORMATS.
+            directory (str): Output directory; files mirror the input tree.
+        """
+        if format_name not in FORMATS:
+            raise ValueError(f"Unknown export format '{format_name}', expected one of: {', '.join(FORMATS)}")
+        if not tiers:
+            raise ValueError("An export needs at least one tier")
+        if len(tiers) > 1 and not FORMATS[format_name][2]:
+            raise ValueError(f"The {format_name} format writes a single tier, got: {', '.join(tiers)}")
+        self.tiers = list(tiers)
+        self.format_name = format_name
+        self.directory = directory
+
+    def __repr__(self):
+        return f"Export({','.join(self.tiers)}:{self.format_name}:{self.directory})"
+
+    def output_path(self, relative_stem):
+        """
+        Returns the output path for an input file, given its path relative to the
+        input directory without extension.
+        """
+        return os.path.join(self.directory, relative_stem + FORMATS[self.format_name][0])
+
+    def render(self, tables):
+        """
+        Formats the tables of one file.
+
+        Args:
+            tables (dict): Tier name to SegmentTable, covering at least self.tiers.
+
+        Returns:
+            str: The file content, or None when every tier of this export is empty.
+        """
+        selected = [(name, tables[name]) for name in self.tiers]
+        if not any(len(table) for _, table in selected):
+            return None
+        return FORMATS[self.format_name][1](selected)
+
+def parse_export(spec):
+    """
+    Parses an export given as "TIERS:FORMAT:DIRECTORY", e.g. "phones:lab:out/lab"
+    or "phones,words:json:out/json".
+
+    Returns:
+        Export: The parsed export.
+    """
+    parts = spec.split(":", 2)
+    if len(parts) != 3 or not parts[2]:
+        raise ValueError(f"Expected TIERS:FORMAT:DIRECTORY, got '{spec}'")
+    tiers, format_name, directory = parts
+    return Export([tier for tier in tiers.split(",") if tier], format_name, directory)
+
+def export_tiers(exports):
+    """
+    Returns the names of the tiers the exports read, in first-use order.
+    """
+    tiers = []
+    for export in exports:
+        for tier in export.tiers:
+            if tier not in tiers:
+                tiers.append(tier)
+    return tiers
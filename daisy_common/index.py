@@ -0,0 +1,286 @@
+"""
+Corpus index: phoneme inventory and validation results, built while converting.
+
+The converters record every table they write with record(): per-phoneme
+counts and durations, the segment count and the anomalies of the file
+(zero-length, negative-length, overlapping segments, gaps and labels the
+converter rules do not produce). Worker processes send their entries back
+with their results, like their metrics. update_index() then merges the
+entries of the run into a JSON index file, so questions such as "which
+files contain 'vf'?" are answered from the index without rereading the
+corpus (see corpus_index.py).
+"""
+import os
+
+INDEX_VERSION = 1
+
+# Anomaly kinds, in report order. "unmapped" lists labels, the others count segments.
+ANOMALY_KINDS = ("zero_length", "negative_length", "overlap", "gap", "unmapped")
+
+def add_index_argument(parser):
+    """
+    Adds the shared --index option to an argparse parser.
+    """
+    parser.add_argument("--index", metavar="PATH",
+                        help="Update the corpus index (phoneme inventory and anomalies) in this JSON file.")
+
+class EntryBuilder:
+    """
+    Accumulates the index entry of a file from its tables, for files converted in several blocks.
+    """
+
+    def __init__(self, known=None):
+        """
+        Args:
+            known (set, optional): Labels the converter produces; other labels are
+                reported as unmapped. None skips the check.
+        """
+        self.known = known
+        self.segments = 0
+        self.first_start = None
+        self.last_end = None
+        self.phonemes = {}
+        self.counts = dict.fromkeys(ANOMALY_KINDS[:-1], 0)
+
+    def add(self, table):
+        """
+        Adds the segments of a table that follows the previously added ones.
+        """
+        starts = table.starts.tolist()
+        ends = table.ends.tolist()
+        if not starts:
+            return
+        phonemes = self.phonemes
+        zero_length = negative_length = 0
+        for start, end, label in zip(starts, ends, table.label_strings()):
+            duration = end - start
+            if duration == 0:
+                zero_length += 1
+            elif duration < 0:
+                negative_length += 1
+            counts = phonemes.get(label)
+            if counts is None:
+                phonemes[label] = [1, duration]
+            else:
+                counts[0] += 1
+                counts[1] += duration
+        # Each segment against the next one, starting from the last segment of the previous table
+        previous_ends, next_starts = ends[:-1], starts[1:]
+        if self.last_end is not None:
+            previous_ends, next_starts = [self.last_end] + previous_ends, starts
+        overlap = gap = 0
+        for end, start in zip(previous_ends, next_starts):
+            if end > start:
+                overlap += 1
+            elif end < start:
+                gap += 1
+
+        counts = self.counts
+        counts["zero_length"] += zero_length
+        counts["negative_length"] += negative_length
+        counts["overlap"] += overlap
+        counts["gap"] += gap
+        if self.first_start is None:
+            self.first_start = starts[0]
+        self.last_end = ends[-1]
+        self.segments += len(starts)
+
+    def entry(self):
+        """
+        Returns the entry: {"segments", "duration", "phonemes": {label: [count, ticks]}, "anomalies"}.
+        """
+        anomalies = {kind: value for kind, value in self.counts.items() if value}
+        if self.known is not None:
+            unmapped = sorted(label for label in self.phonemes if label not in self.known)
+            if unmapped:
+                anomalies["unmapped"] = unmapped
+        return {
+            "segments": self.segments,
+            "duration": self.last_end - self.first_start if self.segments else 0,
+            "phonemes": self.phonemes,
+            "anomalies": anomalies,
+        }
+
+def file_entry(table, known=None):
+    """
+    Summarizes one SegmentTable for the index.
+
+    Args:
+        table (SegmentTable): The segments written for a file.
+        known (set, optional): Labels the converter produces (see EntryBuilder).
+
+    Returns:
+        dict: The entry, as returned by EntryBuilder.entry().
+    """
+    builder = EntryBuilder(known)
+    builder.add(table)
+    return builder.entry()
+
+# Entries recorded by this process since the last take_recorded()
+_recorded = {}
+
+def record(key, table, known=None):
+    """
+    Records the index entry of a converted file in this process.
+
+    Args:
+        key (str): File key, its path relative to the input directory without
+            extension (see daisy_common.archive.archive_key).
+        table (SegmentTable): The segments written for the file.
+        known (set, optional): Labels the converter produces (see file_entry).
+    """
+    _recorded[key] = file_entry(table, known)
+
+def record_entry(key, entry):
+    """
+    Records an entry built with EntryBuilder (files converted in several blocks).
+    """
+    _recorded[key] = entry
+
+def take_recorded():
+    """
+    Returns the entries recorded so far and resets them.
+    """
+    global _recorded
+    taken, _recorded = _recorded, {}
+    return taken
+
+def merge_recorded(entries):
+    """
+    Adds entries recorded by another process (e.g. returned by a worker).
+    """
+    if entries:
+        _recorded.update(entries)
+
+class CorpusIndex:
+    """
+    Per-file index entries with the corpus-wide totals derived from them.
+    """
+
+    def __init__(self, files=None):
+        """
+        Args:
+            files (dict, optional): File key to entry, as returned by file_entry.
+        """
+        self.files = files if files is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index file.
+
+        Raises:
+            ValueError: If the file is not an index of this version.
+        """
+        import json
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Not a version {INDEX_VERSION} corpus index: {path}")
+        return cls(data["files"])
+
+    def save(self, path):
+        """
+        Writes the index as JSON, replacing the file atomically.
+
+        Besides the per-file entries, the phoneme totals and anomaly lists are
+        stored so other tools can read them without recomputing.
+        """
+        import json
+        from daisy_common.output import atomic_write_text
+        data = {
+            "version": INDEX_VERSION,
+            "unit": "100ns",
+            "phonemes": self.phonemes(),
+            "anomalies": self.anomalies(),
+            "files": dict(sorted(self.files.items())),
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Not indented: json only uses its C encoder for compact output
+        atomic_write_text(path, json.dumps(data, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    def update(self, entries):
+        """
+        Adds or replaces the entries of the files converted in a run.
+        """
+        self.files.update(entries)
+
+    def retain(self, keys):
+        """
+        Drops the entries of files that are not in keys (e.g. deleted since the last run).
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        keys = set(keys)
+        stale = [key for key in self.files if key not in keys]
+        for key in stale:
+            del self.files[key]
+        return len(stale)
+
+    def phonemes(self):
+        """
+        Returns the phoneme inventory: label to {"count", "duration", "files"},
+        most frequent first. Durations are in 100ns ticks.
+        """
+        totals = {}
+        for entry in self.files.values():
+            for label, (count, duration) in entry["phonemes"].items():
+                total = totals.get(label)
+                if total is None:
+                    totals[label] = {"count": count, "duration": duration, "files": 1}
+                else:
+                    total["count"] += count
+                    total["duration"] += duration
+                    total["files"] += 1
+        return dict(sorted(totals.items(), key=lambda item: (-item[1]["count"], item[0])))
+
+    def files_with(self, labels):
+        """
+        Returns the sorted keys of the files containing every label of labels.
+        """
+        return sorted(key for key, entry in self.files.items()
+                      if all(label in entry["phonemes"] for label in labels))
+
+    def anomalies(self, kind=None):
+        """
+        Returns the files with anomalies.
+
+        Args:
+            kind (str, optional): One of ANOMALY_KINDS; None returns every kind.
+
+        Returns:
+            dict: Kind to {file key: segment count, or unmapped labels}, for the
+            kinds that occur.
+        """
+        found = {}
+        for key, entry in sorted(self.files.items()):
+            for anomaly, value in entry["anomalies"].items():
+                if kind is None or anomaly == kind:
+                    found.setdefault(anomaly, {})[key] = value
+        return {anomaly: found[anomaly] for anomaly in ANOMALY_KINDS if anomaly in found}
+
+def update_index(path, keys=None):
+    """
+    Merges the entries recorded in this run into the index file at path.
+
+    Args:
+        path (str): Index file; created when missing.
+        keys (iterable, optional): Keys of every file of the corpus. Entries of
+            other files are dropped. None keeps them (partial runs, watch mode).
+
+    Returns:
+        CorpusIndex: The updated index.
+    """
+    from daisy_common.metrics import get_metrics
+    with get_metrics().time("index"):
+        index = CorpusIndex.load(path) if os.path.exists(path) else CorpusIndex()
+        entries = take_recorded()
+        index.update(entries)
+        if keys is not None:
+            index.retain(keys)
+        index.save(path)
+    print(f"Index updated: {path} ({len(entries)} files recorded, {len(index.files)} indexed)")
+    return index
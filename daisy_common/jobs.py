@@ -0,0 +1,158 @@
+"""
+Process-pool helpers shared by the converter CLIs.
+"""
+import os
+import sys
+from functools import partial
+
+from daisy_common.index import merge_recorded, take_recorded
+from daisy_common.metrics import get_metrics, output_mode, progress_bar
+
+def add_jobs_argument(parser):
+    """
+    Adds the shared -j/--jobs option to an argparse parser.
+    """
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of worker processes (0 uses every CPU). Default: 1.")
+
+def resolve_jobs(jobs):
+    """
+    Returns the number of worker processes to use for a --jobs value.
+    """
+    if jobs is None:
+        return 1
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+def chunk_paths(paths, jobs, chunk_size=None):
+    """
+    Splits paths into chunks so each worker call handles several files.
+
+    Args:
+        paths (list): File paths.
+        jobs (int): Number of worker processes.
+        chunk_size (int, optional): Files per chunk. Defaults to about four chunks per worker.
+
+    Returns:
+        list: List of path lists.
+    """
+    if chunk_size is None:
+        chunk_size = max(1, min(256, -(-len(paths) // (jobs * 4))))
+    return [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+def _run_chunk(func, paths, finalizer=None, progress=None):
+    """
+    Runs func on every path of a chunk, capturing per-file errors.
+
+    The finalizer runs after the chunk (e.g. to commit batched output); if it
+    fails, every file of the chunk is reported with its error.
+    """
+    results = []
+    for path in paths:
+        try:
+            results.append((path, func(path), None))
+        except Exception as e:
+            results.append((path, None, str(e)))
+        if progress is not None:
+            progress.update()
+    if finalizer is not None:
+        try:
+            finalizer()
+        except Exception as e:
+            results = [(path, None, error or str(e)) for path, _, error in results]
+    return results
+
+def _run_chunk_reporting(func, paths, finalizer=None):
+    """
+    Runs a chunk in a worker process and returns its results with the worker's
+    metrics and corpus index entries.
+    """
+    results = _run_chunk(func, paths, finalizer)
+    return results, get_metrics().take(), take_recorded()
+
+def _init_worker(initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+
+def count_results(results):
+    """
+    Adds the number of processed and failed files of a run to the metrics.
+    """
+    metrics = get_metrics()
+    metrics.count("files", len(results))
+    metrics.count("failed", sum(1 for _, _, error in results if error is not None))
+
+def run_jobs(func, paths, jobs=1, initializer=None, initargs=(), chunk_size=None, finalizer=None):
+    """
+    Runs func(path) for every path, optionally in a process pool.
+
+    The initializer runs once per worker process (or once in-process when
+    jobs is 1) so converter tables are loaded once instead of per file.
+    func and the initializer must be module-level functions or partials of
+    them so they can be sent to the workers.
+
+    Args:
+        func (callable): Function called with one path, returning a result.
+        paths (iterable): File paths to process.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        initializer (callable, optional): Called once per worker before any file.
+        initargs (tuple): Arguments for the initializer.
+        chunk_size (int, optional): Files sent to a worker per call.
+        finalizer (callable, optional): Called in the worker after each chunk.
+
+    Returns:
+        list: (path, result, error) tuples sorted by path. error is None on
+        success, otherwise the exception message.
+    """
+    paths = sorted(paths)
+    jobs = resolve_jobs(jobs)
+    progress = progress_bar(len(paths))
+
+    if jobs == 1 or len(paths) <= 1:
+        _init_worker(initializer, initargs)
+        results = _run_chunk(func, paths, finalizer, progress)
+        count_results(results)
+        return results
+
+    # Imported here: multiprocessing is only worth its import time with workers
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    metrics = get_metrics()
+    chunks = chunk_paths(paths, jobs, chunk_size)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks)), initializer=_init_worker,
+                             initargs=(initializer, initargs)) as executor:
+        for chunk_results, worker_metrics, worker_entries in executor.map(
+                partial(_run_chunk_reporting, func, finalizer=finalizer), chunks):
+            results.extend(chunk_results)
+            metrics.merge(worker_metrics)
+            merge_recorded(worker_entries)
+            if progress is not None:
+                progress.update(len(chunk_results))
+    results.sort(key=lambda item: item[0])
+    count_results(results)
+    return results
+
+def print_results(results):
+    """
+    Prints the messages and errors returned by run_jobs, in path order.
+
+    In quiet and progress modes only the errors are printed. The lines are
+    written in one call, which is much cheaper than one print per file.
+
+    Returns:
+        int: Number of failed files.
+    """
+    failures = 0
+    verbose = output_mode() == "verbose"
+    lines = []
+    for path, message, error in results:
+        if error is not None:
+            failures += 1
+            lines.append(f"Error processing {path}: {error}")
+        elif message and verbose:
+            lines.append(message)
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    return failures
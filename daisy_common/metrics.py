@@ -0,0 +1,224 @@
+"""
+Instrumentation shared by the converter CLIs.
+
+Every process records into one Metrics object: cumulative seconds per stage
+(scan, read, parse, convert, write), counters, and hits per converter rule.
+Worker processes send their metrics back with their results and the job
+runners merge them, so the totals cover the whole run. The CLI options
+select quiet or progress-bar output instead of per-file prints, a JSON
+metrics dump and an optional cProfile of the main process.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+class Metrics:
+    """
+    Stage timers, counters and rule hits of one process.
+    """
+
+    def __init__(self):
+        self.timers = Counter()
+        self.counters = Counter()
+        self.rule_hits = {}
+        # The I/O threads of daisy_common.scan record concurrently
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage):
+        """
+        Adds the time spent in the with-block to stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timers[stage] += elapsed
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def count_rules(self, converter, hits):
+        """
+        Adds per-rule hit counts of a converter.
+
+        Args:
+            converter (str): Name of the converter (e.g. "textgrid2lab").
+            hits (dict): Rule to number of hits.
+        """
+        if hits:
+            with self._lock:
+                self.rule_hits.setdefault(converter, Counter()).update(hits)
+
+    def merge(self, other):
+        """
+        Adds the metrics of another Metrics (e.g. returned by a worker).
+        """
+        with self._lock:
+            self.timers.update(other.timers)
+            self.counters.update(other.counters)
+            for converter, hits in other.rule_hits.items():
+                self.rule_hits.setdefault(converter, Counter()).update(hits)
+
+    def take(self):
+        """
+        Returns the metrics recorded so far and resets them.
+        """
+        taken = Metrics()
+        with self._lock:
+            taken.timers, self.timers = self.timers, Counter()
+            taken.counters, self.counters = self.counters, Counter()
+            taken.rule_hits, self.rule_hits = self.rule_hits, {}
+        return taken
+
+    def to_dict(self):
+        return {
+            "timers": {stage: round(seconds, 6) for stage, seconds in sorted(self.timers.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "rule_hits": {converter: dict(hits.most_common())
+                          for converter, hits in sorted(self.rule_hits.items())},
+        }
+
+_metrics = Metrics()
+
+def get_metrics():
+    """
+    Returns the Metrics of this process.
+    """
+    return _metrics
+
+class ProgressBar:
+    """
+    A single-line progress bar on stderr, redrawn at most ten times per second.
+    """
+
+    def __init__(self, total, label="files", stream=None):
+        self.total = total
+        self.label = label
+        self.stream = stream if stream is not None else sys.stderr
+        self.done = 0
+        self.start = time.perf_counter()
+        self._drawn = 0.0
+
+    def update(self, count=1):
+        self.done += count
+        now = time.perf_counter()
+        if now - self._drawn >= 0.1 or self.done >= self.total:
+            self._drawn = now
+            self._draw(now)
+
+    def _draw(self, now):
+        width = 30
+        filled = width * self.done // self.total if self.total else width
+        rate = self.done / (now - self.start) if now > self.start else 0.0
+        self.stream.write(f"\r[{'#' * filled}{' ' * (width - filled)}] {self.done}/{self.total} "
+                          f"{self.label} {rate:.1f}/s")
+        if self.done >= self.total:
+            self.stream.write("\n")
+        self.stream.flush()
+
+# Output mode of this process: "verbose" prints one line per file
+_output_mode = "verbose"
+
+def set_output_mode(mode):
+    """
+    Selects how runs report: "verbose" (one line per file), "quiet" or "progress".
+    """
+    global _output_mode
+    _output_mode = mode
+
+def output_mode():
+    return _output_mode
+
+def progress_bar(total, label="files"):
+    """
+    Returns a ProgressBar when the progress mode is on, otherwise None.
+    """
+    if _output_mode == "progress" and total:
+        return ProgressBar(total, label)
+    return None
+
+def add_metrics_arguments(parser):
+    """
+    Adds the shared --quiet, --progress, --metrics-json and --profile options.
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-q", "--quiet", action="store_true", help="Only print errors and a summary.")
+    group.add_argument("--progress", action="store_true", help="Show a progress bar instead of per-file lines.")
+    parser.add_argument("--metrics-json", help="Write stage timings, counters and rule hits to this JSON file.")
+    parser.add_argument("--profile", help="Profile the main process with cProfile and write the stats to this file.")
+
+@contextmanager
+def instrument(args, name):
+    """
+    Applies the metrics options of a parsed command line around a run.
+
+    Args:
+        args (argparse.Namespace): Parsed options from add_metrics_arguments.
+        name (str): Name of the script, stored in the JSON dump.
+
+    Yields:
+        Metrics: The metrics of this process.
+    """
+    set_output_mode("quiet" if args.quiet else "progress" if args.progress else "verbose")
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield _metrics
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            _print_profile(profiler)
+        if _output_mode != "verbose":
+            print(format_summary(_metrics, elapsed))
+        if args.metrics_json:
+            write_metrics_json(args.metrics_json, _metrics, elapsed, name)
+
+def _print_profile(profiler, limit=15):
+    import io
+    import pstats
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+    sys.stderr.write(output.getvalue())
+
+def format_summary(metrics, elapsed):
+    """
+    Formats the end-of-run summary: files, failures, throughput and stage times.
+    """
+    files = metrics.counters["files"]
+    rate = files / elapsed if elapsed > 0 else 0.0
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in sorted(metrics.timers.items()))
+    summary = f"{files} files, {metrics.counters['failed']} failed in {elapsed:.2f}s ({rate:.1f} files/s)"
+    return f"{summary}; {stages}" if stages else summary
+
+def write_metrics_json(path, metrics, elapsed, name):
+    """
+    Writes the metrics of a run as JSON.
+    """
+    import json
+    data = {"script": name, "elapsed": round(elapsed, 6)}
+    files = metrics.counters["files"]
+    data["files_per_second"] = round(files / elapsed, 3) if elapsed > 0 else None
+    data.update(metrics.to_dict())
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
@@ -0,0 +1,302 @@
+"""
+Atomic, batched output for scripts that rewrite a corpus in place.
+
+BatchWriter stages writes in temporary files next to their targets and
+queues renames and deletions. flush() fsyncs the batch, then commits every
+operation in order with atomic renames, or concurrently in a thread pool
+when the operations of a batch are independent. With a journal, committed operations
+are recorded so an interrupted run can resume and skip them. In dry-run mode
+nothing is touched and the operations are only collected in `plan`.
+"""
+import contextlib
+import json
+import os
+
+def _fsync_directory(path):
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on some platforms (e.g. Windows)
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write_text(path, text, encoding=None, newline=None):
+    """
+    Writes text to path through a fsynced temporary file and an atomic rename.
+
+    text may also be an iterable of strings, written as they are produced. If
+    producing or writing them fails, path is left untouched. newline is passed
+    to open(), e.g. '' to write line endings untranslated.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, 'w', encoding=encoding, newline=newline) as f:
+            _write(f, text)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        # open() itself may have failed before creating the file
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+def _write(f, text):
+    if isinstance(text, str):
+        f.write(text)
+    else:
+        f.writelines(text)
+
+def _temp_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+def _sync_and_close(tmp_file):
+    tmp_file.flush()
+    os.fsync(tmp_file.fileno())
+    tmp_file.close()
+
+def _commit(entry):
+    operation, tmp_file = entry
+    kind, path = operation[0], operation[1]
+    if kind == "write":
+        os.replace(tmp_file.name, path)
+    elif kind == "rename":
+        dst = operation[2]
+        if not os.path.exists(path):
+            # Already moved by a run that stopped before journaling it
+            if os.path.exists(dst):
+                return
+        elif os.path.exists(dst) and not os.path.samefile(path, dst):
+            raise FileExistsError(f"Cannot rename {path} to {dst}: the destination exists")
+        os.rename(path, dst)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def _try_commit(entry):
+    try:
+        _commit(entry)
+    except Exception as e:
+        return e
+    return None
+
+def operation_key(operation):
+    """
+    Returns the journal key of an operation tuple such as ("rename", src, dst).
+    """
+    if operation[0] == "write":
+        return json.dumps(["write", operation[1]], ensure_ascii=False)
+    return json.dumps(list(operation), ensure_ascii=False)
+
+class BatchWriter:
+    """
+    Stages file operations and commits them in fsynced batches.
+    """
+
+    def __init__(self, batch_size=256, dry_run=False, journal=None, threads=1):
+        """
+        Args:
+            batch_size (int): Number of operations per committed batch.
+            dry_run (bool): Only record the operations in `plan`, which stays
+                empty otherwise.
+            journal (str, optional): Path of the resume journal. When it exists,
+                its saved plan, options and committed operations are loaded.
+            threads (int): Threads that fsync and commit a batch. Above 1 the
+                operations of a batch are committed in any order, so no two of
+                them may touch the same path.
+        """
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.journal = journal
+        self.threads = threads
+        self._executor = None
+        self.plan = []
+        self.saved_plan = None
+        self.saved_options = None
+        self.done = set()
+        self._pending = []
+        if journal and os.path.exists(journal):
+            self._load_journal()
+
+    def _load_journal(self):
+        with open(self.journal, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from an interrupted append
+                    continue
+                if "plan" in entry:
+                    self.saved_plan = [tuple(operation) for operation in entry["plan"]]
+                elif "options" in entry:
+                    self.saved_options = entry["options"]
+                else:
+                    self.done.add(entry["done"])
+
+    def _append_journal(self, entries):
+        if not self.journal or self.dry_run:
+            return
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        # One O_APPEND write, so workers sharing a journal never interleave lines
+        fd = os.open(self.journal, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data.encode('utf-8'))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def record_plan(self, plan):
+        """
+        Saves a precomputed plan in the journal so a resumed run replays it.
+        """
+        self.saved_plan = [tuple(operation) for operation in plan]
+        self._append_journal([{"plan": self.saved_plan}])
+
+    def record_options(self, options_key):
+        """
+        Saves the options of a run (see daisy_common.cache.options_hash) in the
+        journal, so a resumed run can check that it converts the same way.
+        """
+        self.saved_options = options_key
+        self._append_journal([{"options": options_key}])
+
+    def is_done(self, operation):
+        """
+        Returns True if operation was committed by an earlier, interrupted run.
+        """
+        return operation_key(operation) in self.done
+
+    def write_text(self, path, text, encoding=None, newline=None):
+        """
+        Stages a text file write. Returns False if it was already committed.
+
+        text may also be an iterable of strings, written to the temporary file
+        as they are produced; it is not kept in the dry-run `plan`. newline is
+        passed to open(), like in atomic_write_text.
+        """
+        return self._stage(("write", path), text, encoding, newline)
+
+    def rename(self, src, dst):
+        """
+        Queues a rename. Returns False if it was already committed.
+
+        The rename is refused with FileExistsError when it is committed if dst
+        exists and src was not moved there already.
+        """
+        return self._stage(("rename", src, dst))
+
+    def remove(self, path):
+        """
+        Queues a deletion. Returns False if it was already committed.
+        """
+        return self._stage(("remove", path))
+
+    def apply(self, operation, encoding=None):
+        """
+        Stages a plan operation: ("write", path, text), ("rename", src, dst) or ("remove", path).
+        """
+        if operation[0] == "write":
+            return self.write_text(operation[1], operation[2], encoding)
+        if operation[0] == "rename":
+            return self.rename(operation[1], operation[2])
+        return self.remove(operation[1])
+
+    def _stage(self, operation, text=None, encoding=None, newline=None):
+        if self.is_done(operation):
+            return False
+        if self.dry_run:
+            self.plan.append(operation + (text,) if isinstance(text, str) else operation)
+            return True
+
+        tmp_file = None
+        if operation[0] == "write":
+            tmp_file = open(_temp_path(operation[1]), 'w', encoding=encoding, newline=newline)
+            try:
+                _write(tmp_file, text)
+            except BaseException:
+                tmp_file.close()
+                os.remove(tmp_file.name)
+                raise
+        self._pending.append((operation, tmp_file))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def _map(self, func, items):
+        if self.threads <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.threads)
+        return list(self._executor.map(func, items))
+
+    def flush(self):
+        """
+        Commits the staged operations: fsync, then rename/delete in order
+        (in parallel with several threads).
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        self._map(_sync_and_close, [tmp_file for _, tmp_file in pending if tmp_file is not None])
+
+        if self.threads <= 1:
+            committed = []
+            errors = []
+            for entry in pending:
+                try:
+                    _commit(entry)
+                except BaseException as e:
+                    errors.append(e)
+                    break
+                committed.append(entry)
+        else:
+            outcomes = self._map(_try_commit, pending)
+            committed = [entry for entry, error in zip(pending, outcomes) if error is None]
+            errors = [error for error in outcomes if error is not None]
+
+        done = {id(entry) for entry in committed}
+        for entry in pending:
+            tmp_file = entry[1]
+            if id(entry) not in done and tmp_file is not None and os.path.exists(tmp_file.name):
+                os.remove(tmp_file.name)
+        directories = set()
+        for operation, _ in committed:
+            directories.add(os.path.dirname(operation[1]))
+            if operation[0] == "rename":
+                directories.add(os.path.dirname(operation[2]))
+        self._map(_fsync_directory, sorted(directories))
+        self._append_journal([{"done": operation_key(operation)} for operation, _ in committed])
+        if errors:
+            raise errors[0]
+
+    def discard(self):
+        """
+        Drops staged operations that were not committed yet.
+        """
+        for _, tmp_file in self._pending:
+            if tmp_file is not None:
+                tmp_file.close()
+                os.remove(tmp_file.name)
+        self._pending = []
+        self._shutdown()
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def close(self, completed=True):
+        """
+        Commits the last batch. When the whole run completed, the journal is removed.
+        """
+        self.flush()
+        self._shutdown()
+        if completed and self.journal and not self.dry_run and os.path.exists(self.journal):
+            os.remove(self.journal)
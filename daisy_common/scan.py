@@ -0,0 +1,241 @@
+"""
+Concurrent directory scanning and file I/O for corpora on slow (network) file systems.
+
+Directory listings, reads and writes run in a bounded thread pool driven by
+asyncio, so many requests are in flight while the converters keep the CPU
+busy. The file system is pluggable: LocalFileSystem wraps os, and any object
+with the same methods (e.g. one that injects latency) can replace it.
+"""
+import io
+import os
+from functools import partial
+
+from daisy_common.index import merge_recorded, take_recorded
+from daisy_common.jobs import _init_worker, count_results, resolve_jobs
+from daisy_common.metrics import get_metrics, progress_bar
+from daisy_common.stream import STREAM_THRESHOLD
+
+DEFAULT_IO_THREADS = 16
+
+def add_io_argument(parser):
+    """
+    Adds the shared --io-threads option to an argparse parser.
+    """
+    parser.add_argument("--io-threads", type=int, default=DEFAULT_IO_THREADS,
+                        help=f"Concurrent directory scans, reads and writes. Default: {DEFAULT_IO_THREADS}.")
+
+class LocalFileSystem:
+    """
+    The operations the scanner and the I/O pipeline need, on the local file system.
+    """
+
+    def scandir(self, path):
+        """
+        Lists a directory.
+
+        Returns:
+            list: (path, is_dir, is_symlink) tuples. Like os.walk, symlinks to
+            directories count as directories.
+        """
+        entries = []
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry.path, is_dir, is_dir and entry.is_symlink()))
+        return entries
+
+    def read_bytes(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def size(self, path):
+        return os.path.getsize(path)
+
+    def write_text(self, path, text, encoding=None):
+        with open(path, 'w', encoding=encoding) as f:
+            f.write(text)
+
+    def makedirs(self, path):
+        os.makedirs(path, exist_ok=True)
+
+def decode_text(data, encoding=None):
+    """
+    Decodes file content exactly like reading it with open(path, 'r', encoding=encoding).
+
+    Universal newlines apply and encoding=None means the locale encoding.
+    """
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding).read()
+
+def scan_files(root, suffixes, fs=None, threads=DEFAULT_IO_THREADS):
+    """
+    Returns the sorted paths of the files under root whose name ends with one of suffixes.
+
+    Directories are listed concurrently. Like os.walk, unreadable directories
+    are skipped and symlinked directories are not followed.
+
+    Args:
+        root (str): Directory to scan.
+        suffixes (str or tuple): File name suffixes to keep.
+        fs (LocalFileSystem, optional): File system to scan. Defaults to the local one.
+        threads (int): Maximum number of directory listings in flight.
+    """
+    # Imported here so that modules using the layer stay cheap to import
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    fs = fs if fs is not None else LocalFileSystem()
+    with get_metrics().time("scan"), ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        found = asyncio.run(_scan(fs, root, suffixes, executor))
+    return sorted(found)
+
+async def _scan(fs, root, suffixes, executor):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    found = []
+
+    async def visit(directory):
+        try:
+            entries = await loop.run_in_executor(executor, fs.scandir, directory)
+        except OSError:
+            return
+        subdirectories = []
+        for path, is_dir, is_symlink in entries:
+            if is_dir:
+                if not is_symlink:
+                    subdirectories.append(path)
+            elif path.endswith(suffixes):
+                found.append(path)
+        await asyncio.gather(*(visit(subdirectory) for subdirectory in subdirectories))
+
+    await visit(root)
+    return found
+
+def _read(fs, path):
+    with get_metrics().time("read"):
+        data = fs.read_bytes(path)
+    get_metrics().count("bytes_read", len(data))
+    return data
+
+def _write(fs, path, text, encoding):
+    with get_metrics().time("write"):
+        fs.write_text(path, text, encoding)
+
+def _convert_reporting(convert, path, data):
+    """
+    Runs convert in a worker process and returns its result with the worker's
+    metrics and corpus index entries.
+    """
+    result = convert(path, data)
+    return result, get_metrics().take(), take_recorded()
+
+def _stream_reporting(stream, path):
+    result = stream(path)
+    return result, get_metrics().take(), take_recorded()
+
+def _is_large(fs, path, threshold):
+    return fs.size(path) >= threshold
+
+def run_io_jobs(convert, paths, jobs=1, initializer=None, initargs=(), fs=None, threads=DEFAULT_IO_THREADS,
+                stream=None, stream_threshold=STREAM_THRESHOLD):
+    """
+    Reads every path, converts its content and writes the outputs, overlapping the I/O.
+
+    Reads and writes run in a pool of `threads` threads; convert runs in
+    `jobs` worker processes (or one thread when jobs is 1), with the same
+    initializer contract as run_jobs. At most 2 * threads files are held in
+    memory at once. With a stream task, files of at least stream_threshold
+    bytes are never read whole: stream converts them itself, piece by piece.
+
+    Args:
+        convert (callable): convert(path, data) with data the file bytes, returning
+            (message, writes); writes is a list of (output_path, text, encoding).
+        paths (iterable): File paths to process.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        initializer (callable, optional): Called once per worker before any file.
+        initargs (tuple): Arguments for the initializer.
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        threads (int): Maximum number of reads and writes in flight.
+        stream (callable, optional): stream(path) converts a large file with its own
+            bounded-memory I/O on the local file system and returns the message.
+        stream_threshold (int): Size in bytes from which files go to stream.
+
+    Returns:
+        list: (path, message, error) tuples sorted by path, like run_jobs.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = sorted(paths)
+    fs = fs if fs is not None else LocalFileSystem()
+    threads = max(1, threads)
+    jobs = resolve_jobs(jobs)
+
+    if jobs == 1:
+        _init_worker(initializer, initargs)
+        cpu_executor = ThreadPoolExecutor(max_workers=1)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        cpu_executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                           initargs=(initializer, initargs))
+        # Worker metrics and index entries come back with each result
+        convert = partial(_convert_reporting, convert)
+        if stream is not None:
+            stream = partial(_stream_reporting, stream)
+    if stream is not None:
+        stream = (stream, stream_threshold)
+    with cpu_executor, ThreadPoolExecutor(max_workers=threads) as io_executor:
+        results = asyncio.run(_run_pipeline(convert, paths, fs, threads, io_executor, cpu_executor, jobs > 1,
+                                            stream))
+    count_results(results)
+    return results
+
+async def _run_pipeline(convert, paths, fs, threads, io_executor, cpu_executor, reporting, stream=None):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    metrics = get_metrics()
+    progress = progress_bar(len(paths))
+    results = [None] * len(paths)
+    pending = iter(range(len(paths)))
+    # One makedirs per output directory, shared by every file written there
+    directories = {}
+
+    async def process(path):
+        if stream is not None and await loop.run_in_executor(io_executor, _is_large, fs, path, stream[1]):
+            result = await loop.run_in_executor(cpu_executor, stream[0], path)
+            if reporting:
+                result, worker_metrics, worker_entries = result
+                metrics.merge(worker_metrics)
+                merge_recorded(worker_entries)
+            return result
+        data = await loop.run_in_executor(io_executor, _read, fs, path)
+        result = await loop.run_in_executor(cpu_executor, convert, path, data)
+        if reporting:
+            result, worker_metrics, worker_entries = result
+            metrics.merge(worker_metrics)
+            merge_recorded(worker_entries)
+        message, writes = result
+        for output_path, text, encoding in writes:
+            directory = os.path.dirname(output_path)
+            if directory:
+                if directory not in directories:
+                    directories[directory] = loop.run_in_executor(io_executor, fs.makedirs, directory)
+                await directories[directory]
+            await loop.run_in_executor(io_executor, _write, fs, output_path, text, encoding)
+        return message
+
+    async def worker():
+        # Each worker holds one file at a time, which bounds memory use
+        for index in pending:
+            path = paths[index]
+            try:
+                results[index] = (path, await process(path), None)
+            except Exception as e:
+                results[index] = (path, None, str(e))
+            if progress is not None:
+                progress.update()
+
+    await asyncio.gather(*(worker() for _ in range(min(len(paths), 2 * threads))))
+    return results
@@ -0,0 +1,221 @@
+"""
+Compact segment tables for .lab/.seg data.
+
+A SegmentTable holds int64 start/end arrays in 100ns ticks and an int32 array
+of label ids into a LabelVocabulary shared by every table of a process, so
+unit conversion and label remapping are array operations.
+"""
+import re
+
+import numpy as np
+
+from daisy_common.ticks import SECONDS_FORMAT, TICKS_PER_SECOND, seconds_fields
+
+SEG_HEADER = "articulationsAreStationaries 0\nphoneme\t\tBeginTime\t\tEndTime\n" + "=" * 49 + "\n"
+
+# A .lab line: "start end label" with optional surrounding whitespace (lab2seg rules)
+_LAB_LINE_PATTERN = re.compile(r'^[^\S\n]*(\d+)[^\S\n]+(\d+)[^\S\n]+(\S.*?)[^\S\n]*$', re.MULTILINE)
+
+class LabelVocabulary:
+    """
+    Interns label strings to integer ids.
+    """
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self.ids = {}
+        for label in labels:
+            self.intern(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def intern(self, label):
+        """
+        Returns the id of label, adding it to the vocabulary if needed.
+        """
+        label_id = self.ids.get(label)
+        if label_id is None:
+            label_id = len(self.labels)
+            self.ids[label] = label_id
+            self.labels.append(label)
+        return label_id
+
+    def intern_many(self, labels):
+        """
+        Returns an int32 array with the ids of labels.
+        """
+        intern = self.intern
+        return np.fromiter((intern(label) for label in labels), dtype=np.int32, count=len(labels))
+
+    def decode(self, label_ids):
+        """
+        Returns the label strings of an id array.
+        """
+        labels = self.labels
+        return [labels[label_id] for label_id in label_ids.tolist()]
+
+_shared_vocabulary = LabelVocabulary()
+
+def shared_vocabulary():
+    """
+    Returns the process-wide LabelVocabulary used when none is given.
+    """
+    return _shared_vocabulary
+
+class LabelRemap:
+    """
+    A label mapping compiled into an id lookup array.
+
+    The lookup array grows with the vocabulary, so every label is looked up in
+    the mapping dict once per process instead of once per segment.
+    """
+
+    def __init__(self, mapping, vocab=None):
+        """
+        Args:
+            mapping (dict): Original label to replacement label.
+            vocab (LabelVocabulary, optional): Defaults to the shared vocabulary.
+        """
+        self.mapping = mapping
+        self.vocab = vocab if vocab is not None else shared_vocabulary()
+        self._lookup = np.empty(0, dtype=np.int32)
+
+    def lookup(self):
+        """
+        Returns the id lookup array covering the whole vocabulary.
+        """
+        vocab = self.vocab
+        size = len(self._lookup)
+        if size < len(vocab):
+            extension = []
+            # Interning a replacement may grow the vocabulary while extending
+            while size + len(extension) < len(vocab):
+                label_id = size + len(extension)
+                replacement = self.mapping.get(vocab.labels[label_id])
+                extension.append(label_id if replacement is None else vocab.intern(replacement))
+            self._lookup = np.concatenate([self._lookup, np.array(extension, dtype=np.int32)])
+        return self._lookup
+
+    def apply(self, table):
+        """
+        Returns a copy of table with its labels remapped.
+        """
+        return SegmentTable(table.starts, table.ends, self.lookup()[table.labels], table.vocab)
+
+class SegmentTable:
+    """
+    Segments as parallel arrays: int64 start/end ticks and int32 label ids.
+    """
+
+    __slots__ = ("starts", "ends", "labels", "vocab")
+
+    def __init__(self, starts, ends, labels, vocab=None):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.vocab = vocab if vocab is not None else shared_vocabulary()
+
+    def __len__(self):
+        return len(self.labels)
+
+    @classmethod
+    def from_rows(cls, starts, ends, labels, vocab=None):
+        """
+        Builds a table from Python sequences of ticks and label strings.
+        """
+        vocab = vocab if vocab is not None else shared_vocabulary()
+        return cls(np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+                   vocab.intern_many(labels), vocab)
+
+    def label_strings(self):
+        """
+        Returns the labels as strings.
+        """
+        return self.vocab.decode(self.labels)
+
+    def seconds(self):
+        """
+        Returns (starts, ends) as float64 arrays in seconds.
+        """
+        return self.starts / TICKS_PER_SECOND, self.ends / TICKS_PER_SECOND
+
+# Silence labels renamed to 'Sil' in .seg files
+SILENCE_MAP = {"R": "Sil", "pau": "Sil"}
+
+_silence_remap = None
+
+def rename_silences(table):
+    """
+    Returns a copy of a SegmentTable with 'R' and 'pau' renamed to 'Sil'.
+    """
+    global _silence_remap
+    if _silence_remap is None or _silence_remap.vocab is not table.vocab:
+        _silence_remap = LabelRemap(SILENCE_MAP, table.vocab)
+    return _silence_remap.apply(table)
+
+def parse_lab(text, vocab=None):
+    """
+    Parses .lab content ("start end label" per line, times in 100ns ticks).
+
+    Lines that do not match are ignored, like lab2seg always did.
+
+    Returns:
+        SegmentTable: The parsed segments.
+    """
+    rows = _LAB_LINE_PATTERN.findall(text)
+    if not rows:
+        return SegmentTable.from_rows([], [], [], vocab)
+    starts, ends, labels = zip(*rows)
+    return SegmentTable.from_rows(np.array(starts).astype(np.int64), np.array(ends).astype(np.int64),
+                                  labels, vocab)
+
+def read_lab(path, vocab=None):
+    """
+    Reads a .lab file into a SegmentTable.
+    """
+    with open(path, 'r') as f:
+        return parse_lab(f.read(), vocab)
+
+def _interleave(*columns):
+    flat = [None] * (len(columns[0]) * len(columns))
+    for offset, column in enumerate(columns):
+        flat[offset::len(columns)] = column
+    return tuple(flat)
+
+def format_lab(table):
+    """
+    Formats a SegmentTable as .lab content, one "start end label" line per segment.
+    """
+    values = _interleave(table.starts.tolist(), table.ends.tolist(), table.label_strings())
+    return ("%d %d %s\n" * len(table)) % values
+
+def format_seg(table):
+    """
+    Formats a SegmentTable as .seg content with times in seconds.
+
+    Times are rounded from the integer ticks to microseconds, half away from
+    zero, before they are printed.
+    """
+    return seg_header(len(table)) + format_seg_rows(table)
+
+def seg_header(count):
+    """
+    Returns the .seg header for a file of count segments.
+    """
+    return "nPhonemes {}\n".format(count) + SEG_HEADER
+
+def format_seg_rows(table):
+    """
+    Formats the rows of a SegmentTable as .seg lines, without the header.
+    """
+    values = _interleave(table.label_strings(), *seconds_fields(table.starts), *seconds_fields(table.ends))
+    row = f"%s\t\t{SECONDS_FORMAT}\t\t{SECONDS_FORMAT}\n"
+    return (row * len(table)) % values
+
+def write_seg(path, table):
+    """
+    Writes a SegmentTable as a .seg file.
+    """
+    with open(path, 'w') as f:
+        f.write(format_seg(table))
@@ -0,0 +1,344 @@
+"""
+Sharded job manifests: plan a conversion once, run it on several machines.
+
+plan_shards() scans the input tree once and writes a manifest that lists
+every input file with its size and shard. Files are assigned to shards by a
+hash of their relative path (stable when files are added) or balanced by
+size. A worker converts the files of one shard in batches and appends each
+finished batch to the shard's checkpoint, with the corpus index entries of
+the batch; a worker that crashes or is stopped resumes after the last
+checkpointed batch. Once every shard is done, the checkpoints are merged
+(see shard_jobs.py).
+
+The manifest stores absolute input and output paths and the checkpoints
+live next to it, so every machine must see them at the same paths (e.g. a
+shared mount).
+"""
+import hashlib
+import heapq
+import json
+import os
+
+SHARD_MANIFEST_VERSION = 1
+
+STRATEGIES = ("hash", "size")
+
+DEFAULT_BATCH_SIZE = 1000
+
+def hash_shard(key, shards):
+    """
+    Returns the shard of a relative path, the same on every machine and Python version.
+    """
+    digest = hashlib.sha1(key.encode("utf-8", "surrogatepass")).digest()
+    return int.from_bytes(digest[:8], "big") % shards
+
+def assign_shards(files, shards, strategy="hash"):
+    """
+    Assigns files to shards.
+
+    Args:
+        files (list): (relative path, size) pairs.
+        shards (int): Number of shards.
+        strategy (str): "hash" partitions by path hash; "size" balances the
+            bytes per shard, largest files first.
+
+    Returns:
+        list: The shard of each file, in the order of files.
+    """
+    if strategy == "hash":
+        return [hash_shard(key, shards) for key, _ in files]
+    if strategy != "size":
+        raise ValueError(f"Unknown shard strategy: {strategy}")
+    assigned = [0] * len(files)
+    totals = [(0, shard) for shard in range(shards)]
+    order = sorted(range(len(files)), key=lambda i: (-files[i][1], files[i][0]))
+    for i in order:
+        total, shard = heapq.heappop(totals)
+        assigned[i] = shard
+        heapq.heappush(totals, (total + files[i][1], shard))
+    return assigned
+
+def _relative_key(root, path):
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+class ShardManifest:
+    """
+    The files of a planned job, their shards and the options to convert them with.
+    """
+
+    def __init__(self, path, tool, input_dir, output_dir, options, options_key, strategy, shards, files,
+                 index=None):
+        """
+        Args:
+            path (str): Path of the manifest file.
+            tool (str): Converter name (see shard_jobs.py).
+            input_dir (str): Absolute input directory.
+            output_dir (str): Absolute output directory, None for in-place tools.
+            options (dict): Converter options.
+            options_key (str): Hash of the converter files and options (see options_hash).
+            strategy (str): One of STRATEGIES.
+            shards (int): Number of shards.
+            files (list): [relative path with '/' separators, size, shard] triples, sorted by path.
+            index (str, optional): Corpus index file updated by the merge.
+        """
+        self.path = path
+        self.tool = tool
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.options = options
+        self.options_key = options_key
+        self.strategy = strategy
+        self.shards = shards
+        self.files = files
+        self.index = index
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a manifest file.
+
+        Raises:
+            ValueError: If the file is not a shard manifest of this version.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != SHARD_MANIFEST_VERSION:
+            raise ValueError(f"Not a version {SHARD_MANIFEST_VERSION} shard manifest: {path}")
+        return cls(path, data["tool"], data["input"], data["output"], data["options"], data["options_key"],
+                   data["strategy"], data["shards"], data["files"], data.get("index"))
+
+    def save(self):
+        """
+        Writes the manifest atomically.
+        """
+        from daisy_common.output import atomic_write_text
+        data = {
+            "version": SHARD_MANIFEST_VERSION,
+            "tool": self.tool,
+            "input": self.input_dir,
+            "output": self.output_dir,
+            "options": self.options,
+            "options_key": self.options_key,
+            "strategy": self.strategy,
+            "shards": self.shards,
+            "index": self.index,
+            "files": self.files,
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    def input_path(self, key):
+        """
+        Returns the absolute input path of a relative path of the manifest.
+        """
+        return os.path.join(self.input_dir, *key.split("/"))
+
+    def shard_files(self, shard):
+        """
+        Returns the relative paths of the files of a shard, sorted.
+        """
+        return [key for key, _, file_shard in self.files if file_shard == shard]
+
+    def shard_sizes(self):
+        """
+        Returns the number of files and bytes of every shard, as (files, bytes) pairs.
+        """
+        sizes = [[0, 0] for _ in range(self.shards)]
+        for _, size, shard in self.files:
+            sizes[shard][0] += 1
+            sizes[shard][1] += size
+        return [tuple(size) for size in sizes]
+
+    def checkpoint_path(self, shard):
+        """
+        Returns the path of the checkpoint of a shard, next to the manifest.
+        """
+        return f"{self.path}.shard-{shard}.jsonl"
+
+    def checkpoint(self, shard):
+        """
+        Returns the loaded ShardCheckpoint of a shard.
+        """
+        return ShardCheckpoint(self.checkpoint_path(shard))
+
+def plan_shards(manifest_path, tool, input_dir, output_dir, suffix, shards, strategy="hash", options=None,
+                options_key=None, index=None, fs=None, io_threads=None):
+    """
+    Scans input_dir once and writes a manifest of its files split into shards.
+
+    Args:
+        manifest_path (str): Path of the manifest to write. Checkpoints of an
+            earlier plan at this path are removed.
+        tool (str): Converter name.
+        input_dir (str): Directory to scan.
+        output_dir (str): Output directory, None for in-place tools.
+        suffix (str): Suffix of the input files, e.g. ".lab".
+        shards (int): Number of shards.
+        strategy (str): One of STRATEGIES.
+        options (dict, optional): Converter options stored for the workers.
+        options_key (str, optional): Hash the workers check before converting.
+        index (str, optional): Corpus index file updated by the merge.
+        fs (LocalFileSystem, optional): File system for the scan. Defaults to the local one.
+        io_threads (int, optional): Maximum number of listings and stats in flight.
+
+    Returns:
+        ShardManifest: The written manifest.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from daisy_common.metrics import get_metrics
+    from daisy_common.scan import DEFAULT_IO_THREADS, LocalFileSystem, scan_files
+
+    if shards < 1:
+        raise ValueError("The number of shards must be at least 1")
+    fs = fs if fs is not None else LocalFileSystem()
+    io_threads = io_threads or DEFAULT_IO_THREADS
+    input_dir = os.path.abspath(input_dir)
+    paths = scan_files(input_dir, suffix, fs, io_threads)
+    with get_metrics().time("scan"), ThreadPoolExecutor(max_workers=io_threads) as executor:
+        sizes = list(executor.map(fs.size, paths))
+    files = [(_relative_key(input_dir, path), size) for path, size in zip(paths, sizes)]
+    assigned = assign_shards(files, shards, strategy)
+    manifest = ShardManifest(
+        manifest_path, tool, input_dir, os.path.abspath(output_dir) if output_dir else None, options or {},
+        options_key, strategy, shards, [[key, size, shard] for (key, size), shard in zip(files, assigned)],
+        os.path.abspath(index) if index else None
+    )
+    for shard in range(shards):
+        try:
+            os.remove(manifest.checkpoint_path(shard))
+        except FileNotFoundError:
+            pass
+    manifest.save()
+    return manifest
+
+class ShardCheckpoint:
+    """
+    Append-only record of the finished batches of one shard.
+
+    Each line is one batch: {"done": [...], "failed": {path: error}, "entries":
+    {key: index entry}}. Lines are appended with a single fsynced O_APPEND
+    write, so a crash leaves at most a torn last line, which is ignored and
+    ended before the next batch is appended.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.failed = {}
+        self.entries = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(batch)
+
+    def _apply(self, batch):
+        self.done.update(batch["done"])
+        for key in batch["done"]:
+            self.failed.pop(key, None)
+        self.failed.update(batch["failed"])
+        self.entries.update(batch["entries"])
+
+    def pending(self, keys):
+        """
+        Returns the keys that are not done yet; failed files are retried.
+        """
+        return [key for key in keys if key not in self.done]
+
+    def append(self, done, failed, entries):
+        """
+        Records a finished batch.
+
+        Args:
+            done (list): Relative paths converted successfully.
+            failed (dict): Relative path to error message.
+            entries (dict): Corpus index entries recorded for the batch.
+        """
+        batch = {"done": done, "failed": failed, "entries": entries}
+        data = (json.dumps(batch, ensure_ascii=False) + "\n").encode("utf-8", "surrogatepass")
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size:
+                os.lseek(fd, -1, os.SEEK_END)
+                if os.read(fd, 1) != b"\n":
+                    # End the torn line first, or this batch would be joined to it and lost
+                    data = b"\n" + data
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._apply(batch)
+
+def run_shard(manifest, shard, convert, batch_size=DEFAULT_BATCH_SIZE, log=print):
+    """
+    Converts the pending files of a shard batch by batch, checkpointing every batch.
+
+    Args:
+        manifest (ShardManifest): The loaded manifest.
+        shard (int): Shard to run.
+        convert (callable): convert(paths) converts absolute input paths and
+            returns run_jobs-style (path, message, error) results.
+        batch_size (int): Files per checkpointed batch.
+        log (callable): Receives progress lines.
+
+    Returns:
+        list: (path, message, error) results of the files converted by this call.
+    """
+    from daisy_common.index import take_recorded
+
+    if not 0 <= shard < manifest.shards:
+        raise ValueError(f"Shard {shard} is not in 0..{manifest.shards - 1}")
+    checkpoint = manifest.checkpoint(shard)
+    keys = manifest.shard_files(shard)
+    pending = checkpoint.pending(keys)
+    if len(pending) < len(keys):
+        log(f"Shard {shard}: resuming, {len(keys) - len(pending)} of {len(keys)} files already done")
+    results = []
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        by_path = {manifest.input_path(key): key for key in batch}
+        # Entries of earlier, unrelated runs in this process must not end up in the checkpoint
+        take_recorded()
+        batch_results = convert(list(by_path))
+        done = [by_path[path] for path, _, error in batch_results if error is None]
+        failed = {by_path[path]: error for path, _, error in batch_results if error is not None}
+        checkpoint.append(done, failed, take_recorded())
+        results.extend(batch_results)
+        log(f"Shard {shard}: {len(checkpoint.done)}/{len(keys)} files done")
+    return results
+
+def shard_status(manifest):
+    """
+    Returns the progress of every shard as dicts with "files", "done", "failed" and "pending".
+    """
+    status = []
+    for shard in range(manifest.shards):
+        keys = manifest.shard_files(shard)
+        checkpoint = manifest.checkpoint(shard)
+        done = sum(1 for key in keys if key in checkpoint.done)
+        failed = sum(1 for key in keys if key in checkpoint.failed)
+        status.append({"files": len(keys), "done": done, "failed": failed, "pending": len(keys) - done - failed})
+    return status
+
+def merge_shards(manifest):
+    """
+    Collects the results of every shard.
+
+    Returns:
+        tuple: (index entries of every shard, {relative path: error} of the files still failing).
+    """
+    entries = {}
+    failed = {}
+    for shard in range(manifest.shards):
+        checkpoint = manifest.checkpoint(shard)
+        entries.update(checkpoint.entries)
+        failed.update(checkpoint.failed)
+    return entries, failed
@@ -0,0 +1,74 @@
+"""
+Bounded-memory reading for long files (full-song transcripts, hour-long alignments).
+
+Files of at least STREAM_THRESHOLD bytes are not read whole: run_io_jobs
+hands them to a streaming task of the converter, which reads them in blocks
+of whole lines and writes its output as it goes, so memory use does not grow
+with the file size. Smaller files keep the faster whole-file path.
+"""
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
+# Characters read per block; blocks are extended to the next line break
+BLOCK_SIZE = 1024 * 1024
+
+def iter_blocks(f, size=BLOCK_SIZE):
+    """
+    Yields the content of a text file in blocks that end at a line break.
+
+    Args:
+        f (file): Text file open for reading.
+        size (int): Characters read at a time. A line longer than that is yielded whole.
+
+    Yields:
+        str: Blocks of whole lines; only the last one may lack a final line break.
+    """
+    carry = []
+    while True:
+        block = f.read(size)
+        if not block:
+            break
+        cut = block.rfind("\n") + 1
+        if not cut:
+            carry.append(block)
+            continue
+        if carry:
+            carry.append(block[:cut])
+            yield "".join(carry)
+            carry = []
+        else:
+            yield block[:cut]
+        if cut < len(block):
+            carry.append(block[cut:])
+    if carry:
+        yield "".join(carry)
+
+def iter_lines(f):
+    """
+    Yields the lines of a text file without their line break, like splitting its whole content on '\\n'.
+    """
+    line = None
+    for line in f:
+        yield line[:-1] if line.endswith("\n") else line
+    if line is None or line.endswith("\n"):
+        yield ""
+
+def count_lab_segments(f, size=BLOCK_SIZE):
+    """
+    Counts the segments of a .lab file without keeping them, with the parse_lab line rules.
+    """
+    # Imported here so that run_io_jobs callers do not load NumPy through this module
+    from daisy_common.segtable import _LAB_LINE_PATTERN
+    return sum(len(_LAB_LINE_PATTERN.findall(block)) for block in iter_blocks(f, size))
+
+def iter_lab_tables(f, vocab=None, size=BLOCK_SIZE):
+    """
+    Parses a .lab file block by block.
+
+    Yields:
+        SegmentTable: The segments of each block that has any, in file order.
+    """
+    from daisy_common.segtable import parse_lab
+    for block in iter_blocks(f, size):
+        table = parse_lab(block, vocab)
+        if len(table):
+            yield table
@@ -0,0 +1,252 @@
+"""
+Streaming reader for Praat TextGrid files in long and short text format.
+
+Only the requested interval tier is materialized; other tiers are tokenized
+and skipped. Times are returned as exact decimal.Decimal values, the same
+representation mytextgrid uses, unless another parse_time is given (e.g.
+daisy_common.ticks.seconds_to_ticks for integer ticks).
+"""
+import codecs
+import decimal
+import io
+
+def _open_textgrid(path):
+    """
+    Opens a TextGrid for reading, decoding it as _decode_textgrid does.
+    """
+    with open(path, 'rb') as f:
+        return io.StringIO(_decode_textgrid(f.read()), newline=None)
+
+def _decode_textgrid(data):
+    """
+    Decodes raw TextGrid content.
+
+    The encoding is picked from the byte order mark. Without one, UTF-8 and
+    then Shift-JIS (cp932, what Japanese Windows tools write) are tried, and
+    anything else is sniffed with chardet as mytextgrid does.
+    """
+    head = data[:4]
+    if head.startswith(codecs.BOM_UTF16_BE) or head.startswith(codecs.BOM_UTF16_LE):
+        return data.decode('utf-16')
+    if head.startswith(codecs.BOM_UTF8):
+        return data.decode('utf-8-sig')
+    for encoding in ('utf-8', 'cp932'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    import chardet
+    encoding = chardet.detect(data).get('encoding')
+    if encoding is None:
+        raise ValueError("Could not detect the encoding of the TextGrid file.")
+    return data.decode(encoding)
+
+def _read_string(value, lines):
+    """
+    Reads a quoted TextGrid string starting at value, pulling more lines if it spans several.
+    """
+    text = value[1:]
+    while True:
+        # The string is closed when the line ends in an odd run of quotes
+        # (a doubled quote is an escaped quote inside the string)
+        closed = text.rstrip(' ')
+        trailing = len(closed) - len(closed.rstrip('"'))
+        if trailing % 2 == 1:
+            return closed[:-1].replace('""', '"')
+        try:
+            text += '\n' + next(lines).rstrip('\r\n')
+        except StopIteration:
+            raise ValueError("Unterminated string in TextGrid file.")
+
+def iter_tokens(lines):
+    """
+    Yields the values of a TextGrid text file, ignoring the long-format labels.
+
+    Quoted strings are yielded unescaped, numbers and flags such as '<exists>'
+    as their raw text. Both formats produce the same token sequence.
+
+    Args:
+        lines (iterator): Lines of the file.
+    """
+    lines = iter(lines)
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line[0] != '"':
+            if line.endswith(':') and '"' not in line:
+                # 'item [1]:', 'intervals [3]:' and friends carry no value;
+                # 'text = "note:' opens a multi-line string instead
+                continue
+            equals = line.find('=')
+            if equals != -1:
+                line = line[equals + 1:].lstrip()
+            elif line.endswith('<exists>'):
+                line = '<exists>'
+            elif line.endswith('<absent>'):
+                line = '<absent>'
+        if line.startswith('"'):
+            yield _read_string(line, lines)
+        else:
+            yield line
+
+def _iter_tiers(tokens):
+    """
+    Yields (tier_class, tier_name, xmin, xmax, size) for each tier, leaving the tier items to the caller.
+
+    xmin and xmax are the raw time strings of the tier.
+    """
+    tokens = iter(tokens)
+    try:
+        file_type = next(tokens)
+        object_class = next(tokens)
+    except StopIteration:
+        raise ValueError("Empty TextGrid file.")
+    if file_type != 'ooTextFile':
+        raise ValueError("The file is not a Praat text file.")
+    if object_class != 'TextGrid':
+        raise ValueError("The file is not a TextGrid.")
+
+    try:
+        next(tokens)  # xmin
+        next(tokens)  # xmax
+        if next(tokens) != '<exists>':
+            return
+        for _ in range(int(next(tokens))):
+            tier_class = next(tokens)
+            tier_name = next(tokens)
+            xmin = next(tokens)
+            xmax = next(tokens)
+            yield tier_class, tier_name, xmin, xmax, int(next(tokens))
+    except StopIteration:
+        raise ValueError("Truncated TextGrid file.")
+
+def _read_intervals(tokens, xmin, xmax, size, parse_time):
+    """
+    Yields the size intervals of an interval tier spanning xmin to xmax.
+
+    A tier without intervals is read as one empty interval spanning the
+    tier, as mytextgrid reads it.
+    """
+    if not size:
+        yield parse_time(xmin), parse_time(xmax), ''
+        return
+    try:
+        for _ in range(size):
+            start = parse_time(next(tokens))
+            end = parse_time(next(tokens))
+            yield start, end, next(tokens)
+    except StopIteration:
+        raise ValueError("Truncated TextGrid file.")
+
+def _skip(tokens, items):
+    """
+    Skips items tokens.
+    """
+    try:
+        for _ in range(items):
+            next(tokens)
+    except StopIteration:
+        raise ValueError("Truncated TextGrid file.")
+
+def iter_tier_intervals(textgrid_file, tier_name='phones', parse_time=decimal.Decimal):
+    """
+    Yields the intervals of every interval tier named tier_name.
+
+    Args:
+        textgrid_file (str): Path to the TextGrid file (long or short text format).
+        tier_name (str): Name of the interval tier to read.
+        parse_time (callable): Converts the time strings.
+
+    Yields:
+        tuple: (xmin, xmax, text) with xmin and xmax as returned by parse_time.
+    """
+    try:
+        with _open_textgrid(textgrid_file) as f:
+            yield from iter_line_intervals(f, tier_name, parse_time)
+    except ValueError as e:
+        raise ValueError(f"{textgrid_file}: {e}") from e
+
+def iter_text_intervals(text, tier_name='phones', parse_time=decimal.Decimal):
+    """
+    Yields the intervals of every interval tier named tier_name from TextGrid content.
+
+    Args:
+        text (str): TextGrid content (long or short text format).
+        tier_name (str): Name of the interval tier to read.
+        parse_time (callable): Converts the time strings.
+
+    Yields:
+        tuple: (xmin, xmax, text) with xmin and xmax as returned by parse_time.
+    """
+    return iter_line_intervals(io.StringIO(text), tier_name, parse_time)
+
+def iter_bytes_intervals(data, tier_name='phones', parse_time=decimal.Decimal):
+    """
+    Yields the intervals of every interval tier named tier_name from raw TextGrid file content.
+
+    The content is decoded as files are.
+    """
+    lines = io.StringIO(_decode_textgrid(data), newline=None)
+    return iter_line_intervals(lines, tier_name, parse_time)
+
+def iter_line_intervals(lines, tier_name='phones', parse_time=decimal.Decimal):
+    """
+    Yields the intervals of every interval tier named tier_name from an iterable of lines.
+    """
+    tokens = iter_tokens(lines)
+    for tier_class, name, xmin, xmax, size in _iter_tiers(tokens):
+        if tier_class == 'IntervalTier':
+            if name == tier_name:
+                yield from _read_intervals(tokens, xmin, xmax, size, parse_time)
+                continue
+            items = size * 3
+        else:
+            # TextTier points are (number, mark)
+            items = size * 2
+        _skip(tokens, items)
+
+def read_line_tiers(lines, tier_names, parse_time=decimal.Decimal):
+    """
+    Reads several interval tiers in one pass over the lines of a TextGrid.
+
+    Args:
+        lines (iterable): Lines of the file.
+        tier_names (iterable): Names of the interval tiers to read.
+        parse_time (callable): Converts the time strings.
+
+    Returns:
+        dict: Tier name to a list of (xmin, xmax, text) tuples, with xmin and
+        xmax as returned by parse_time. Tiers missing from the file map to empty lists.
+    """
+    tiers = {name: [] for name in tier_names}
+    tokens = iter_tokens(lines)
+    for tier_class, name, xmin, xmax, size in _iter_tiers(tokens):
+        if tier_class == 'IntervalTier':
+            intervals = tiers.get(name)
+            if intervals is not None:
+                intervals.extend(_read_intervals(tokens, xmin, xmax, size, parse_time))
+                continue
+            items = size * 3
+        else:
+            items = size * 2
+        _skip(tokens, items)
+    return tiers
+
+def parse_tiers(content, tier_names, parse_time=decimal.Decimal):
+    """
+    Reads several interval tiers from TextGrid content in one pass.
+
+    Args:
+        content (str or bytes): TextGrid content. Bytes are decoded like files.
+        tier_names (iterable): Names of the interval tiers to read.
+        parse_time (callable): Converts the time strings.
+
+    Returns:
+        dict: Tier name to a list of (xmin, xmax, text) tuples (see read_line_tiers).
+    """
+    if isinstance(content, bytes):
+        lines = io.StringIO(_decode_textgrid(content), newline=None)
+    else:
+        lines = io.StringIO(content)
+    return read_line_tiers(lines, tier_names, parse_time)
@@ -0,0 +1,153 @@
+"""
+Integer time core: segment boundaries as 100ns ticks from parse to output.
+
+TextGrid times are decimal strings; seconds_to_ticks turns them into ticks
+with integer arithmetic, rounding half away from zero on the eighth decimal,
+so no float or Decimal round-trip can move a boundary by a tick. .seg times
+are rounded from the ticks to microseconds and printed with integer
+arithmetic too.
+"""
+import decimal
+import functools
+
+import numpy as np
+
+TICKS_PER_SECOND = 10000000
+TICK_DIGITS = 7
+
+# Every boundary is read twice (one interval's xmax is the next one's xmin) and
+# aligner times repeat across a corpus, so most lookups are cache hits
+@functools.lru_cache(maxsize=1 << 16)
+def seconds_to_ticks(text):
+    """
+    Converts a decimal number of seconds to 100ns ticks, exactly.
+
+    Digits beyond the seventh decimal are rounded half away from zero, so
+    "0.7999999999999999" is 8000000 ticks, not 7999999.
+
+    Args:
+        text (str): Seconds as written in a TextGrid, e.g. "1.2345", "-0.5" or "1e-05".
+
+    Returns:
+        int: The time in ticks.
+    """
+    whole, _, fraction = text.partition(".")
+    digits = fraction[:TICK_DIGITS]
+    rest = fraction[TICK_DIGITS:]
+    # Plain decimal notation only; exponents and other spellings take the Decimal path
+    if "_" in text or not (whole.strip("+-") or digits) or (rest and not (rest.isdigit() and rest.isascii())):
+        return _decimal_to_ticks(text)
+    try:
+        # The sign of the whole part carries over to the joined digits
+        ticks = int(whole + digits.ljust(TICK_DIGITS, "0"))
+    except ValueError:
+        return _decimal_to_ticks(text)
+    if rest and rest[0] >= "5":
+        ticks += -1 if text.startswith("-") else 1
+    return ticks
+
+def _decimal_to_ticks(text):
+    try:
+        value = decimal.Decimal(text).scaleb(TICK_DIGITS)
+        return int(value.to_integral_value(rounding=decimal.ROUND_HALF_UP))
+    except (decimal.InvalidOperation, ValueError, OverflowError):
+        raise ValueError(f"Invalid time value: '{text}'")
+
+def value_to_ticks(value):
+    """
+    Converts seconds given as a str, Decimal or float to ticks.
+
+    Floats are converted from their shortest repr, so 0.1 is 1000000 ticks.
+    """
+    if isinstance(value, float):
+        return seconds_to_ticks(repr(value))
+    return seconds_to_ticks(str(value))
+
+def ticks_to_microseconds(ticks):
+    """
+    Rounds an int64 array of ticks to microseconds, half away from zero.
+    """
+    ticks = np.asarray(ticks, dtype=np.int64)
+    if ticks.size and ticks.min() < 0:
+        return np.sign(ticks) * ((np.abs(ticks) + 5) // 10)
+    return (ticks + 5) // 10
+
+# Seconds with six decimals, filled with the fields of seconds_fields
+SECONDS_FORMAT = "%s%d.%06d"
+
+def seconds_fields(ticks):
+    """
+    Rounds ticks to microseconds and splits them into the fields of SECONDS_FORMAT.
+
+    No float is involved, so every time prints exactly. Times that round to
+    zero print without a sign.
+
+    Args:
+        ticks (array-like): Times in 100ns ticks.
+
+    Returns:
+        tuple: (signs, whole seconds, microseconds) lists, with signs '-' or ''.
+    """
+    microseconds = ticks_to_microseconds(ticks)
+    magnitude = np.abs(microseconds)
+    return (np.where(microseconds < 0, "-", "").tolist(), (magnitude // 1000000).tolist(),
+            (magnitude % 1000000).tolist())
+
+def format_seconds(ticks):
+    """
+    Formats ticks as seconds with six decimals, rounded half away from zero.
+    """
+    microseconds = int(ticks_to_microseconds(ticks))
+    sign = "-" if microseconds < 0 else ""
+    microseconds = abs(microseconds)
+    return f"{sign}{microseconds // 10**6}.{microseconds % 10**6:06d}"
+
+def separate_boundaries(intervals):
+    """
+    Moves boundaries that rounding collapsed onto the start of their interval.
+
+    An interval shorter than a tick can round to zero length (e.g. 0.8999999999999999
+    to 0.9 is 9000000 to 9000000). Its end is moved one tick past its start, and
+    the next interval, which starts at the same boundary, starts there too, so
+    segments stay contiguous and every segment that had a length keeps one.
+    Intervals that end before they start are left as they are.
+
+    Args:
+        intervals (list): (start, end, label) tuples in ticks, in tier order.
+
+    Returns:
+        list: The intervals, with collapsed boundaries moved.
+    """
+    if all(start < end for start, end, _ in intervals):
+        return intervals
+    separated = []
+    moved = None
+    for start, end, label in intervals:
+        if end < start:
+            separated.append((start, end, label))
+            moved = None
+            continue
+        if moved is not None and start == moved[0]:
+            start = moved[1]
+        if end <= start:
+            moved = (end, start + 1)
+            end = start + 1
+        else:
+            moved = None
+        separated.append((start, end, label))
+    return separated
+
+def find_gaps(starts, ends):
+    """
+    Returns the indices i where segment i does not end where segment i + 1 starts.
+
+    Args:
+        starts (array-like): Start ticks in segment order.
+        ends (array-like): End ticks in segment order.
+
+    Returns:
+        numpy.ndarray: Indices of the segments followed by a gap or an overlap.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    return np.flatnonzero(ends[:-1] != starts[1:])
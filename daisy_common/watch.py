@@ -0,0 +1,289 @@
+"""
+Watch mode: convert aligner outputs as they appear.
+
+A change source reports paths that may have changed, using inotify when the
+kernel provides it and polling the tree otherwise. The Debouncer only hands
+a file on once its size and mtime have stayed the same for a settle period,
+so files the aligner is still writing are not converted half-done. Each
+version of a file is converted once; a file that changes again is converted
+again.
+"""
+import os
+import sys
+import time
+
+DEFAULT_SETTLE = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+def add_watch_arguments(parser):
+    """
+    Adds the shared --watch, --settle, --poll-interval, --polling and --idle-exit options.
+    """
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and convert new or changed files as they are written.")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help=f"Seconds a file must stay unchanged before it is converted. Default: {DEFAULT_SETTLE}.")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between checks in watch mode. Default: {DEFAULT_POLL_INTERVAL}.")
+    parser.add_argument("--polling", action="store_true", help="Poll the tree even when inotify is available.")
+    parser.add_argument("--idle-exit", type=float,
+                        help="Stop watching after this many seconds without new files.")
+
+def _fingerprint(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+class PollingSource:
+    """
+    Finds changed files by walking the tree and comparing size and mtime.
+    """
+
+    name = "polling"
+
+    def __init__(self, root, suffixes):
+        self.root = root
+        self.suffixes = suffixes
+        self.snapshot = None
+
+    def _walk(self, directory, snapshot):
+        try:
+            iterator = os.scandir(directory)
+        except OSError:
+            return
+        with iterator:
+            for entry in iterator:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        self._walk(entry.path, snapshot)
+                    elif entry.name.endswith(self.suffixes):
+                        st = entry.stat()
+                        snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    continue
+
+    def changes(self, timeout):
+        """
+        Waits up to timeout seconds and returns the paths that changed since the last call.
+        """
+        if self.snapshot is not None:
+            time.sleep(timeout)
+        snapshot = {}
+        self._walk(self.root, snapshot)
+        previous = self.snapshot or {}
+        changed = {path for path, fingerprint in snapshot.items() if previous.get(path) != fingerprint}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+# inotify(7) constants
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+class InotifySource:
+    """
+    Reports changed files from inotify events, watching every directory of the tree.
+
+    New directories are watched as they appear and listed once, since files
+    can land in them before their watch is added. On an event queue overflow
+    the whole tree is reported so nothing is missed.
+    """
+
+    name = "inotify"
+
+    def __init__(self, root, suffixes):
+        import ctypes
+        import ctypes.util
+        self.root = root
+        self.suffixes = suffixes
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}
+        self._pending = set()
+        try:
+            self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory):
+        import ctypes
+        descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if descriptor < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_add_watch failed: {os.strerror(error)}", directory)
+        self._directories[descriptor] = directory
+
+    def _add_tree(self, directory):
+        # Watch first, then list, so a file created in between is seen at least once
+        self._add_watch(directory)
+        try:
+            iterator = os.scandir(directory)
+        except OSError:
+            return
+        with iterator:
+            for entry in iterator:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        self._add_tree(entry.path)
+                    elif entry.name.endswith(self.suffixes):
+                        self._pending.add(entry.path)
+                except OSError:
+                    continue
+
+    def changes(self, timeout):
+        """
+        Waits up to timeout seconds for events and returns the paths they name.
+        """
+        import select
+        import struct
+        if not self._pending:
+            select.select([self._fd], [], [], timeout)
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, _, length = struct.unpack_from("iIII", data, offset)
+                name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+                offset += 16 + length
+                if mask & _IN_Q_OVERFLOW:
+                    self._rescan()
+                    continue
+                directory = self._directories.get(descriptor)
+                if mask & _IN_IGNORED:
+                    self._directories.pop(descriptor, None)
+                    continue
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        try:
+                            self._add_tree(path)
+                        except OSError:
+                            pass
+                elif path.endswith(self.suffixes):
+                    self._pending.add(path)
+        changed, self._pending = self._pending, set()
+        return changed
+
+    def _rescan(self):
+        # Adding an existing watch again returns its descriptor, so this only lists the tree
+        self._add_tree(self.root)
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+def open_source(root, suffixes, polling=False):
+    """
+    Returns an InotifySource for root, or a PollingSource when polling is
+    requested or inotify is unavailable (other platforms, watch limit reached).
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifySource(root, suffixes)
+        except (OSError, AttributeError):
+            pass
+    return PollingSource(root, suffixes)
+
+class Debouncer:
+    """
+    Holds back changed files until they have stopped changing.
+
+    A file is settled when its size and mtime stayed the same for the settle
+    period, or when its mtime is already that old (files that were complete
+    before watching started do not wait).
+    """
+
+    def __init__(self, settle=DEFAULT_SETTLE):
+        self.settle = settle
+        # path -> (fingerprint, time it was first seen with that fingerprint)
+        self.pending = {}
+        # path -> fingerprint of the version that was last handed on
+        self.handled = {}
+
+    def add(self, paths, now):
+        for path in paths:
+            if path not in self.pending:
+                self.pending[path] = (_fingerprint(path), now)
+
+    def ready(self, now):
+        """
+        Returns the sorted pending paths whose size and mtime were stable for the settle period.
+        """
+        ready = []
+        for path, (fingerprint, since) in list(self.pending.items()):
+            current = _fingerprint(path)
+            if current is None:
+                del self.pending[path]
+            elif current != fingerprint:
+                self.pending[path] = (current, now)
+            elif now - since >= self.settle or time.time() - current[0] / 1e9 >= self.settle:
+                del self.pending[path]
+                if self.handled.get(path) != current:
+                    self.handled[path] = current
+                    ready.append(path)
+        return sorted(ready)
+
+def watch(root, suffixes, convert, settle=DEFAULT_SETTLE, interval=DEFAULT_POLL_INTERVAL, polling=False,
+          idle_exit=None):
+    """
+    Converts the files under root, then keeps converting new and changed ones until interrupted.
+
+    Args:
+        root (str): Directory to watch, recursively.
+        suffixes (str or tuple): File name suffixes to convert.
+        convert (callable): convert(paths) converts a sorted batch of settled files.
+        settle (float): Seconds a file must stay unchanged before it is converted.
+        interval (float): Seconds between checks.
+        polling (bool): Poll even when inotify is available.
+        idle_exit (float, optional): Return after this many seconds without pending or converted files.
+
+    Returns:
+        int: Number of files handed to convert.
+    """
+    source = open_source(root, suffixes, polling)
+    debouncer = Debouncer(settle)
+    print(f"Watching {root} for {suffixes} files ({source.name}), press Ctrl+C to stop")
+    converted = 0
+    last_activity = time.monotonic()
+    try:
+        while True:
+            # Check settling files at least every interval, even without events
+            timeout = min(interval, settle) if debouncer.pending else interval
+            debouncer.add(source.changes(timeout), time.monotonic())
+            now = time.monotonic()
+            batch = debouncer.ready(now)
+            if batch:
+                convert(batch)
+                converted += len(batch)
+                last_activity = time.monotonic()
+            elif debouncer.pending:
+                last_activity = now
+            elif idle_exit is not None and now - last_activity >= idle_exit:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.close()
+    print(f"Stopped watching {root}: {converted} files converted")
+    return converted
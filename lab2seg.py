@@ -1,72 +1,319 @@
 import os
 import argparse
-import re
-
-def convert_lab_to_seg(input_directory, output_directory):
-    for root, _, files in os.walk(input_directory):
-        for lab_file_name in files:
-            if lab_file_name.endswith(".lab"):
-                input_lab_file = os.path.join(root, lab_file_name)
-                
-                # Calculate the relative path from the input directory
-                relative_path = os.path.relpath(root, input_directory)
-                
-                # Create the corresponding output subdirectory
-                output_subdir = os.path.join(output_directory, relative_path)
-                if not os.path.exists(output_subdir):
-                    os.makedirs(output_subdir)
-                    
-                output_seg_file = os.path.join(output_subdir, lab_file_name.replace(".lab", ".seg"))
-
-                phoneme_list = []
-
-                try:
-                    with open(input_lab_file, 'r') as infile:
-                        lines = infile.readlines()
-
-                    for line in lines:
-                        line = line.strip()
-                        match = re.match(r'(\d+)\s+(\d+)\s+(.+)', line)
-                        if match:
-                            start_time = float(match.group(1)) / 1e7
-                            end_time = float(match.group(2)) / 1e7
-                            phoneme = match.group(3)
-
-                            if phoneme == "R" or phoneme == "pau":
-                                phoneme = "Sil"
-
-                            phoneme_list.append((phoneme, start_time, end_time))
-
-                    if phoneme_list:
-                        with open(output_seg_file, 'w') as outfile:
-                            outfile.write("nPhonemes {}\n".format(len(phoneme_list)))
-                            outfile.write("articulationsAreStationaries 0\n")
-                            outfile.write("phoneme\t\tBeginTime\t\tEndTime\n")
-                            outfile.write("=" * 49 + "\n")
-                            for phoneme, start_time, end_time in phoneme_list:
-                                outfile.write("{}\t\t{:.6f}\t\t{:.6f}\n".format(phoneme, start_time, end_time))
-
-                        print(f"Conversion complete for {input_lab_file} -> {output_seg_file}")
-                    else:
-                        print(f"Skipping empty file: {input_lab_file}")
-                except FileNotFoundError:
-                    print(f"Error: Input file not found: {input_lab_file}")
-                except Exception as e:
-                    print(f"Error processing {input_lab_file}: {e}")
+from functools import partial
+
+from daisy_common.archive import ArchiveWriter, archive_key
+from daisy_common.cache import BuildManifest, module_sources, options_hash, plan_incremental
+from daisy_common.index import EntryBuilder, add_index_argument, record, record_entry, update_index
+from daisy_common.jobs import add_jobs_argument, print_results, run_jobs
+from daisy_common.metrics import add_metrics_arguments, get_metrics, instrument
+from daisy_common.output import atomic_write_text
+from daisy_common.scan import DEFAULT_IO_THREADS, add_io_argument, decode_text, run_io_jobs, scan_files
+from daisy_common.segtable import (SILENCE_MAP, format_seg, format_seg_rows, parse_lab, read_lab, rename_silences,
+                                   seg_header, write_seg)
+from daisy_common.stream import STREAM_THRESHOLD, count_lab_segments, iter_lab_tables
+from daisy_common.watch import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE, add_watch_arguments, watch
+
+def find_lab_files(input_directory, fs=None, io_threads=DEFAULT_IO_THREADS):
+    """
+    Returns the sorted paths of all .lab files under input_directory, listing directories concurrently.
+    """
+    return scan_files(input_directory, ".lab", fs, io_threads)
+
+def lab_text_to_seg(lab_text):
+    """
+    Converts .lab content to .seg content in memory.
+
+    Args:
+        lab_text (str): The .lab content.
+
+    Returns:
+        str: The .seg content, or None when the .lab has no segments.
+    """
+    table = parse_lab(lab_text)
+    if not len(table):
+        return None
+    return format_seg(rename_silences(table))
+
+def convert_lab_file(input_lab_file, output_seg_file):
+    """
+    Converts a single .lab file to a .seg file.
+
+    Files of at least STREAM_THRESHOLD bytes are converted with stream_lab_to_seg.
+
+    Returns:
+        str: A message describing what was done.
+    """
+    if os.path.getsize(input_lab_file) >= STREAM_THRESHOLD:
+        if not stream_lab_to_seg(input_lab_file, output_seg_file):
+            return f"Skipping empty file: {input_lab_file}"
+        return f"Conversion complete for {input_lab_file} -> {output_seg_file}"
+
+    table = read_lab(input_lab_file)
+    if not len(table):
+        return f"Skipping empty file: {input_lab_file}"
+
+    write_seg(output_seg_file, rename_silences(table))
+
+    return f"Conversion complete for {input_lab_file} -> {output_seg_file}"
+
+def stream_lab_to_seg(input_lab_file, output_seg_file, entry=None):
+    """
+    Converts a .lab file to a .seg file block by block, in bounded memory.
+
+    The .seg header starts with the segment count, so the .lab is read twice:
+    once to count its segments, once to convert and write them.
+
+    Args:
+        input_lab_file (str): Path of the .lab file.
+        output_seg_file (str): Path of the .seg file, replaced atomically.
+        entry (EntryBuilder, optional): Receives the converted segments for the corpus index.
+
+    Returns:
+        int: Number of segments written; 0 when the .lab has none and nothing was written.
+
+    Raises:
+        ValueError: If the .lab file changed between the two passes.
+    """
+    metrics = get_metrics()
+    with metrics.time("parse"), open(input_lab_file, 'r') as f:
+        count = count_lab_segments(f)
+    if not count:
+        return 0
+
+    def seg_lines():
+        written = 0
+        yield seg_header(count)
+        with open(input_lab_file, 'r') as f:
+            for table in iter_lab_tables(f):
+                with metrics.time("convert"):
+                    table = rename_silences(table)
+                    rows = format_seg_rows(table)
+                if entry is not None:
+                    entry.add(table)
+                written += len(table)
+                yield rows
+        if written != count:
+            raise ValueError(f"{input_lab_file} changed while it was converted")
+
+    atomic_write_text(output_seg_file, seg_lines())
+    metrics.count("segments", count)
+    return count
+
+def _output_path(input_directory, output_directory, input_lab_file):
+    # Calculate the relative path from the input directory
+    root, lab_file_name = os.path.split(input_lab_file)
+    relative_path = os.path.relpath(root, input_directory)
+    return os.path.join(output_directory, relative_path, lab_file_name.replace(".lab", ".seg"))
+
+def _convert_task(input_directory, output_directory, index, input_lab_file, data):
+    metrics = get_metrics()
+    with metrics.time("parse"):
+        table = parse_lab(decode_text(data))
+    if not len(table):
+        return f"Skipping empty file: {input_lab_file}", []
+
+    with metrics.time("convert"):
+        table = rename_silences(table)
+        seg_text = format_seg(table)
+    metrics.count("segments", len(table))
+    if index:
+        record(archive_key(input_directory, input_lab_file), table)
+
+    output_seg_file = _output_path(input_directory, output_directory, input_lab_file)
+    return f"Conversion complete for {input_lab_file} -> {output_seg_file}", [(output_seg_file, seg_text, None)]
+
+def _stream_task(input_directory, output_directory, index, input_lab_file):
+    output_seg_file = _output_path(input_directory, output_directory, input_lab_file)
+    os.makedirs(os.path.dirname(output_seg_file), exist_ok=True)
+    entry = EntryBuilder() if index else None
+    if not stream_lab_to_seg(input_lab_file, output_seg_file, entry):
+        return f"Skipping empty file: {input_lab_file}"
+    if index:
+        record_entry(archive_key(input_directory, input_lab_file), entry.entry())
+    return f"Conversion complete for {input_lab_file} -> {output_seg_file}"
+
+def convert_lab_files(input_directory, output_directory, lab_files, jobs=1, fs=None, io_threads=DEFAULT_IO_THREADS,
+                      index=False):
+    """
+    Converts the given .lab files under input_directory to .seg files in output_directory.
+
+    Args:
+        input_directory (str): Directory the .lab paths are relative to in the output tree.
+        output_directory (str): Directory where .seg files are written.
+        lab_files (list): Paths of the .lab files to convert.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of reads and writes in flight.
+        index (bool): Record the converted files for the corpus index (see update_index).
+
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    return run_io_jobs(
+        partial(_convert_task, input_directory, output_directory, index),
+        lab_files,
+        jobs=jobs,
+        fs=fs,
+        threads=io_threads,
+        stream=partial(_stream_task, input_directory, output_directory, index)
+    )
+
+def convert_lab_to_seg(input_directory, output_directory, jobs=1, incremental=False, fs=None,
+                       io_threads=DEFAULT_IO_THREADS, index_path=None):
+    """
+    Converts every .lab file under input_directory to a .seg file in output_directory.
+
+    Args:
+        input_directory (str): Directory containing .lab files.
+        output_directory (str): Directory where .seg files are written.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        incremental (bool): Only convert .lab files that changed since the last
+            incremental run, and remove .seg files whose .lab is gone.
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of directory listings, reads and writes in flight.
+        index_path (str, optional): Corpus index file to update with the converted files.
+
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    lab_files = find_lab_files(input_directory, fs, io_threads)
+    all_files = lab_files
+
+    if incremental:
+        outputs = {path: _output_path(input_directory, output_directory, path) for path in lab_files}
+        sources = module_sources(__name__, "daisy_common.segtable", "daisy_common.scan", "daisy_common.stream")
+        manifest = BuildManifest(output_directory, options_hash(sources))
+        lab_files, up_to_date = plan_incremental(manifest, outputs)
+        print(f"Up to date: {up_to_date} files, converting {len(lab_files)}")
+
+    results = convert_lab_files(input_directory, output_directory, lab_files, jobs, fs, io_threads,
+                                index_path is not None)
+    print_results(results)
+
+    if index_path:
+        update_index(index_path, keys=[archive_key(input_directory, path) for path in all_files])
+
+    if incremental:
+        for orphan in manifest.apply_results(results, outputs):
+            print(f"Removed orphaned output: {orphan}")
+        manifest.save()
 
     print("All conversions complete.")
+    return results
+
+def watch_lab_to_seg(input_directory, output_directory, jobs=1, fs=None, io_threads=DEFAULT_IO_THREADS,
+                     settle=DEFAULT_SETTLE, interval=DEFAULT_POLL_INTERVAL, polling=False, idle_exit=None,
+                     index_path=None):
+    """
+    Converts .lab files under input_directory to .seg files as the aligner writes them.
+
+    Existing .lab files are converted first; after that every new or changed
+    .lab file is converted once it has stopped changing for `settle` seconds.
+    Runs until interrupted, or until `idle_exit` seconds pass without new files.
+
+    Args:
+        input_directory (str): Directory containing .lab files.
+        output_directory (str): Directory where .seg files are written.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of reads and writes in flight.
+        settle (float): Seconds a .lab file must stay unchanged before it is converted.
+        interval (float): Seconds between checks.
+        polling (bool): Poll the tree even when inotify is available.
+        idle_exit (float, optional): Stop after this many seconds without new files.
+        index_path (str, optional): Corpus index file to update after every batch.
+
+    Returns:
+        int: Number of .lab files converted.
+    """
+    def convert(lab_files):
+        results = convert_lab_files(input_directory, output_directory, lab_files, jobs, fs, io_threads,
+                                    index_path is not None)
+        print_results(results)
+        if index_path:
+            update_index(index_path)
+
+    return watch(input_directory, ".lab", convert, settle, interval, polling, idle_exit)
+
+def _pack_task(input_lab_file):
+    metrics = get_metrics()
+    with metrics.time("parse"):
+        table = read_lab(input_lab_file)
+    with metrics.time("convert"):
+        table = rename_silences(table)
+    metrics.count("segments", len(table))
+    if not len(table):
+        return f"Skipping empty file: {input_lab_file}", None
+    return f"Packed {input_lab_file}", (table.starts, table.ends, table.label_strings())
+
+def pack_lab_to_seg(input_directory, archive_path, jobs=1):
+    """
+    Converts every .lab file under input_directory into one packed .seg archive.
+
+    Utterances are keyed by their path relative to input_directory, without extension.
+
+    Args:
+        input_directory (str): Directory containing .lab files.
+        archive_path (str): Path of the archive to write.
+        jobs (int): Number of worker processes (0 uses every CPU).
+
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    results = run_jobs(_pack_task, find_lab_files(input_directory), jobs=jobs)
+
+    report = []
+    with get_metrics().time("write"), ArchiveWriter(archive_path, kind="seg") as writer:
+        for path, result, error in results:
+            if error is None:
+                message, rows = result
+                if rows is not None:
+                    writer.add_rows(archive_key(input_directory, path), *rows)
+                report.append((path, message, None))
+            else:
+                report.append((path, None, error))
+    print_results(report)
+    print(f"Archive written: {archive_path}")
+    return report
 
 def main():
     parser = argparse.ArgumentParser(description="Convert .lab files to .seg files.")
     parser.add_argument("-i", "--input", required=True, help="Path to the input directory containing .lab files.")
-    parser.add_argument("-o", "--output", required=True, help="Path to the output directory where .seg files will be saved.")
+    destination = parser.add_mutually_exclusive_group()
+    destination.add_argument("-o", "--output", help="Path to the output directory where .seg files will be saved.")
+    destination.add_argument("--archive", help="Write one packed archive to this path instead of loose .seg files.")
+    parser.add_argument("--incremental", action="store_true", help="Only convert .lab files that changed since the last incremental run.")
+    add_jobs_argument(parser)
+    add_io_argument(parser)
+    add_metrics_arguments(parser)
+    add_watch_arguments(parser)
+    add_index_argument(parser)
     args = parser.parse_args()
 
     if not os.path.exists(args.input):
         print(f"Error: Input directory does not exist: {args.input}")
         return
+    if not args.archive and not args.output:
+        print("Error: Pass an output directory (-o) or an archive path (--archive).")
+        return
+    if args.watch and (args.archive or args.incremental):
+        print("Error: --watch cannot be combined with --archive or --incremental.")
+        return
+    if args.index and args.archive:
+        print("Error: --index cannot be combined with --archive.")
+        return
 
-    convert_lab_to_seg(args.input, args.output)
+    with instrument(args, "lab2seg"):
+        if args.watch:
+            watch_lab_to_seg(args.input, args.output, jobs=args.jobs, io_threads=args.io_threads,
+                             settle=args.settle, interval=args.poll_interval, polling=args.polling,
+                             idle_exit=args.idle_exit, index_path=args.index)
+        elif args.archive:
+            pack_lab_to_seg(args.input, args.archive, jobs=args.jobs)
+        else:
+            convert_lab_to_seg(args.input, args.output, jobs=args.jobs, incremental=args.incremental,
+                               io_threads=args.io_threads, index_path=args.index)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "MFA_Converters"))
+sys.path.insert(0, os.path.join(ROOT, "SOFA_Converters"))
+
+from daisy_common.archive import archive_key
+from daisy_common.cache import options_hash
+from daisy_common.jobs import add_jobs_argument, print_results
+from daisy_common.metrics import add_metrics_arguments, instrument
+from daisy_common.scan import add_io_argument
+from daisy_common.shards import (DEFAULT_BATCH_SIZE, STRATEGIES, ShardManifest, merge_shards, plan_shards, run_shard,
+                                 shard_status)
+
+# Tool: (input suffix, writes in place, takes a converter file, records index entries)
+TOOLS = {
+    "textgrid2lab": (".TextGrid", False, True, True),
+    "lab2seg": (".lab", False, False, True),
+    "txt2romaji": (".txt", True, False, False),
+}
+
+def _tool_module(tool):
+    # Imported on demand: each converter pulls in its own tables and dependencies
+    if tool == "textgrid2lab":
+        import textgrid2lab
+        return textgrid2lab
+    if tool == "lab2seg":
+        import lab2seg
+        return lab2seg
+    import txt2romaji
+    return txt2romaji
+
+def tool_options_key(tool, options):
+    """
+    Hashes the converter script, its converter or Romaji table file and options, so workers can
+    refuse to run a shard with tables that changed since the plan.
+    """
+    module = _tool_module(tool)
+    files = [os.path.abspath(module.__file__)]
+    if tool == "txt2romaji":
+        files.append(module.ROMAJI_TABLE)
+    if options.get("converter"):
+        files.append(options["converter"])
+    return options_hash(files, tool=tool, **options)
+
+def make_converter(manifest, jobs=1, io_threads=None):
+    """
+    Returns convert(paths) for the tool of a manifest, converting absolute input paths.
+    """
+    module = _tool_module(manifest.tool)
+    index = manifest.index is not None
+    io_args = {"io_threads": io_threads} if io_threads else {}
+    if manifest.tool == "textgrid2lab":
+        converter = module.load_converter(manifest.options["converter"], True)
+        # textgrid2lab maps paths relative to the current directory into the output tree
+        os.chdir(manifest.input_dir)
+        return lambda paths: module.convert_textgrid_files(converter, paths, manifest.output_dir, jobs=jobs,
+                                                           index=index, **io_args)
+    if manifest.tool == "lab2seg":
+        return lambda paths: module.convert_lab_files(manifest.input_dir, manifest.output_dir, paths, jobs=jobs,
+                                                      index=index, **io_args)
+    return lambda paths: module.convert_txt_files(paths, jobs=jobs, **io_args)
+
+def plan(args):
+    suffix, in_place, takes_converter, indexes = TOOLS[args.tool]
+    if not os.path.isdir(args.input):
+        print(f"Error: Input directory does not exist: {args.input}")
+        return 1
+    if takes_converter != bool(args.converter):
+        print(f"Error: {args.tool} {'needs' if takes_converter else 'does not take'} a converter file (-c).")
+        return 1
+    if args.tool == "lab2seg" and not args.output:
+        print("Error: lab2seg needs an output directory (-o).")
+        return 1
+    if in_place and args.output:
+        print(f"Error: {args.tool} rewrites its input files and does not take -o.")
+        return 1
+    if args.index and not indexes:
+        print(f"Error: {args.tool} does not record corpus index entries.")
+        return 1
+    if args.shards < 1:
+        print("Error: --shards must be at least 1.")
+        return 1
+
+    options = {"converter": os.path.abspath(args.converter)} if args.converter else {}
+    manifest = plan_shards(args.manifest, args.tool, args.input, args.output, suffix, args.shards, args.strategy,
+                           options, tool_options_key(args.tool, options), args.index, io_threads=args.io_threads)
+    print(f"Planned {len(manifest.files)} files in {manifest.shards} shards ({manifest.strategy}): {manifest.path}")
+    for shard, (files, size) in enumerate(manifest.shard_sizes()):
+        print(f"  shard {shard}: {files} files, {size / 1e6:.1f} MB")
+    return 0
+
+def work(args, manifest):
+    if manifest.options_key != tool_options_key(manifest.tool, manifest.options):
+        print("Error: The converter or its options changed since the plan; plan the job again.")
+        return 1
+    convert = make_converter(manifest, args.jobs, args.io_threads)
+    shards = range(manifest.shards) if args.shard is None else [args.shard]
+    failures = 0
+    with instrument(args, f"shard_jobs {manifest.tool}"):
+        for shard in shards:
+            results = run_shard(manifest, shard, convert, args.batch_size)
+            failures += print_results(results)
+    if failures:
+        print(f"{failures} files failed; run the shard again to retry them.")
+        return 1
+    return 0
+
+def print_status(manifest):
+    """
+    Prints the progress of every shard and returns True if every file is done.
+    """
+    totals = {"files": 0, "done": 0, "failed": 0, "pending": 0}
+    print("shard\tfiles\tdone\tfailed\tpending")
+    for shard, status in enumerate(shard_status(manifest)):
+        print(f"{shard}\t{status['files']}\t{status['done']}\t{status['failed']}\t{status['pending']}")
+        for key in totals:
+            totals[key] += status[key]
+    print(f"total\t{totals['files']}\t{totals['done']}\t{totals['failed']}\t{totals['pending']}")
+    return totals["done"] == totals["files"]
+
+def merge(manifest):
+    entries, failed = merge_shards(manifest)
+    if not print_status(manifest):
+        for key, error in sorted(failed.items()):
+            print(f"Error processing {manifest.input_path(key)}: {error}")
+        print("Error: Not every shard is done; run the remaining shards before merging.")
+        return 1
+    if manifest.index:
+        from daisy_common.index import merge_recorded, update_index
+        merge_recorded(entries)
+        keys = [archive_key(manifest.input_dir, manifest.input_path(key)) for key, _, _ in manifest.files]
+        update_index(manifest.index, keys=keys)
+    print(f"Merged {manifest.shards} shards: {len(manifest.files)} files converted.")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a conversion as a sharded manifest and run the shards "
+                                                 "on several machines or processes.")
+    parser.add_argument("manifest", help="Path to the shard manifest JSON file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = commands.add_parser("plan", help="Scan the input once and write the manifest.")
+    plan_parser.add_argument("tool", choices=sorted(TOOLS), help="Converter to run.")
+    plan_parser.add_argument("-i", "--input", required=True, help="Input directory.")
+    plan_parser.add_argument("-o", "--output", help="Output directory (textgrid2lab, lab2seg).")
+    plan_parser.add_argument("-c", "--converter", help="Converter file (textgrid2lab).")
+    plan_parser.add_argument("--shards", type=int, required=True, help="Number of shards.")
+    plan_parser.add_argument("--strategy", choices=STRATEGIES, default="hash",
+                             help="Assign files by path hash, or balance the bytes per shard. Default: hash.")
+    plan_parser.add_argument("--index", metavar="PATH", help="Corpus index file updated by the merge.")
+    add_io_argument(plan_parser)
+
+    work_parser = commands.add_parser("work", help="Convert the files of a shard, resuming from its checkpoint.")
+    work_parser.add_argument("--shard", type=int, help="Shard to run. Default: every shard, one after another.")
+    work_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                             help=f"Files per checkpointed batch. Default: {DEFAULT_BATCH_SIZE}.")
+    add_jobs_argument(work_parser)
+    add_io_argument(work_parser)
+    add_metrics_arguments(work_parser)
+
+    commands.add_parser("status", help="Show the progress of every shard.")
+    commands.add_parser("merge", help="Check that every shard is done and merge their index entries.")
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        sys.exit(plan(args))
+
+    if not os.path.exists(args.manifest):
+        print(f"Error: Manifest file does not exist: {args.manifest}")
+        sys.exit(1)
+    try:
+        manifest = ShardManifest.load(args.manifest)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.command == "work":
+        if args.shard is not None and not 0 <= args.shard < manifest.shards:
+            print(f"Error: --shard must be in 0..{manifest.shards - 1}.")
+            sys.exit(1)
+        sys.exit(work(args, manifest))
+    if args.command == "status":
+        sys.exit(0 if print_status(manifest) else 1)
+    sys.exit(merge(manifest))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import os
+import sys
+import argparse
+from functools import partial
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "MFA_Converters"))
+sys.path.insert(0, os.path.join(ROOT, "SOFA_Converters"))
+
+import lab2seg
+import textgrid2lab
+from lab_phoneme_change import SymbolConverter
+from daisy_common.archive import archive_key
+from daisy_common.export import Export, export_tiers, parse_export
+from daisy_common.index import add_index_argument, record, update_index
+from daisy_common.jobs import add_jobs_argument, print_results
+from daisy_common.metrics import add_metrics_arguments, get_metrics, instrument
+from daisy_common.scan import DEFAULT_IO_THREADS, add_io_argument, run_io_jobs
+from daisy_common.segtable import format_lab, format_seg
+from daisy_common.textgrid import parse_tiers
+from daisy_common.ticks import seconds_to_ticks
+from daisy_common.watch import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE, add_watch_arguments, watch
+
+def convert_utterance(textgrid_file, sequence_converter=None, symbol_converter=None, apply_low_number=True):
+    """
+    Runs one TextGrid through every conversion stage in memory.
+
+    Stages: parse the 'phones' tier, apply the sequence converter (textgrid2lab),
+    remap symbols (lab_phoneme_change), then build the .seg rows (lab2seg).
+    The segments stay in one SegmentTable between stages.
+
+    Args:
+        textgrid_file (str): Path to the TextGrid file.
+        sequence_converter (SequenceConverter, optional): Rules for textgrid2lab; None skips the stage.
+        symbol_converter (SymbolConverter, optional): Symbol map for lab_phoneme_change; None skips the stage.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
+
+    Returns:
+        tuple: (lab_text, seg_text), both None when the TextGrid has no phones.
+    """
+    intervals = textgrid2lab.read_phone_intervals(textgrid_file, apply_low_number)
+    return _convert_intervals(intervals, sequence_converter, symbol_converter)
+
+def convert_textgrid_text(text, sequence_converter=None, symbol_converter=None, apply_low_number=True):
+    """
+    Runs TextGrid content through every conversion stage without touching the file system.
+
+    Args:
+        text (str or bytes): TextGrid content (long or short text format).
+        sequence_converter (SequenceConverter, optional): Rules for textgrid2lab; None skips the stage.
+        symbol_converter (SymbolConverter, optional): Symbol map for lab_phoneme_change; None skips the stage.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
+
+    Returns:
+        tuple: (lab_text, seg_text), both None when the TextGrid has no phones.
+    """
+    intervals = textgrid2lab.parse_phone_intervals(text, apply_low_number)
+    return _convert_intervals(intervals, sequence_converter, symbol_converter)
+
+def _convert_intervals(intervals, sequence_converter, symbol_converter):
+    table = _phones_table(intervals, sequence_converter, symbol_converter)
+    if not len(table):
+        return None, None
+    return format_lab(table), format_seg(lab2seg.rename_silences(table))
+
+def _phones_table(intervals, sequence_converter, symbol_converter):
+    table = textgrid2lab.intervals_to_table(intervals, sequence_converter or {}, sequence_converter is not None)
+    if symbol_converter is not None and len(table):
+        table = symbol_converter.convert_table(table)
+    return table
+
+def convert_tiers(tiers, sequence_converter=None, symbol_converter=None, apply_low_number=True):
+    """
+    Converts parsed TextGrid tiers to SegmentTables, ready to be shared by several exports.
+
+    The 'phones' tier goes through every stage of convert_utterance. Other
+    tiers (e.g. 'words') keep their labels, with empty ones replaced by 'pau'.
+
+    Args:
+        tiers (dict): Tier name to raw (start, end, text) intervals in ticks (see daisy_common.textgrid.parse_tiers).
+        sequence_converter (SequenceConverter, optional): Rules for textgrid2lab; None skips the stage.
+        symbol_converter (SymbolConverter, optional): Symbol map for lab_phoneme_change; None skips the stage.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to phone labels.
+
+    Returns:
+        dict: Tier name to SegmentTable.
+    """
+    tables = {}
+    for name, intervals in tiers.items():
+        if name == "phones":
+            intervals = textgrid2lab.label_intervals(intervals, apply_low_number)
+            tables[name] = _phones_table(intervals, sequence_converter, symbol_converter)
+        else:
+            tables[name] = textgrid2lab.intervals_to_table(textgrid2lab.label_intervals(intervals), {}, False)
+    return tables
+
+def known_labels(sequence_converter, symbol_converter=None):
+    """
+    Returns the phone labels the converters produce, or None without a sequence
+    converter (the aligner phonemes are kept and nothing can be missed).
+    """
+    if sequence_converter is None:
+        return None
+    known = sequence_converter.outputs() | {'pau'}
+    if symbol_converter is not None:
+        known = {symbol_converter.converter_map.get(label, label) for label in known}
+    return known
+
+_worker_converters = (None, None)
+_worker_known = None
+
+def _init_worker(sequence_converter, symbol_converter):
+    global _worker_converters, _worker_known
+    _worker_converters = (sequence_converter, symbol_converter)
+    _worker_known = known_labels(sequence_converter, symbol_converter)
+
+def _convert_task(input_dir, exports, apply_low_number, index, textgrid_file, data):
+    sequence_converter, symbol_converter = _worker_converters
+    metrics = get_metrics()
+    tier_names = export_tiers(exports)
+    if index and "phones" not in tier_names:
+        # The index covers the phones even when no export writes them
+        tier_names.append("phones")
+    with metrics.time("parse"):
+        tiers = parse_tiers(data, tier_names, seconds_to_ticks)
+    metrics.count("intervals", sum(len(intervals) for intervals in tiers.values()))
+    with metrics.time("convert"):
+        tables = convert_tiers(tiers, sequence_converter, symbol_converter, apply_low_number)
+        outputs = [(export, export.render(tables)) for export in exports]
+    if index and len(tables["phones"]):
+        record(archive_key(input_dir, textgrid_file), tables["phones"], _worker_known)
+
+    stem = os.path.splitext(os.path.relpath(textgrid_file, input_dir))[0]
+    writes = [(export.output_path(stem), text, 'utf-8') for export, text in outputs if text is not None]
+    if not writes:
+        return None, []
+    return f"Converted {textgrid_file} -> {', '.join(path for path, _, _ in writes)}", writes
+
+def pipeline_exports(lab_dir=None, seg_dir=None, exports=()):
+    """
+    Returns the exports of a run: the phones .lab and .seg directories followed by any extra exports.
+    """
+    result = []
+    if lab_dir:
+        result.append(Export(["phones"], "lab", lab_dir))
+    if seg_dir:
+        result.append(Export(["phones"], "seg", seg_dir))
+    return result + list(exports)
+
+def run_pipeline(input_dir, lab_dir=None, seg_dir=None, converter_path=None, symbol_map_path=None,
+                 apply_low_number=True, jobs=1, fs=None, io_threads=DEFAULT_IO_THREADS, exports=(),
+                 index_path=None):
+    """
+    Converts every TextGrid under input_dir to .lab and/or .seg files in one pass.
+
+    Every TextGrid is parsed once, reading all the tiers the outputs need;
+    the converted tables are shared by every output format.
+
+    Args:
+        input_dir (str): Directory containing TextGrid files.
+        lab_dir (str, optional): Directory for .lab output; None skips it.
+        seg_dir (str, optional): Directory for .seg output; None skips it.
+        converter_path (str, optional): textgrid2lab converter file; None skips sequence conversion.
+        symbol_map_path (str, optional): lab_phoneme_change converter file; None skips the remap.
+        apply_low_number (bool): Whether to apply lowercase_and_remove_numbers to labels.
+        jobs (int): Number of worker processes (0 uses every CPU).
+        fs (LocalFileSystem, optional): File system for the I/O. Defaults to the local one.
+        io_threads (int): Maximum number of directory listings, reads and writes in flight.
+        exports (list): Additional Export outputs (other tiers or formats).
+        index_path (str, optional): Corpus index file to update with the converted phones.
+
+    Returns:
+        list: (path, message, error) tuples sorted by path.
+    """
+    sequence_converter = None
+    if converter_path:
+        sequence_converter = textgrid2lab.load_converter(converter_path, apply_low_number)
+    symbol_converter = SymbolConverter(symbol_map_path) if symbol_map_path else None
+    textgrid_files = textgrid2lab.find_textgrid_files(input_dir, fs, io_threads)
+
+    results = run_io_jobs(
+        partial(_convert_task, input_dir, pipeline_exports(lab_dir, seg_dir, exports), apply_low_number,
+                index_path is not None),
+        textgrid_files,
+        jobs=jobs,
+        initializer=_init_worker,
+        initargs=(sequence_converter, symbol_converter),
+        fs=fs,
+        threads=io_threads
+    )
+    print_results(results)
+    if index_path:
+        update_index(index_path, keys=[archive_key(input_dir, path) for path in textgrid_files])
+    return results
+
+def watch_pipeline(input_dir, lab_dir=None, seg_dir=None, converter_path=None, symbol_map_path=None,
+                   apply_low_number=True, jobs=1, fs=None, io_threads=DEFAULT_IO_THREADS, exports=(),
+                   settle=DEFAULT_SETTLE, interval=DEFAULT_POLL_INTERVAL, polling=False, idle_exit=None,
+                   index_path=None):
+    """
+    Converts TextGrids under input_dir to .lab and/or .seg files as the aligner writes them.
+
+    Existing TextGrids are converted first; after that every new or changed
+    TextGrid is converted once it has stopped changing for `settle` seconds,
+    so the .seg files are ready shortly after alignment ends. Runs until
+    interrupted, or until `idle_exit` seconds pass without new files.
+
+    Args:
+        input_dir (str): Directory containing TextGrid files.
+        lab_dir, seg_dir, converter_path, symbol_map_path, apply_low_number, jobs, fs, io_threads, exports:
+            As for run_pipeline.
+        settle (float): Seconds a TextGrid must stay unchanged before it is converted.
+        interval (float): Seconds between checks.
+        polling (bool): Poll the tree even when inotify is available.
+        idle_exit (float, optional): Stop after this many seconds without new files.
+        index_path (str, optional): Corpus index file to update after every batch.
+
+    Returns:
+        int: Number of TextGrids converted.
+    """
+    sequence_converter = None
+    if converter_path:
+        sequence_converter = textgrid2lab.load_converter(converter_path, apply_low_number)
+    symbol_converter = SymbolConverter(symbol_map_path) if symbol_map_path else None
+    exports = pipeline_exports(lab_dir, seg_dir, exports)
+
+    def convert(textgrid_files):
+        results = run_io_jobs(
+            partial(_convert_task, input_dir, exports, apply_low_number, index_path is not None),
+            textgrid_files,
+            jobs=jobs,
+            initializer=_init_worker,
+            initargs=(sequence_converter, symbol_converter),
+            fs=fs,
+            threads=io_threads
+        )
+        print_results(results)
+        if index_path:
+            update_index(index_path)
+
+    return watch(input_dir, ".TextGrid", convert, settle, interval, polling, idle_exit)
+
+def _export_argument(spec):
+    try:
+        return parse_export(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert TextGrid files to .lab, .seg and other formats in one pass.")
+    parser.add_argument("-i", "--input", required=True, help="Path to the input directory containing TextGrid files.")
+    parser.add_argument("-c", "--converter", help="textgrid2lab converter file (.txt). Omit to keep the aligner phonemes.")
+    parser.add_argument("-s", "--symbol-map", help="lab_phoneme_change converter file (.txt). Omit to skip the symbol remap.")
+    parser.add_argument("--lab-output", help="Directory where .lab files will be saved.")
+    parser.add_argument("--seg-output", help="Directory where .seg files will be saved.")
+    parser.add_argument("--export", action="append", default=[], type=_export_argument, metavar="TIERS:FORMAT:DIR",
+                        help="Extra output, e.g. words:lab:out/words or phones,words:json:out/json. "
+                             "Formats: lab, seg, htk, json (json takes several tiers). Repeatable.")
+    add_jobs_argument(parser)
+    add_io_argument(parser)
+    add_metrics_arguments(parser)
+    add_watch_arguments(parser)
+    add_index_argument(parser)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input):
+        print(f"Error: Input directory does not exist: {args.input}")
+        return
+    if not args.lab_output and not args.seg_output and not args.export and not args.index:
+        print("Error: Nothing to write, pass --lab-output, --seg-output, --export and/or --index.")
+        return
+
+    with instrument(args, "textgrid2seg"):
+        if args.watch:
+            watch_pipeline(
+                args.input,
+                lab_dir=args.lab_output,
+                seg_dir=args.seg_output,
+                converter_path=args.converter,
+                symbol_map_path=args.symbol_map,
+                jobs=args.jobs,
+                io_threads=args.io_threads,
+                exports=args.export,
+                settle=args.settle,
+                interval=args.poll_interval,
+                polling=args.polling,
+                idle_exit=args.idle_exit,
+                index_path=args.index
+            )
+            return
+        run_pipeline(
+            args.input,
+            lab_dir=args.lab_output,
+            seg_dir=args.seg_output,
+            converter_path=args.converter,
+            symbol_map_path=args.symbol_map,
+            jobs=args.jobs,
+            io_threads=args.io_threads,
+            exports=args.export,
+            index_path=args.index
+        )
+    print("All conversions complete.")
+
+if __name__ == "__main__":
+    main()